@@ -0,0 +1,82 @@
+"""
+Compares the memory used by a network of Node and Track objects with the same network in a NetworkStore, loaded from a
+saved file.
+
+Run from the repository root with: python -m benchmarks.memory [--tracks N]
+"""
+import argparse
+import gc
+import math
+import os
+import random
+import tempfile
+import tracemalloc
+
+import pygame
+import persistence
+from canvas import Canvas
+from network import Node, StraightTrack, CurvedTrack, Network
+from store import NetworkStore
+
+
+def build_objects(canvas: Canvas, track_count: int, seed: int) -> Network:
+    # The tracks are appended directly, so that only the memory of the objects themselves is measured
+    network = Network(canvas)
+    rnd = random.Random(seed)
+    for i in range(track_count):
+        if i % 3 == 0:
+            center = pygame.Vector2(rnd.uniform(0, 10000), rnd.uniform(0, 10000))
+            radius = rnd.uniform(50, 500)
+            a_angle = rnd.uniform(0, 2 * math.pi)
+            b_angle = (a_angle + rnd.uniform(0.1, 1)) % (2 * math.pi)
+            node_a = Node(canvas, center + pygame.Vector2(math.cos(a_angle), math.sin(a_angle)) * radius)
+            node_b = Node(canvas, center + pygame.Vector2(math.cos(b_angle), math.sin(b_angle)) * radius)
+            track = CurvedTrack(canvas, node_a, node_b, center, radius, a_angle, b_angle, a_angle, b_angle)
+        else:
+            node_a = Node(canvas, pygame.Vector2(rnd.uniform(0, 10000), rnd.uniform(0, 10000)))
+            node_b = Node(canvas, node_a.position + pygame.Vector2(rnd.uniform(-100, 100), rnd.uniform(-100, 100)))
+            track = StraightTrack(canvas, node_a, node_b)
+        node_a.connections.add(track)
+        node_b.connections.add(track)
+        network.nodes[node_a.id] = node_a
+        network.nodes[node_b.id] = node_b
+        network.tracks[track.id] = track
+    return network
+
+
+def build_store(canvas: Canvas, path: str) -> NetworkStore:
+    store = persistence.load_store(path, canvas)
+    store.node_tracks(0)
+    return store
+
+
+def measure(function):
+    gc.collect()
+    tracemalloc.start()
+    result = function()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tracks', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    canvas = Canvas(pygame.Vector2())
+    network, object_size = measure(lambda: build_objects(canvas, args.tracks, args.seed))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'network.bin')
+        persistence.save(network, path)
+        _, store_size = measure(lambda: build_store(canvas, path))
+
+    print(f'tracks: {args.tracks}, nodes: {len(network.nodes)}')
+    print(f'objects: {object_size / 1024 / 1024:.1f} MiB ({object_size / args.tracks:.0f} bytes per track)')
+    print(f'store:   {store_size / 1024 / 1024:.1f} MiB ({store_size / args.tracks:.0f} bytes per track)')
+
+
+if __name__ == '__main__':
+    main()
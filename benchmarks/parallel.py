@@ -0,0 +1,84 @@
+"""
+Scaling benchmark for building networks with intersection tests in worker processes.
+
+Run from the repository root with: python -m benchmarks.parallel [--workers 1 2 4 8] [--output results.json]
+Every network is compared with the one built without workers, and the benchmark fails if any of them differs.
+"""
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+import pygame
+import layouts
+from canvas import Canvas
+from network import Network
+
+
+def build(layout: str, size: int, seed: int, workers) -> (float, Network):
+    canvas = Canvas(pygame.Vector2())
+    tracks = layouts.LAYOUTS[layout](canvas, size, seed)
+    network = Network(canvas)
+    start = time.perf_counter()
+    network.add_tracks(tracks, workers)
+    return time.perf_counter() - start, network
+
+
+def get_summary(network: Network) -> (list, list):
+    """
+    Summarizes a network by its geometry, as the ids differ between networks built from separately generated tracks.
+    """
+    positions = {node: (node.position.x, node.position.y) for node in network.nodes.values()}
+    tracks = sorted((type(track).__name__, positions[track.node_a], positions[track.node_b])
+                    for track in network.tracks.values())
+    return sorted(positions.values()), tracks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', nargs='+', type=int, default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument('--layouts', nargs='+', choices=list(layouts.LAYOUTS), default=list(layouts.LAYOUTS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10000])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='File to write the JSON results to, defaults to stdout')
+    args = parser.parse_args()
+
+    results = []
+    identical = True
+    for layout in args.layouts:
+        for size in args.sizes:
+            serial_seconds, serial = build(layout, size, args.seed, None)
+            expected = get_summary(serial)
+            results.append({'layout': layout, 'size': size, 'workers': None, 'seconds': serial_seconds})
+            print(f'{layout:<10} {size:>7} {"serial":>7} {serial_seconds:.3f}', file=sys.stderr)
+            for workers in sorted(set(args.workers)):
+                seconds, network = build(layout, size, args.seed, workers)
+                same = get_summary(network) == expected
+                identical = identical and same
+                results.append({'layout': layout, 'size': size, 'workers': workers, 'seconds': seconds,
+                                'speedup': serial_seconds / seconds, 'identical': same})
+                print(f'{layout:<10} {size:>7} {workers:>7} {seconds:.3f} {serial_seconds / seconds:.2f}x'
+                      f'{"" if same else " DIFFERENT"}', file=sys.stderr)
+
+    output = {
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'seed': args.seed,
+        'results': results,
+    }
+    if args.output is None:
+        json.dump(output, sys.stdout, indent=2)
+    else:
+        with open(args.output, 'w') as file:
+            json.dump(output, file, indent=2)
+    sys.exit(0 if identical else 1)
+
+
+if __name__ == '__main__':
+    main()
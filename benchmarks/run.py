@@ -0,0 +1,161 @@
+"""
+Headless benchmarks for network construction, intersection tests, hit-testing and drawing.
+
+Run from the repository root with: python -m benchmarks.run [--sizes 1000 10000] [--output results.json]
+The results are written as JSON, so that they can be compared between versions.
+"""
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import json
+import logging
+import platform
+import random
+import sys
+import time
+
+import pygame
+import layouts
+import util
+from canvas import Canvas
+from network import Network
+
+SCREEN_WIDTH = 1000
+SCREEN_HEIGHT = 800
+QUERY_COUNT = 1000
+BATCH_SIZE = 256
+
+
+def time_call(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def build_network(canvas: Canvas, tracks: list) -> Network:
+    network = Network(canvas)
+    network.add_tracks(tracks)
+    return network
+
+
+def bench_add_track(canvas: Canvas, layout: str, size: int, seed: int) -> dict:
+    tracks = layouts.LAYOUTS[layout](canvas, size, seed)
+    network = Network(canvas)
+
+    def add():
+        for track in tracks:
+            network.add_track(track)
+    return {'seconds': time_call(add), 'tracks': len(network.tracks), 'nodes': len(network.nodes)}
+
+
+def bench_add_tracks(canvas: Canvas, layout: str, size: int, seed: int) -> dict:
+    tracks = layouts.LAYOUTS[layout](canvas, size, seed)
+    network = Network(canvas)
+    return {'seconds': time_call(lambda: network.add_tracks(tracks)), 'tracks': len(network.tracks),
+            'nodes': len(network.nodes)}
+
+
+def bench_build_track(canvas: Canvas, layout: str, size: int, seed: int) -> dict:
+    network = Network(canvas)
+    return {'seconds': time_call(lambda: layouts.builder_chains(network, size, seed)), 'tracks': len(network.tracks),
+            'nodes': len(network.nodes)}
+
+
+def bench_intersects_track(canvas: Canvas, layout: str, size: int, seed: int) -> dict:
+    tracks = layouts.LAYOUTS[layout](canvas, size, seed)
+    pairs = list(zip(tracks, tracks[1:] + tracks[:1]))
+
+    def intersect():
+        for a, b in pairs:
+            util.intersects_track(a, b)
+    return {'seconds': time_call(intersect), 'operations': len(pairs)}
+
+
+def bench_intersects_tracks(canvas: Canvas, layout: str, size: int, seed: int) -> dict:
+    tracks = layouts.LAYOUTS[layout](canvas, size, seed)
+    batches = [(tracks[i], tracks[i:i + BATCH_SIZE]) for i in range(0, len(tracks), BATCH_SIZE)]
+
+    def intersect():
+        for track, batch in batches:
+            util.intersects_tracks(track, batch)
+    return {'seconds': time_call(intersect), 'operations': len(tracks)}
+
+
+def bench_query_point(canvas: Canvas, layout: str, size: int, seed: int) -> dict:
+    network = build_network(canvas, layouts.LAYOUTS[layout](canvas, size, seed))
+    min_x, min_y, max_x, max_y = _get_extent(network)
+    rnd = random.Random(seed)
+    positions = [pygame.Vector2(rnd.uniform(min_x, max_x), rnd.uniform(min_y, max_y)) for _ in range(QUERY_COUNT)]
+
+    def query():
+        for position in positions:
+            network.query_point(position, 30)
+    return {'seconds': time_call(query), 'operations': QUERY_COUNT}
+
+
+def bench_draw(canvas: Canvas, layout: str, size: int, seed: int) -> dict:
+    network = build_network(canvas, layouts.LAYOUTS[layout](canvas, size, seed))
+    min_x, min_y, max_x, max_y = _get_extent(network)
+    canvas.offset = pygame.Vector2(SCREEN_WIDTH / 2 - (min_x + max_x) / 2, SCREEN_HEIGHT / 2 + (min_y + max_y) / 2)
+    surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    return {'seconds': time_call(lambda: network.draw(surface)), 'operations': 1}
+
+
+BENCHMARKS = {
+    'add_track': bench_add_track,
+    'add_tracks': bench_add_tracks,
+    'build_track': bench_build_track,
+    'intersects_track': bench_intersects_track,
+    'intersects_tracks': bench_intersects_tracks,
+    'query_point': bench_query_point,
+    'draw': bench_draw,
+}
+
+
+def _get_extent(network: Network) -> (float, float, float, float):
+    xs = [node.position.x for node in network.nodes.values()]
+    ys = [node.position.y for node in network.nodes.values()]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument('--layouts', nargs='+', choices=list(layouts.LAYOUTS), default=list(layouts.LAYOUTS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 100000])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='File to write the JSON results to, defaults to stdout')
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = []
+    for name in args.benchmarks:
+        # The builder chains are a layout of their own, as they can only be built through a network
+        for layout in ['chains'] if name == 'build_track' else args.layouts:
+            for size in args.sizes:
+                canvas = Canvas(pygame.Vector2())
+                result = BENCHMARKS[name](canvas, layout, size, args.seed)
+                result.update({'benchmark': name, 'layout': layout, 'size': size})
+                results.append(result)
+                print(f'{name:<18} {layout:<10} {size:>7} {result["seconds"]}',
+                      file=sys.stderr)
+
+    output = {
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'numpy': util.np.__version__ if util.np is not None else None,
+        'seed': args.seed,
+        'results': results,
+    }
+    if args.output is None:
+        json.dump(output, sys.stdout, indent=2)
+    else:
+        with open(args.output, 'w') as file:
+            json.dump(output, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,26 +1,83 @@
+import math
+
 from pygame import Vector2
 import pygame
+from geom import Geom
+from stats import Stats
 
 
 class Canvas:
-    def __init__(self, offset: Vector2 = Vector2()):
+    """
+    Maps the world onto the screen. The world's y axis points up, the screen's down. The offset is the position of the
+    world's origin on the screen and the scale the number of pixels per unit of the world.
+    """
+    # Largest distance in pixels between an arc and the polyline it is drawn as
+    ARC_TOLERANCE = 0.25
+    MIN_SCALE = 1 / 64
+    MAX_SCALE = 8
+
+    def __init__(self, offset: Vector2 = Vector2(), scale: float = 1):
         self.offset = offset
+        self.scale = scale
+        # Draw calls by primitive, disabled until enabled by the user
+        self.stats = Stats()
+
+    def to_screen(self, position: Vector2) -> (float, float):
+        return position.x * self.scale + self.offset.x, -position.y * self.scale + self.offset.y
+
+    def to_world(self, position: (float, float)) -> Vector2:
+        return Vector2((position[0] - self.offset.x) / self.scale, (self.offset.y - position[1]) / self.scale)
+
+    def zoom(self, factor: float, anchor: (float, float)):
+        """
+        Multiplies the scale by the factor, within MIN_SCALE and MAX_SCALE, keeping the world position under the
+        anchor on the screen in place.
+        """
+        world = self.to_world(anchor)
+        self.scale = max(self.MIN_SCALE, min(self.MAX_SCALE, self.scale * factor))
+        self.offset = Vector2(anchor[0] - world.x * self.scale, anchor[1] + world.y * self.scale)
+
+    def get_viewport(self, surface) -> (float, float, float, float):
+        """
+        Returns the part of the world that is visible on the surface as (min_x, min_y, max_x, max_y).
+        """
+        width, height = surface.get_size()
+        min_corner = self.to_world((0, height))
+        max_corner = self.to_world((width, 0))
+        return min_corner.x, min_corner.y, max_corner.x, max_corner.y
 
     def line(self, surface, start: Vector2, end: Vector2, color: (float, float, float), width: int):
-        start = Vector2(start.x, -start.y)
-        end = Vector2(end.x, -end.y)
-        pygame.draw.line(surface, color, start + self.offset, end + self.offset, width)
+        self.stats.count('draw calls line')
+        pygame.draw.line(surface, color, self.to_screen(start), self.to_screen(end), width)
+
+    def lines(self, surface, points: list, color: (float, float, float), width: int):
+        """
+        Draws a polyline. Lines of width 1 are anti-aliased.
+        """
+        self.stats.count('draw calls lines')
+        offset_x, offset_y = self.offset
+        scale = self.scale
+        screen_points = [(point.x * scale + offset_x, -point.y * scale + offset_y) for point in points]
+        if width <= 1:
+            pygame.draw.aalines(surface, color, False, screen_points)
+        else:
+            pygame.draw.lines(surface, color, False, screen_points, width)
 
     def circle(self, surface, center: Vector2, radius: float, color: (float, float, float)):
-        x = center.x + self.offset.x
-        y = -center.y + self.offset.y
+        x, y = self.to_screen(center)
         if x < 0 or y < 0:
             return
-        pygame.draw.circle(surface, color, [x, y], radius)
+        self.stats.count('draw calls circle')
+        pygame.draw.circle(surface, color, [x, y], radius * self.scale)
 
     def arc(self, surface, center: Vector2, radius: float, start_angle: float, stop_angle: float,
             color: (float, float, float), width: int):
-        center = Vector2(center.x, -center.y)
-        rect = pygame.Rect(center.x - radius + self.offset.x, center.y - radius + self.offset.y, 2 * radius,
-                           2 * radius)
-        pygame.draw.arc(surface, color, rect, start_angle, stop_angle, width)
+        """
+        Draws the arc that runs counter clockwise from the start to the stop angle as a polyline, which unlike
+        pygame.draw.arc leaves no gaps in wide arcs.
+        """
+        sweep = Geom.get_sweep(start_angle, stop_angle)
+        segments = Geom.get_arc_segments(radius, sweep, self.ARC_TOLERANCE / self.scale)
+        points = [center + Vector2(math.cos(angle), math.sin(angle)) * radius
+                  for angle in (start_angle + i * sweep / segments for i in range(segments + 1))]
+        self.lines(surface, points, color, width)
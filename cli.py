@@ -0,0 +1,243 @@
+"""
+Command line interface for building, validating, analysing and rendering networks without a display.
+
+Run from the repository root with: python cli.py <command> [options], see python cli.py --help for the commands.
+Networks are stored in the binary format of the persistence module; files ending in .json are written as JSON exports.
+"""
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import collections
+import json
+import logging
+import sys
+
+import pygame
+import layouts
+import persistence
+import util
+from canvas import Canvas
+from geom import Tolerance
+from grid import Grid
+from network import Network, StraightTrack, CurvedTrack, BOUNDING_BOX_MARGIN, NODE_SIZE
+from spatial import BoundingBox
+from topology import Topology
+
+logger = logging.getLogger(__name__)
+
+RENDER_MARGIN = 50
+MAX_RENDER_SIZE = 8192
+BACKGROUND_COLOR = (25, 25, 25)
+
+
+def build(args) -> int:
+    canvas = Canvas(pygame.Vector2())
+    network = Network(canvas)
+    network.stats.enabled = args.stats
+    network.add_tracks(layouts.LAYOUTS[args.layout](canvas, args.size, args.seed), args.workers)
+    logger.info('built %s tracks and %s nodes', len(network.tracks), len(network.nodes))
+    if args.stats:
+        for line in network.stats.format():
+            print(line, file=sys.stderr)
+    _save(network, args.output)
+    return 0
+
+
+def validate(args) -> int:
+    network = persistence.load(args.input, Canvas(pygame.Vector2()))
+    problems = validate_network(network)
+    for problem in problems:
+        print(problem)
+    print(f'{len(problems)} problems in {len(network.tracks)} tracks and {len(network.nodes)} nodes')
+    return 1 if problems else 0
+
+
+def save(args) -> int:
+    network = persistence.load(args.input, Canvas(pygame.Vector2()))
+    _save(network, args.output)
+    return 0
+
+
+def analyse(args) -> int:
+    network = persistence.load(args.input, Canvas(pygame.Vector2()))
+    analysis = analyse_network(network)
+    if args.json:
+        json.dump(analysis, sys.stdout, indent=2)
+        print()
+    else:
+        for key, value in analysis.items():
+            print(f'{key:<20} {value}')
+    return 0
+
+
+def render(args) -> int:
+    canvas = Canvas(pygame.Vector2())
+    network = persistence.load(args.input, canvas)
+    min_x, min_y, max_x, max_y = _get_extent(network)
+    scale = args.scale or 1
+    width = args.width or min(MAX_RENDER_SIZE, int((max_x - min_x) * scale) + 2 * RENDER_MARGIN)
+    height = args.height or min(MAX_RENDER_SIZE, int((max_y - min_y) * scale) + 2 * RENDER_MARGIN)
+    if args.scale is None:
+        # Zoom out until the whole network fits on the image, with a smaller margin on small images. An empty network
+        # or an image too small to show the network at all is drawn at the smallest scale of the canvas.
+        margin = min(RENDER_MARGIN, width // 4, height // 4)
+        scale = max(Canvas.MIN_SCALE, min(1, (width - 2 * margin) / max(max_x - min_x, 1),
+                                          (height - 2 * margin) / max(max_y - min_y, 1)))
+    # Center the network on the image
+    canvas.scale = scale
+    canvas.offset = pygame.Vector2(width / 2 - (min_x + max_x) / 2 * scale, height / 2 + (min_y + max_y) / 2 * scale)
+
+    surface = pygame.Surface((width, height))
+    surface.fill(BACKGROUND_COLOR)
+    if args.grid:
+        Grid(canvas, args.grid).draw(surface)
+    network.draw(surface)
+    pygame.image.save(surface, args.output)
+    logger.info('rendered %sx%s image to %s', width, height, args.output)
+    return 0
+
+
+def validate_network(network: Network) -> list:
+    """
+    Checks the invariants of a network: tracks only refer to nodes of the network, connections are registered at both
+    nodes and are symmetric, no two nodes are within the merge distance of each other, and no two tracks intersect
+    away from a node.
+    :return: List of descriptions of the problems found
+    """
+    problems = []
+    for track in network.tracks.values():
+        for node in (track.node_a, track.node_b):
+            if network.nodes.get(node.id) is not node:
+                problems.append(f'track {track.id} refers to node {node.id}, which is not in the network')
+            elif track not in node.connections.tracks:
+                problems.append(f'track {track.id} is not registered at node {node.id}')
+        if track not in network.track_index:
+            problems.append(f'track {track.id} is not in the spatial index')
+
+    for node in network.nodes.values():
+        for track, connected in node.connections.tracks.items():
+            if network.tracks.get(track.id) is not track:
+                problems.append(f'node {node.id} refers to track {track.id}, which is not in the network')
+            for other in connected:
+                if track not in node.connections.tracks.get(other, ()):
+                    problems.append(f'connection of track {track.id} to track {other.id} at node {node.id} is not '
+                                    f'symmetric')
+        box = BoundingBox.expand((node.position.x, node.position.y, node.position.x, node.position.y),
+                                 Tolerance.merge)
+        for other in network.node_grid.query(box):
+            if other.id > node.id and other.position.distance_to(node.position) < Tolerance.merge:
+                problems.append(f'nodes {node.id} and {other.id} are closer than the merge distance')
+
+    for track in network.tracks.values():
+        candidates = [other for other in network.track_index.query(BoundingBox.expand(track.get_bounding_box(),
+                                                                                      BOUNDING_BOX_MARGIN))
+                      if other.id > track.id]
+        candidates.sort(key=lambda t: t.id)
+        for other, (intersects, intersections) in zip(candidates, util.intersects_tracks(track, candidates)):
+            for intersection in intersections:
+                if network.node_index.find(intersection, Tolerance.merge) is None:
+                    problems.append(f'tracks {track.id} and {other.id} intersect at ({intersection.x:.3f}, '
+                                    f'{intersection.y:.3f}) without a node')
+    return problems
+
+
+def analyse_network(network: Network) -> dict:
+    degrees = collections.Counter(len(node.connections.tracks) for node in network.nodes.values())
+    topology = Topology(network)
+    min_x, min_y, max_x, max_y = _get_extent(network)
+    analysis = {
+        'nodes': len(network.nodes),
+        'tracks': len(network.tracks),
+        'straight_tracks': sum(isinstance(track, StraightTrack) for track in network.tracks.values()),
+        'curved_tracks': sum(isinstance(track, CurvedTrack) for track in network.tracks.values()),
+        'total_length': sum(track.get_length() for track in network.tracks.values()),
+        'dead_ends': len(topology.get_dead_ends()),
+        'junctions': len(topology.get_junctions()),
+        'components': topology.get_component_count(),
+        'degrees': {degree: degrees[degree] for degree in sorted(degrees)},
+        'extent': [min_x, min_y, max_x, max_y],
+    }
+    topology.close()
+    return analysis
+
+
+def _get_extent(network: Network) -> (float, float, float, float):
+    if not network.nodes:
+        return 0, 0, 0, 0
+    boxes = [track.get_bounding_box() for track in network.tracks.values()]
+    boxes += [BoundingBox.expand((node.position.x, node.position.y, node.position.x, node.position.y), NODE_SIZE)
+              for node in network.nodes.values()]
+    return min(box[0] for box in boxes), min(box[1] for box in boxes), max(box[2] for box in boxes), \
+        max(box[3] for box in boxes)
+
+
+def _positive(convert):
+    """
+    :return: Argument type that converts the value with the given function and only accepts results above zero
+    """
+    def parse(value: str):
+        result = convert(value)
+        if result <= 0:
+            raise argparse.ArgumentTypeError(f'{value} is not above zero')
+        return result
+    return parse
+
+
+def _save(network: Network, path: str):
+    if path.endswith('.json'):
+        persistence.export_json(network, path)
+    else:
+        persistence.save(network, path)
+    logger.info('saved network to %s', path)
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('-v', '--verbose', action='count', default=0, help='Log progress, twice for debug output')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('build', help='Build a generated layout and save it')
+    command.add_argument('layout', choices=list(layouts.LAYOUTS))
+    command.add_argument('output')
+    command.add_argument('--size', type=int, default=1000, help='Number of tracks to generate')
+    command.add_argument('--seed', type=int, default=0)
+    command.add_argument('--workers', type=int, help='Number of processes to test the intersections in')
+    command.add_argument('--stats', action='store_true', help='Print the counters and timers of the build')
+    command.set_defaults(function=build)
+
+    command = commands.add_parser('validate', help='Check the invariants of a saved network')
+    command.add_argument('input')
+    command.set_defaults(function=validate)
+
+    command = commands.add_parser('save', help='Save a network in another format, e.g. as JSON')
+    command.add_argument('input')
+    command.add_argument('output')
+    command.set_defaults(function=save)
+
+    command = commands.add_parser('analyse', help='Print statistics of a saved network')
+    command.add_argument('input')
+    command.add_argument('--json', action='store_true', help='Print the statistics as JSON')
+    command.set_defaults(function=analyse)
+
+    command = commands.add_parser('render', help='Render a saved network to an image')
+    command.add_argument('input')
+    command.add_argument('output', help='Image file, the format follows from the extension (e.g. .png)')
+    command.add_argument('--width', type=_positive(int), help='Width in pixels, defaults to the extent of the network')
+    command.add_argument('--height', type=_positive(int),
+                         help='Height in pixels, defaults to the extent of the network')
+    command.add_argument('--grid', type=int, default=0, help='Draw a grid with the given spacing')
+    command.add_argument('--scale', type=_positive(float),
+                         help='Pixels per unit, defaults to the largest scale up to 1 that fits the whole network')
+    command.set_defaults(function=render)
+
+    args = parser.parse_args(argv)
+    levels = [logging.WARNING, logging.INFO, logging.DEBUG]
+    logging.basicConfig(level=levels[min(args.verbose, len(levels) - 1)], format='%(levelname)s %(name)s: %(message)s')
+    return args.function(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,187 +1,382 @@
 import math
+from fractions import Fraction
 from pygame import Vector2
 
+# Relative error bounds of evaluating the predicates in floating point, beyond which the sign of the result is certain.
+# The orientation bound is the one of Shewchuk's orient2d filter, (3 + 16 * e) * e for the unit roundoff e = 2 ** -53.
+# The other bounds follow the same way. For in_circle, the squared distance passes through four roundings (difference,
+# square, sum) and the squared radius through one, so their errors are at most (1 + e) ** 4 - 1 and e times their
+# values, and the subtraction keeps the sign: (4 + 32 * e) * e, where 32 * e covers the terms in e ** 2 and the
+# rounding of the bound itself. For line_in_circle, the squared radius times the squared length of the line passes
+# through six roundings, and the squared cross product is off by at most 9 * e times the squared sum of the
+# magnitudes of its two products: (10 + 64 * e) * e of the sum of both.
+ORIENTATION_ERROR_BOUND = 3.3306690738754716e-16
+IN_CIRCLE_ERROR_BOUND = 4.44089209850063e-16
+LINE_IN_CIRCLE_ERROR_BOUND = 1.1102230246251573e-15
+
+
+class Tolerance:
+    """
+    Tolerances shared by the geometry functions and the network. Points closer than epsilon are the same point to Geom:
+    endpoints within epsilon of a track touch it, lines and circles within epsilon of touching a circle are tangent to
+    it, and intersections within epsilon of the end of a segment are snapped to that end. Nodes closer than merge are
+    the same node to the network, so intersections within merge of a node are snapped to the node. Set both before
+    creating networks; merge has to be at least epsilon.
+    """
+    epsilon = 1e-6
+    merge = 1
+
+    @staticmethod
+    def angle(radius: float) -> float:
+        """
+        :return: Angle along a circle with the given radius that corresponds to epsilon
+        """
+        return Tolerance.epsilon / radius if radius > 0 else math.pi
+
 
 class Geom:
     @staticmethod
     def full_angle_to_horizon(vector: Vector2) -> float:
         return math.radians(Vector2(1, 0).angle_to(vector) % 360)
 
+    @staticmethod
+    def orientation(a: Vector2, b: Vector2, c: Vector2) -> int:
+        """
+        Exact orientation predicate, evaluated in floating point unless the result is too close to zero to tell.
+        :return: 1 if c lies left of the line from a to b, -1 if it lies right of it and 0 if it lies on it
+        """
+        left = (a.x - c.x) * (b.y - c.y)
+        right = (a.y - c.y) * (b.x - c.x)
+        det = left - right
+        # The sign is certain if one of the products is zero or their signs differ
+        if left == 0 or right == 0 or (left > 0) != (right > 0):
+            return (det > 0) - (det < 0)
+        bound = ORIENTATION_ERROR_BOUND * (math.fabs(left) + math.fabs(right))
+        if det > bound:
+            return 1
+        if det < -bound:
+            return -1
+        ax, ay, bx, by, cx, cy = (Fraction(value) for value in (a.x, a.y, b.x, b.y, c.x, c.y))
+        det = (ax - cx) * (by - cy) - (ay - cy) * (bx - cx)
+        return (det > 0) - (det < 0)
+
+    @staticmethod
+    def in_circle(point: Vector2, center: Vector2, radius: float) -> int:
+        """
+        Exact in-circle predicate, evaluated in floating point unless the result is too close to zero to tell.
+        :return: 1 if the point lies inside the circle, -1 if it lies outside of it and 0 if it lies on it
+        """
+        dx = point.x - center.x
+        dy = point.y - center.y
+        squared_radius = radius * radius
+        squared_distance = dx * dx + dy * dy
+        det = squared_radius - squared_distance
+        bound = IN_CIRCLE_ERROR_BOUND * (squared_radius + squared_distance)
+        if det > bound:
+            return 1
+        if det < -bound:
+            return -1
+        dx = Fraction(point.x) - Fraction(center.x)
+        dy = Fraction(point.y) - Fraction(center.y)
+        det = Fraction(radius) ** 2 - dx * dx - dy * dy
+        return (det > 0) - (det < 0)
+
+    @staticmethod
+    def line_in_circle(p1: Vector2, p2: Vector2, center: Vector2, radius: float) -> int:
+        """
+        Exact predicate of the distance between a line and a point, evaluated in floating point unless the result is
+        too close to zero to tell.
+        :return: 1 if the line through p1 and p2 crosses the circle, -1 if it misses it and 0 if it touches it
+        """
+        ux = p2.x - p1.x
+        uy = p2.y - p1.y
+        vx = center.x - p1.x
+        vy = center.y - p1.y
+        left = ux * vy
+        right = uy * vx
+        cross = left - right
+        squared_radius_length = radius * radius * (ux * ux + uy * uy)
+        det = squared_radius_length - cross * cross
+        magnitude = math.fabs(left) + math.fabs(right)
+        bound = LINE_IN_CIRCLE_ERROR_BOUND * (squared_radius_length + magnitude * magnitude)
+        if det > bound:
+            return 1
+        if det < -bound:
+            return -1
+        x1, y1, x2, y2, cx, cy = (Fraction(value) for value in (p1.x, p1.y, p2.x, p2.y, center.x, center.y))
+        ux = x2 - x1
+        uy = y2 - y1
+        cross = ux * (cy - y1) - uy * (cx - x1)
+        det = Fraction(radius) ** 2 * (ux * ux + uy * uy) - cross * cross
+        return (det > 0) - (det < 0)
+
+    @staticmethod
+    def get_sweep(start_angle: float, stop_angle: float) -> float:
+        """
+        :return: Angle from the start to the stop angle, counter clockwise
+        """
+        sweep = stop_angle - start_angle
+        return sweep if 0 <= sweep <= 2 * math.pi else sweep % (2 * math.pi)
+
+    @staticmethod
+    def get_arc_segments(radius: float, sweep: float, tolerance: float) -> int:
+        """
+        :return: Number of equal chords an arc has to be divided into, so that no chord is further than the tolerance
+            away from the arc
+        """
+        if tolerance >= radius:
+            return max(1, math.ceil(sweep / math.pi))
+        return max(1, math.ceil(sweep / (2 * math.acos(1 - tolerance / radius))))
+
+    @staticmethod
+    def is_angle_on_arc(start_angle: float, stop_angle: float, angle: float, tolerance: float = 0) -> bool:
+        """
+        :return: Whether the angle lies on the arc that runs counter clockwise from the start to the stop angle,
+            including its ends and the given tolerance beyond them
+        """
+        offset = (angle - start_angle) % (2 * math.pi)
+        return offset <= Geom.get_sweep(start_angle, stop_angle) + tolerance or offset >= 2 * math.pi - tolerance
+
     @staticmethod
     def intersects_line_segment_line_segment(p1: Vector2, p2: Vector2, p3: Vector2, p4: Vector2) -> (bool, list):
+        """
+        An end of one segment within epsilon of the other segment touches it. Otherwise the segments intersect if they
+        cross, as decided by the orientation predicate. Collinear segments do not intersect.
+        """
+        epsilon = Tolerance.epsilon
         x1, y1 = p1.x, p1.y
         x2, y2 = p2.x, p2.y
         x3, y3 = p3.x, p3.y
         x4, y4 = p4.x, p4.y
         D = (y4 - y3) * (x2 - x1) - (x4 - x3) * (y2 - y1)
-        if D == 0:  # parallel
+        if D != 0:
+            ua = ((x4 - x3) * (y1 - y3) - (y4 - y3) * (x1 - x3)) / D
+            ub = ((x2 - x1) * (y1 - y3) - (y2 - y1) * (x1 - x3)) / D
+            # An end within epsilon of the other line lies within these margins of the parameter range, so the lines
+            # crossing beyond them rules out any intersection (twice the margin, to cover rounding)
+            margin_a = 2 * epsilon * math.hypot(x4 - x3, y4 - y3) / math.fabs(D)
+            margin_b = 2 * epsilon * math.hypot(x2 - x1, y2 - y1) / math.fabs(D)
+            if ua < -margin_a or ua > 1 + margin_a or ub < -margin_b or ub > 1 + margin_b:
+                return False, []
+
+        o1 = Geom.orientation(p1, p2, p3)
+        o2 = Geom.orientation(p1, p2, p4)
+        if o1 == 0 and o2 == 0:  # collinear
             return False, []
-        ua = ((x4 - x3) * (y1 - y3) - (y4 - y3) * (x1 - x3)) / D
-        if ua < 0 or ua > 1:  # out of range
+        o3 = Geom.orientation(p3, p4, p1)
+        o4 = Geom.orientation(p3, p4, p2)
+
+        touching = []
+        for point, a, b in ((p1, p3, p4), (p2, p3, p4), (p3, p1, p2), (p4, p1, p2)):
+            if Geom._is_touching(point, a, b) and all(point.distance_to(other) > epsilon for other in touching):
+                touching.append(point)
+        if len(touching) == 1:
+            return True, [Vector2(touching[0])]
+        if touching:  # touching at two distinct points, i.e. overlapping within epsilon
             return False, []
-        ub = ((x2 - x1) * (y1 - y3) - (y2 - y1) * (x1 - x3)) / D
-        if ub < 0 or ub > 1:  # out of range
+
+        if o1 * o2 > 0 or o3 * o4 > 0 or D == 0:
             return False, []
-        x = x1 + ua * (x2 - x1)
-        y = y1 + ua * (y2 - y1)
-        return True, [Vector2(x, y)]
+        ua = max(0, min(1, ua))
+        return True, [Vector2(x1 + ua * (x2 - x1), y1 + ua * (y2 - y1))]
 
     @staticmethod
     def intersects_line_segment_circle_segment(p1: Vector2, p2: Vector2, center: Vector2, radius: float,
-                                               start_angle: float, stop_angle: float, epsilon: float = 0.01) -> (
-            bool, list):
-        intersections_found, intersections = Geom.intersects_line_circle(p1, p2, center, radius, epsilon)
-        if len(intersections) == 0 or len(intersections) == 1:
-            return intersections_found, intersections
-        else:
-            i1 = intersections[0]
-            i2 = intersections[1]
-            i1_on_lin_segment = not (
-                    i1.x < p1.x and i1.x < p2.x or
-                    i1.x > p1.x and i1.x > p2.x or
-                    i1.y > p1.y and i1.y > p2.y or
-                    i1.y < p1.y and i1.y < p2.y)
-            i2_on_line_segment = not (
-                    i2.x < p1.x and i2.x < p2.x or
-                    i2.x > p1.x and i2.x > p2.x or
-                    i2.y > p1.y and i2.y > p2.y or
-                    i2.y < p1.y and i2.y < p2.y)
-            i1_angle = Geom.full_angle_to_horizon(i1 - center)
-            i2_angle = Geom.full_angle_to_horizon(i2 - center)
-            i1_on_circle_segment = Geom._satisfies_angles(start_angle, stop_angle, i1_angle)
-            i2_on_circle_segment = Geom._satisfies_angles(start_angle, stop_angle, i2_angle)
-
-            true_intersections = []
-            if i1_on_lin_segment and i1_on_circle_segment:
-                true_intersections.append(i1)
-            if i2_on_line_segment and i2_on_circle_segment:
-                true_intersections.append(i2)
-
-            return len(true_intersections) > 0, true_intersections
+                                               start_angle: float, stop_angle: float) -> (bool, list):
+        # A segment with both ends inside the circle can not reach it
+        inner_radius = radius - Tolerance.epsilon
+        if inner_radius > 0 and Geom.in_circle(p1, center, inner_radius) > 0 and \
+                Geom.in_circle(p2, center, inner_radius) > 0:
+            return False, []
+        intersections_found, intersections = Geom.intersects_line_circle(p1, p2, center, radius)
+        if not intersections_found:
+            return False, []
+
+        ends = (p1, p2) + Geom._get_arc_ends(center, radius, start_angle, stop_angle)
+        true_intersections = [Geom._snap(intersection, ends) for intersection in intersections
+                              if Geom.distance_point_line_segment(intersection, p1, p2) <= Tolerance.epsilon and
+                              Geom._is_on_circle_segment(intersection, center, radius, start_angle, stop_angle)]
+        return len(true_intersections) > 0, true_intersections
 
     @staticmethod
     def intersects_circle_segment_circle_segment(a_center: Vector2, a_radius: float, a_start_angle: float,
                                                  a_stop_angle: float, b_center: Vector2, b_radius: float,
-                                                 b_start_angle: float, b_stop_angle: float, epsilon: float = 0.01) -> (
-            bool, list):
-        intersections_found, intersections = Geom.intersects_circle_circle(a_center, a_radius, b_center, b_radius, epsilon)
-
+                                                 b_start_angle: float, b_stop_angle: float) -> (bool, list):
+        intersections_found, intersections = Geom.intersects_circle_circle(a_center, a_radius, b_center, b_radius)
         if not intersections_found:
             return False, []
 
-        i1 = intersections[0]
-        i2 = intersections[1]
-
-        i1_angle_circle_a = Geom.full_angle_to_horizon(i1 - a_center)
-        i2_angle_circle_a = Geom.full_angle_to_horizon(i2 - a_center)
-        i1_angle_circle_b = Geom.full_angle_to_horizon(i1 - b_center)
-        i2_angle_circle_b = Geom.full_angle_to_horizon(i2 - b_center)
-        i1_satisfies_a_angles = Geom._satisfies_angles(a_start_angle, a_stop_angle, i1_angle_circle_a)
-        i2_satisfies_a_angles = Geom._satisfies_angles(a_start_angle, a_stop_angle, i2_angle_circle_a)
-        i1_satisfies_b_angles = Geom._satisfies_angles(b_start_angle, b_stop_angle, i1_angle_circle_b)
-        i2_satisfies_b_angles = Geom._satisfies_angles(b_start_angle, b_stop_angle, i2_angle_circle_b)
-
-        true_intersections = []
-        if i1_satisfies_a_angles and i1_satisfies_b_angles:
-            true_intersections.append(i1)
-        if i2_satisfies_a_angles and i2_satisfies_b_angles:
-            true_intersections.append(i2)
-
+        ends = Geom._get_arc_ends(a_center, a_radius, a_start_angle, a_stop_angle) + \
+            Geom._get_arc_ends(b_center, b_radius, b_start_angle, b_stop_angle)
+        true_intersections = [Geom._snap(intersection, ends) for intersection in intersections
+                              if Geom._is_on_circle_segment(intersection, a_center, a_radius, a_start_angle,
+                                                            a_stop_angle) and
+                              Geom._is_on_circle_segment(intersection, b_center, b_radius, b_start_angle,
+                                                         b_stop_angle)]
         return len(true_intersections) > 0, true_intersections
 
     @staticmethod
-    def intersects_line_segment_circle(p1: Vector2, p2: Vector2, center: Vector2, radius: float, epsilon: float = 0.01) -> (bool, list):
-        return Geom.intersects_line_segment_circle_segment(p1, p2, center, radius, 0, 2 * math.pi, epsilon)
+    def intersects_line_segment_circle(p1: Vector2, p2: Vector2, center: Vector2, radius: float) -> (bool, list):
+        return Geom.intersects_line_segment_circle_segment(p1, p2, center, radius, 0, 2 * math.pi)
 
     @staticmethod
     def intersects_circle_segment_circle(a_center: Vector2, a_radius: float, a_start_angle: float,
-                                                 a_stop_angle: float, b_center: Vector2, b_radius: float, epsilon: float = 0.01) -> (bool, list):
-        return Geom.intersects_circle_segment_circle_segment(a_center, a_radius, a_start_angle, a_stop_angle, b_center, b_radius, 0, 2 * math.pi, epsilon)
+                                         a_stop_angle: float, b_center: Vector2, b_radius: float) -> (bool, list):
+        return Geom.intersects_circle_segment_circle_segment(a_center, a_radius, a_start_angle, a_stop_angle, b_center,
+                                                             b_radius, 0, 2 * math.pi)
 
     @staticmethod
-    def intersects_circle_circle(a_center: Vector2, a_radius: float, b_center: Vector2, b_radius: float,
-                                 epsilon: float = 0.01) -> (bool, list):
+    def intersects_circle_circle(a_center: Vector2, a_radius: float, b_center: Vector2, b_radius: float) -> (
+            bool, list):
         """
         Computes the intersection points between two circles given by a_center with a_radius and b_center with b_radius.
+        Circles within epsilon of touching are tangent and intersect once. Concentric circles do not intersect.
         Implementation based on
         https://www.petercollingridge.co.uk/tutorials/computational-geometry/circle-circle-intersections/
         :param a_center: Center of circle A
         :param a_radius: Radius of circle A
         :param b_center: Center of circle B
         :param b_radius: Radius of circle B
-        :param epsilon: Epsilon value
-        :return: 1. The number of intersections found; 2. The first intersection, or None; 3. The second intersection,
-            or None
+        :return: 1. Whether the circles intersect; 2. The intersection points
         """
-        # Compute distance between centers
-        dx = a_center.x - b_center.x
-        dy = a_center.y - b_center.y
-        d = math.sqrt(dx * dx + dy * dy)
-
-        # TODO: introduce epsilon here
-        if d > a_radius + b_radius:
-            return False, []
-        if d < math.fabs(a_radius - b_radius):
+        epsilon = Tolerance.epsilon
+        # The distance between the centers is compared with the exact in-circle predicate, so that the decisions do
+        # not depend on the rounding of the distance
+        if Geom.in_circle(b_center, a_center, epsilon) >= 0:
             return False, []
-
-        # assumption that circles with the same center and radii are not valid input and never overlap
-        if d == 0:
+        outer = a_radius + b_radius
+        inner = math.fabs(a_radius - b_radius)
+        if Geom.in_circle(b_center, a_center, outer + epsilon) < 0 or \
+                inner - epsilon > 0 and Geom.in_circle(b_center, a_center, inner - epsilon) > 0:
             return False, []
 
         # Compute a and h values, as described in the documentation link
+        d = a_center.distance_to(b_center)
         a = ((a_radius * a_radius) - (b_radius * b_radius) + (d * d)) / (2 * d)
-        h = math.sqrt((a_radius * a_radius) - (a * a))
 
         # Compute the coordinate of the line of intersection and the connecting vector between A and B
-        v = (b_center - a_center).normalize()
+        v = (b_center - a_center) / d
         p = a_center + v * a
+        if outer - epsilon <= 0 or Geom.in_circle(b_center, a_center, outer - epsilon) <= 0 or \
+                Geom.in_circle(b_center, a_center, inner + epsilon) >= 0:
+            return True, [p]
 
         # Compute the intersection points based on the intersection line
+        h = math.sqrt(max(0, (a_radius * a_radius) - (a * a)))
         p1 = p + h * VectorUtil.rotate_clockwise(v)
         p2 = p + h * VectorUtil.rotate_counter_clockwise(v)
 
         return True, [p1, p2]
 
     @staticmethod
-    def intersects_line_circle(p1: Vector2, p2: Vector2, center: Vector2, radius: float, epsilon: float = 0.01) -> (
-            bool, list):
+    def intersects_line_circle(p1: Vector2, p2: Vector2, center: Vector2, radius: float) -> (bool, list):
         """
         Computes the intersection point(s) between a line given by p1 and p2, and a circle given by center and radius.
-        Based on https://stackoverflow.com/questions/23016676/line-segment-and-circle-intersection
+        A line within epsilon of touching the circle is tangent to it and intersects it once, at its point closest to
+        the center.
         :param p1: Line point 1
         :param p2: Line point 2
         :param center: Center of the circle
         :param radius: Radius of the circle
-        :param epsilon: Epsilon value
-        :return: 1. The number of intersections found; 2. The first intersection, or None; 3. The second intersection,
-            or None
-        """
-        dx = p1.x - p2.x
-        dy = p1.y - p2.y
-        A = dx * dx + dy * dy
-        B = 2 * (dx * (p1.x - center.x) + dy * (p1.y - center.y))
-        C = (p1.x - center.x) ** 2 + (p1.y - center.y) ** 2 - radius ** 2
-        det = B * B - 4 * A * C
-        if A <= epsilon or det < 0:
+        :return: 1. Whether the line intersects the circle; 2. The intersection points, in order from p1 to p2
+        """
+        epsilon = Tolerance.epsilon
+        if Geom.in_circle(p2, p1, epsilon) >= 0:
             return False, []
-        elif det == 0:
-            t = -B / (2 * A)
-            i1 = Vector2(p1.x + t * dx, p1.y + t * dy)
-            return True, [i1]
-        else:
-            t1 = ((-B + math.sqrt(det)) / (2 * A))
-            t2 = ((-B - math.sqrt(det)) / (2 * A))
-            i1 = Vector2(p1.x + t1 * dx, p1.y + t1 * dy)
-            i2 = Vector2(p1.x + t2 * dx, p1.y + t2 * dy)
-            return True, [i1, i2]
-
-    @staticmethod
-    def _satisfies_angles(start_angle, stop_angle, intersection_angle) -> bool:
-        if start_angle < stop_angle and start_angle < intersection_angle < stop_angle:
-            return True
-        elif start_angle > stop_angle and (start_angle < intersection_angle or intersection_angle < stop_angle):
-            return True
-        return False
+        if Geom.line_in_circle(p1, p2, center, radius + epsilon) < 0:
+            return False, []
+        direction = p2 - p1
+        length_squared = direction.length_squared()
+        t = (center - p1).dot(direction) / length_squared
+        closest = p1 + direction * t
+        if radius - epsilon <= 0 or Geom.line_in_circle(p1, p2, center, radius - epsilon) <= 0:
+            return True, [closest]
+        distance = closest.distance_to(center)
+        offset = math.sqrt(max(0, radius * radius - distance * distance)) / math.sqrt(length_squared)
+        return True, [p1 + direction * (t - offset), p1 + direction * (t + offset)]
+
+    @staticmethod
+    def distance_point_line(point: Vector2, p1: Vector2, p2: Vector2) -> float:
+        """
+        :return: Distance from the point to the line through p1 and p2
+        """
+        line = p2 - p1
+        length = line.length()
+        if length == 0:
+            return point.distance_to(p1)
+        return math.fabs(line.cross(point - p1)) / length
+
+    @staticmethod
+    def distance_point_line_segment(point: Vector2, p1: Vector2, p2: Vector2) -> float:
+        segment = p2 - p1
+        length_squared = segment.length_squared()
+        if length_squared == 0:
+            return point.distance_to(p1)
+        t = max(0, min(1, (point - p1).dot(segment) / length_squared))
+        return point.distance_to(p1 + segment * t)
+
+    @staticmethod
+    def simplify_polyline(points: list, tolerance: float) -> list:
+        """
+        Simplifies a polyline with the Douglas-Peucker algorithm: the point furthest from the line between the ends is
+        kept if it is further away than the tolerance, and both halves are simplified the same way.
+        :return: The points of the polyline that are kept, including both ends
+        """
+        if len(points) < 3:
+            return list(points)
+        keep = [False] * len(points)
+        keep[0] = keep[-1] = True
+        ranges = [(0, len(points) - 1)]
+        while ranges:
+            first, last = ranges.pop()
+            furthest = None
+            furthest_distance = tolerance
+            for i in range(first + 1, last):
+                distance = Geom.distance_point_line_segment(points[i], points[first], points[last])
+                if distance > furthest_distance:
+                    furthest = i
+                    furthest_distance = distance
+            if furthest is not None:
+                keep[furthest] = True
+                ranges.append((first, furthest))
+                ranges.append((furthest, last))
+        return [point for point, kept in zip(points, keep) if kept]
+
+    @staticmethod
+    def distance_point_circle_segment(point: Vector2, center: Vector2, radius: float, start_angle: float,
+                                      stop_angle: float) -> float:
+        if Geom.is_angle_on_arc(start_angle, stop_angle, Geom.full_angle_to_horizon(point - center)):
+            return math.fabs(point.distance_to(center) - radius)
+        start, stop = Geom._get_arc_ends(center, radius, start_angle, stop_angle)
+        return min(point.distance_to(start), point.distance_to(stop))
+
+    @staticmethod
+    def _is_touching(point: Vector2, p1: Vector2, p2: Vector2) -> bool:
+        epsilon = Tolerance.epsilon
+        if point.x < min(p1.x, p2.x) - epsilon or point.x > max(p1.x, p2.x) + epsilon or \
+                point.y < min(p1.y, p2.y) - epsilon or point.y > max(p1.y, p2.y) + epsilon:
+            return False
+        return Geom.distance_point_line_segment(point, p1, p2) <= epsilon
+
+    @staticmethod
+    def _is_on_circle_segment(point: Vector2, center: Vector2, radius: float, start_angle: float,
+                              stop_angle: float) -> bool:
+        return Geom.is_angle_on_arc(start_angle, stop_angle, Geom.full_angle_to_horizon(point - center),
+                                    Tolerance.angle(radius))
+
+    @staticmethod
+    def _get_arc_ends(center: Vector2, radius: float, start_angle: float, stop_angle: float) -> (Vector2, Vector2):
+        return center + VectorUtil.from_angle(start_angle) * radius, center + VectorUtil.from_angle(stop_angle) * radius
+
+    @staticmethod
+    def _snap(point: Vector2, ends) -> Vector2:
+        """
+        :return: Copy of the first end within epsilon of the point, or the point itself
+        """
+        for end in ends:
+            if point.distance_to(end) <= Tolerance.epsilon:
+                return Vector2(end)
+        return point
 
 
 class VectorUtil:
@@ -0,0 +1,155 @@
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Segments at a smaller angle than this are too close to parallel to decide in floating point
+PARALLEL_SINE = 1e-9
+
+
+class GeomBatch:
+    """
+    Vectorized counterparts of the intersection tests in Geom. Points are arrays of shape (n, 2) and scalars are arrays
+    of shape (n,); all arguments broadcast against each other, so one track can be tested against many by passing its
+    values as shape (2,) and () arrays.
+
+    Every test returns a boolean mask and the intersection points, computed with the same floating point operations as
+    Geom, and a mask of the undecided pairs. A pair is undecided when it is within the margin of one of the tolerances
+    of Geom, where Geom uses exact predicates and snaps points to the ends: touching or tangent tracks, points near the
+    ends, and near parallel segments or concentric circles. Straight segments that share an end are decided, as Geom
+    snaps them to that end. The mask and points are only valid for the other pairs, so the undecided pairs have to be
+    tested with Geom. The margin has to be well above Tolerance.epsilon.
+    """
+    @staticmethod
+    def is_available() -> bool:
+        return np is not None
+
+    @staticmethod
+    def intersects_line_segment_line_segment(p1, p2, p3, p4, margin: float):
+        """
+        :return: 1. Mask of shape (n, 1); 2. Intersection points of shape (n, 1, 2); 3. Mask of shape (n,) of the
+            undecided pairs
+        """
+        x1, y1 = p1[..., 0], p1[..., 1]
+        x2, y2 = p2[..., 0], p2[..., 1]
+        x3, y3 = p3[..., 0], p3[..., 1]
+        x4, y4 = p4[..., 0], p4[..., 1]
+        D = (y4 - y3) * (x2 - x1) - (x4 - x3) * (y2 - y1)
+        length_a = np.hypot(x2 - x1, y2 - y1)
+        length_b = np.hypot(x4 - x3, y4 - y3)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ua = ((x4 - x3) * (y1 - y3) - (y4 - y3) * (x1 - x3)) / D
+            ub = ((x2 - x1) * (y1 - y3) - (y2 - y1) * (x1 - x3)) / D
+            # An end within the margin of the other segment lies within these margins of the parameter range
+            margin_a = margin * length_b / np.fabs(D)
+            margin_b = margin * length_a / np.fabs(D)
+            points = np.stack([x1 + ua * (x2 - x1), y1 + ua * (y2 - y1)], axis=-1)
+        parallel = ~(np.fabs(D) > PARALLEL_SINE * length_a * length_b)
+        outside = (ua < -margin_a) | (ua > 1 + margin_a) | (ub < -margin_b) | (ub > 1 + margin_b)
+        inside = (ua > margin_a) & (ua < 1 - margin_a) & (ub > margin_b) & (ub < 1 - margin_b)
+
+        # Segments that share exactly one end touch there and nowhere else, as long as the other ends are further than
+        # the margin from the other line. Geom then returns the shared end, as the parameters are exactly 0 or 1.
+        shared_13 = (x1 == x3) & (y1 == y3)
+        shared_14 = (x1 == x4) & (y1 == y4)
+        shared_23 = (x2 == x3) & (y2 == y3)
+        shared_24 = (x2 == x4) & (y2 == y4)
+        shared_1 = shared_13 | shared_14
+        shared_3 = shared_13 | shared_23
+        shared_x = np.where(shared_1, x1, x2)
+        shared_y = np.where(shared_1, y1, y2)
+        other_a_x, other_a_y = np.where(shared_1, x2, x1), np.where(shared_1, y2, y1)
+        other_b_x, other_b_y = np.where(shared_3, x4, x3), np.where(shared_3, y4, y3)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            distance_a = np.fabs((x4 - x3) * (other_a_y - shared_y) - (y4 - y3) * (other_a_x - shared_x)) / length_b
+            distance_b = np.fabs((x2 - x1) * (other_b_y - shared_y) - (y2 - y1) * (other_b_x - shared_x)) / length_a
+        single = shared_13.astype(int) + shared_14 + shared_23 + shared_24 == 1
+        touching = single & ~parallel & (distance_a > margin) & (distance_b > margin)
+
+        mask = ~parallel & inside | touching
+        points = np.where(touching[..., None], np.stack([shared_x, shared_y], axis=-1), points)
+        return mask[..., None], points[..., None, :], (parallel | ~(outside | inside)) & ~touching
+
+    @staticmethod
+    def intersects_line_segment_circle_segment(p1, p2, center, radius, start_angle, stop_angle, margin: float):
+        """
+        :return: 1. Mask of shape (n, 2); 2. Intersection points of shape (n, 2, 2), in order from p1 to p2; 3. Mask of
+            shape (n,) of the undecided pairs
+        """
+        x1, y1 = p1[..., 0], p1[..., 1]
+        dx = p2[..., 0] - x1
+        dy = p2[..., 1] - y1
+        cx, cy = center[..., 0], center[..., 1]
+        length_squared = dx * dx + dy * dy
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = ((cx - x1) * dx + (cy - y1) * dy) / length_squared
+            closest_x = x1 + dx * t
+            closest_y = y1 + dy * t
+            distance = np.sqrt((closest_x - cx) * (closest_x - cx) + (closest_y - cy) * (closest_y - cy))
+            offset = np.sqrt(np.maximum(0, radius * radius - distance * distance)) / np.sqrt(length_squared)
+            s = np.stack([t - offset, t + offset], axis=-1)
+            segment_margin = (margin / np.sqrt(length_squared))[..., None]
+            points = np.stack([x1[..., None] + dx[..., None] * s, y1[..., None] + dy[..., None] * s], axis=-1)
+
+        missing = distance > radius + margin
+        crossing = ~(length_squared <= margin * margin) & (distance < radius - margin)
+        on_segment = (s > segment_margin) & (s < 1 - segment_margin)
+        off_segment = (s < -segment_margin) | (s > 1 + segment_margin)
+        on_arc, off_arc = GeomBatch._get_arc_masks(points, center, radius, start_angle, stop_angle, margin)
+        mask = crossing[..., None] & on_segment & on_arc
+        decided = off_segment | on_segment & (on_arc | off_arc)
+        return mask, points, ~missing & ~(crossing & decided.all(axis=-1))
+
+    @staticmethod
+    def intersects_circle_segment_circle_segment(a_center, a_radius, a_start_angle, a_stop_angle, b_center, b_radius,
+                                                 b_start_angle, b_stop_angle, margin: float):
+        """
+        :return: 1. Mask of shape (n, 2); 2. Intersection points of shape (n, 2, 2); 3. Mask of shape (n,) of the
+            undecided pairs
+        """
+        dx = b_center[..., 0] - a_center[..., 0]
+        dy = b_center[..., 1] - a_center[..., 1]
+        d = np.sqrt(dx * dx + dy * dy)
+        outer = a_radius + b_radius
+        inner = np.fabs(a_radius - b_radius)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            a = ((a_radius * a_radius) - (b_radius * b_radius) + (d * d)) / (2 * d)
+            h = np.sqrt(np.maximum(0, (a_radius * a_radius) - (a * a)))
+            # Dividing a Vector2 by a number multiplies it by the reciprocal
+            inverse = 1 / d
+            vx = dx * inverse
+            vy = dy * inverse
+            px = a_center[..., 0] + vx * a
+            py = a_center[..., 1] + vy * a
+            # Offsets along v rotated clockwise and counter clockwise
+            points = np.stack([np.stack([px + h * vy, py + h * -vx], axis=-1),
+                               np.stack([px + h * -vy, py + h * vx], axis=-1)], axis=-2)
+
+        missing = (d > margin) & ((d > outer + margin) | (d < inner - margin))
+        crossing = (d > margin) & (d < outer - margin) & (d > inner + margin)
+        on_a, off_a = GeomBatch._get_arc_masks(points, a_center, a_radius, a_start_angle, a_stop_angle, margin)
+        on_b, off_b = GeomBatch._get_arc_masks(points, b_center, b_radius, b_start_angle, b_stop_angle, margin)
+        mask = crossing[..., None] & on_a & on_b
+        decided = on_a & on_b | off_a | off_b
+        return mask, points, ~missing & ~(crossing & decided.all(axis=-1))
+
+    @staticmethod
+    def _get_arc_masks(points, center, radius, start_angle, stop_angle, margin: float):
+        """
+        :param points: Points on the circle, of shape (n, k, 2)
+        :return: 1. Mask of shape (n, k) of the points on the arc further than the margin from its ends; 2. Mask of the
+            points off the arc further than the margin from its ends
+        """
+        two_pi = 2 * math.pi
+        angles = np.arctan2(points[..., 1] - center[..., None, 1], points[..., 0] - center[..., None, 0])
+        start_angle = np.asarray(start_angle)[..., None]
+        stop_angle = np.asarray(stop_angle)[..., None]
+        offset = np.mod(angles - start_angle, two_pi)
+        sweep = stop_angle - start_angle
+        sweep = np.where((sweep >= 0) & (sweep <= two_pi), sweep, np.mod(sweep, two_pi))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            angle_margin = (margin / np.asarray(radius, dtype=float))[..., None]
+        return (offset > angle_margin) & (offset < sweep - angle_margin), \
+            (offset > sweep + angle_margin) & (offset < two_pi - angle_margin)
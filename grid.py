@@ -3,22 +3,30 @@ import pygame
 
 
 class Grid:
-    def __init__(self, canvas, grid_dimension, screen_width, screen_height):
+    def __init__(self, canvas, grid_dimension):
         self.canvas = canvas
         self.grid_dimension = grid_dimension
-        self.screen_width = screen_width
-        self.screen_height = screen_height
         self.color = (50, 50, 50)
         self.width = 1
 
+    def get_spacing(self) -> float:
+        """
+        :return: Distance between the lines in pixels. The distance in the world is the grid dimension times a power of
+            two, chosen so that the lines are between half and one grid dimension apart on the screen at every zoom.
+        """
+        scale = self.canvas.scale
+        return self.grid_dimension * 2.0 ** math.floor(-math.log2(scale)) * scale
+
     def draw(self, surface):
-        x_ticks = math.floor(self.screen_width / self.grid_dimension) + 1
-        y_ticks = math.floor(self.screen_height / self.grid_dimension) + 1
+        width, height = surface.get_size()
+        spacing = self.get_spacing()
+        x_ticks = math.floor(width / spacing) + 1
+        y_ticks = math.floor(height / spacing) + 1
         for i in range(x_ticks):
-            offset = self.canvas.offset[0] % self.grid_dimension
-            x = i * self.grid_dimension + offset
-            pygame.draw.line(surface, self.color, (x, 0), (x, self.screen_height), self.width)
+            offset = self.canvas.offset[0] % spacing
+            x = i * spacing + offset
+            pygame.draw.line(surface, self.color, (x, 0), (x, height), self.width)
         for i in range(y_ticks):
-            offset = self.canvas.offset[1] % self.grid_dimension
-            y = i * self.grid_dimension + offset
-            pygame.draw.line(surface, self.color, (0, y), (self.screen_width, y), self.width)
+            offset = self.canvas.offset[1] % spacing
+            y = i * spacing + offset
+            pygame.draw.line(surface, self.color, (0, y), (width, y), self.width)
@@ -1,10 +1,8 @@
 import pygame
-from typing import Optional
 
 import network
 from input import Mouse
 from network import Network, StraightTrack, CurvedTrack
-from geom import Geom
 from canvas import Canvas
 
 
@@ -18,6 +16,8 @@ class Gui:
     MOUSE_HIT_AREA = 30
     SELECTED_TRACK_COLOR = (100, 255, 100)
     CONNECTED_TRACK_COLOR = (100, 100, 200)
+    STATS_FONT_SIZE = 20
+    STATS_LINE_SPACING = 2
 
     def __init__(self, mouse: Mouse, font: pygame.font.Font, canvas: Canvas, screen_width: int, screen_height: int, network: Network):
         self.mouse = mouse
@@ -26,22 +26,42 @@ class Gui:
         self.screen_width = screen_width
         self.screen_height = screen_height
         self.network = network
-        pass
+        self.stats_font = pygame.font.SysFont(None, self.STATS_FONT_SIZE)
+        self.show_stats = False
 
     def draw(self, screen: pygame.surface.Surface):
-        selected_track = None
-        mouse_position = self.mouse.current_position - self.canvas.offset
-        mouse_circle_center = pygame.Vector2(mouse_position[0], -mouse_position[1])
+        mouse_circle_center = self.canvas.to_world(self.mouse.current_position)
 
-        selected_track = self._get_track_near_position(mouse_circle_center, self.MOUSE_HIT_AREA)
-        selected_node = self._get_node_near_position(mouse_circle_center, self.MOUSE_HIT_AREA)
+        selected = self.network.query_point(mouse_circle_center, self.MOUSE_HIT_AREA / self.canvas.scale)
+        if isinstance(selected, network.Node):
+            self._show_node_info(screen, selected)
+        elif isinstance(selected, network.Track):
+            self._show_track_info(screen, selected)
+        if self.show_stats:
+            self._show_stats(screen)
 
-        if selected_track is None and selected_node is None:
-            return
-        elif selected_node is not None:
-            self._show_node_info(screen, selected_node)
-        elif selected_track is not None:
-            self._show_track_info(screen, selected_track)
+    def toggle_stats(self):
+        """
+        Shows or hides the stats overlay. The stats of the network and the canvas are only collected while it is shown.
+        """
+        self.show_stats = not self.show_stats
+        self.network.stats.enabled = self.show_stats
+        self.canvas.stats.enabled = self.show_stats
+
+    def _show_stats(self, screen: pygame.surface.Surface):
+        lines = ['Network'] + self.network.stats.format() + ['', 'Canvas'] + self.canvas.stats.format()
+        texts = [self.stats_font.render(line, True, (255, 255, 255)) for line in lines]
+        line_height = self.stats_font.get_linesize() + self.STATS_LINE_SPACING
+        container_w = max(text.get_rect().width for text in texts) + 2 * self.INFO_SCREEN_PADDING
+        container_h = len(texts) * line_height + 2 * self.INFO_SCREEN_PADDING
+        container_x = self.MARGIN
+        container_y = self.MARGIN
+
+        pygame.draw.rect(screen, self.INFO_SCREEN_COLOR, (container_x, container_y, container_w, container_h),
+                         border_radius=self.INFO_SCREEN_BORDER_RADIUS)
+        for i, text in enumerate(texts):
+            screen.blit(text, (container_x + self.INFO_SCREEN_PADDING,
+                               container_y + self.INFO_SCREEN_PADDING + i * line_height))
 
     def _show_track_info(self, screen: pygame.surface.Surface, selected_track: network.Track):
         container_x = self.screen_width - self.MARGIN - self.INFO_SCREEN_WIDTH
@@ -60,8 +80,8 @@ class Gui:
             self.canvas.line(screen, selected_track.node_a.position, selected_track.node_b.position,
                              self.SELECTED_TRACK_COLOR, selected_track.width)
         elif isinstance(selected_track, CurvedTrack):
-            self.canvas.arc(screen, selected_track.center, selected_track.radius, selected_track.start_angle,
-                            selected_track.stop_angle, self.SELECTED_TRACK_COLOR, selected_track.width)
+            self.canvas.lines(screen, selected_track.get_polyline(self.canvas.scale), self.SELECTED_TRACK_COLOR,
+                              selected_track.width)
 
     def _show_node_info(self, screen: pygame.surface.Surface, selected_node: network.Node):
         container_x = self.screen_width - self.MARGIN - self.INFO_SCREEN_WIDTH
@@ -77,31 +97,10 @@ class Gui:
         screen.blit(text, (text_x, text_y))
 
         self.canvas.circle(screen, selected_node.position, selected_node.size, self.SELECTED_TRACK_COLOR)
-        for track in selected_node.connections.tracks:
+        for track in self.network.get_tracks_at(selected_node):
             if isinstance(track, StraightTrack):
                 self.canvas.line(screen, track.node_a.position, track.node_b.position,
                                  self.CONNECTED_TRACK_COLOR, track.width)
             elif isinstance(track, CurvedTrack):
-                self.canvas.arc(screen, track.center, track.radius, track.start_angle,
-                                track.stop_angle, self.CONNECTED_TRACK_COLOR, track.width)
-
-    def _get_track_near_position(self, position, radius) -> Optional[network.Track]:
-        for track in self.network.tracks:
-            intersects = False
-            if isinstance(track, StraightTrack):
-                intersects, _ = Geom.intersects_line_segment_circle(track.node_a.position, track.node_b.position,
-                                                                    position, radius)
-            elif isinstance(track, CurvedTrack):
-                intersects, _ = Geom.intersects_circle_segment_circle(track.center, track.radius, track.start_angle,
-                                                                      track.stop_angle, position,
-                                                                      radius)
-            if intersects:
-                return track
-        return None
-
-    def _get_node_near_position(self, position, radius) -> Optional[network.Node]:
-        for node in self.network.nodes:
-            intersects, _ = Geom.intersects_circle_circle(node.position, node.size, position, radius)
-            if intersects:
-                return node
-        return None
\ No newline at end of file
+                self.canvas.lines(screen, track.get_polyline(self.canvas.scale), self.CONNECTED_TRACK_COLOR,
+                                  track.width)
@@ -8,6 +8,16 @@ class Mouse:
         self.current_right_pressed = False
         self.mouse_down_position = (0, 0)
         self.current_position = (0, 0)
+        # Steps the wheel was turned since the previous update, positive away from the user
+        self.wheel = 0
+        self.pending_wheel = 0
+
+    def handle_event(self, event):
+        """
+        Collects the events that can't be polled, such as the mouse wheel, until the next update.
+        """
+        if event.type == pygame.MOUSEWHEEL:
+            self.pending_wheel += event.y
 
     def update(self):
         [button1, _, button3] = pygame.mouse.get_pressed(3)
@@ -16,6 +26,8 @@ class Mouse:
         self.previous_right_pressed = self.current_right_pressed
         self.current_left_pressed = button1
         self.current_right_pressed = button3
+        self.wheel = self.pending_wheel
+        self.pending_wheel = 0
         if not self.previous_left_pressed and self.current_left_pressed:
             self.mouse_down_position = self.current_position
         if not self.previous_right_pressed and self.current_right_pressed:
@@ -0,0 +1,53 @@
+import pygame
+from canvas import Canvas
+from grid import Grid
+from network import Network
+
+
+class StaticLayer:
+    """
+    Caches the grid and the network in an offscreen surface that extends MARGIN pixels beyond the screen on every side.
+    The surface is only redrawn when the network changes, when the canvas is zoomed or when it is panned further than
+    the margin, all other frames cost a single blit.
+    """
+    MARGIN = 256
+
+    def __init__(self, canvas: Canvas, grid: Grid, network: Network, screen_width: int, screen_height: int,
+                 background_color: (float, float, float)):
+        self.canvas = canvas
+        self.grid = grid
+        self.network = network
+        self.background_color = background_color
+        self.surface = pygame.Surface((screen_width + 2 * self.MARGIN, screen_height + 2 * self.MARGIN))
+        self.rendered_offset = None
+        self.rendered_scale = None
+        self.rendered_version = None
+
+    def invalidate(self):
+        self.rendered_version = None
+
+    def draw(self, screen: pygame.surface.Surface):
+        if self._is_outdated():
+            self._render()
+        x = self.canvas.offset.x - self.rendered_offset.x - self.MARGIN
+        y = self.canvas.offset.y - self.rendered_offset.y - self.MARGIN
+        screen.blit(self.surface, (round(x), round(y)))
+
+    def _is_outdated(self) -> bool:
+        if self.rendered_version != self.network.version or self.rendered_scale != self.canvas.scale:
+            return True
+        return abs(self.canvas.offset.x - self.rendered_offset.x) > self.MARGIN \
+            or abs(self.canvas.offset.y - self.rendered_offset.y) > self.MARGIN
+
+    def _render(self):
+        self.surface.fill(self.background_color)
+        offset = self.canvas.offset
+        self.canvas.offset = offset + pygame.Vector2(self.MARGIN, self.MARGIN)
+        try:
+            self.grid.draw(self.surface)
+            self.network.draw(self.surface)
+        finally:
+            self.canvas.offset = offset
+        self.rendered_offset = pygame.Vector2(offset)
+        self.rendered_scale = self.canvas.scale
+        self.rendered_version = self.network.version
@@ -0,0 +1,111 @@
+"""
+Seeded random layout generators, used by the build command of the command line interface and by the benchmarks. Every
+generator returns the tracks without adding them to a network, except for builder_chains, which can only build track
+through a network.
+"""
+import math
+import random
+
+import pygame
+from canvas import Canvas
+from geom import Geom, VectorUtil
+from network import Network, Node, StraightTrack, CurvedTrack, CurvedTrackOptions, Direction
+from trackset import DefaultTrackBuilder
+
+
+def _area(count: int, density: float) -> float:
+    # Side length of a square area that keeps the number of tracks per unit area constant
+    return math.sqrt(count / density)
+
+
+def random_straights(canvas: Canvas, count: int, seed: int, density: float = 0.0001, length: float = 200) -> list:
+    rnd = random.Random(seed)
+    size = _area(count, density)
+    tracks = []
+    for _ in range(count):
+        start = pygame.Vector2(rnd.uniform(0, size), rnd.uniform(0, size))
+        end = start + VectorUtil.from_angle(rnd.uniform(0, 2 * math.pi)) * rnd.uniform(length / 4, length)
+        tracks.append(StraightTrack(canvas, Node(canvas, start), Node(canvas, end)))
+    return tracks
+
+
+def random_curves(canvas: Canvas, count: int, seed: int, density: float = 0.0001) -> list:
+    rnd = random.Random(seed)
+    size = _area(count, density)
+    tracks = []
+    for _ in range(count):
+        options = CurvedTrackOptions(rnd.choice([Direction.LEFT, Direction.RIGHT]), rnd.uniform(50, 300),
+                                     rnd.uniform(math.pi / 16, math.pi / 2))
+        start = pygame.Vector2(rnd.uniform(0, size), rnd.uniform(0, size))
+        tracks.append(_curve_from_options(canvas, start, rnd.uniform(0, 2 * math.pi), options))
+    return tracks
+
+
+def grid_yard(canvas: Canvas, count: int, seed: int, spacing: float = 50) -> list:
+    """
+    Parallel lanes of short straight tracks, connected by random crossovers between neighbouring lanes. Crossovers in
+    opposite directions within the same cell form a scissors crossing.
+    """
+    rnd = random.Random(seed)
+    lanes = max(2, round(math.sqrt(count / 2)))
+    segments = max(1, count // 2 // lanes)
+
+    def node(segment, lane):
+        return Node(canvas, pygame.Vector2(segment * spacing, lane * spacing))
+
+    tracks = []
+    for lane in range(lanes):
+        for segment in range(segments):
+            tracks.append(StraightTrack(canvas, node(segment, lane), node(segment + 1, lane)))
+    while len(tracks) < count:
+        lane = rnd.randrange(lanes - 1)
+        segment = rnd.randrange(segments)
+        if rnd.random() < 0.5:
+            tracks.append(StraightTrack(canvas, node(segment, lane), node(segment + 1, lane + 1)))
+        else:
+            tracks.append(StraightTrack(canvas, node(segment + 1, lane), node(segment, lane + 1)))
+    return tracks
+
+
+def builder_chains(network: Network, count: int, seed: int, chain_length: int = 100) -> int:
+    """
+    Builds random walks of DefaultTrackBuilder steps into the network.
+    :return: Number of tracks built
+    """
+    rnd = random.Random(seed)
+    size = _area(count, 0.00005)
+    built = 0
+    while built < count:
+        start = pygame.Vector2(rnd.uniform(0, size), rnd.uniform(0, size))
+        end = start + VectorUtil.from_angle(rnd.choice([0, 0.5, 1, 1.5]) * math.pi) * 100
+        track = StraightTrack(network.canvas, Node(network.canvas, start), Node(network.canvas, end))
+        network.add_track(track)
+        builder = DefaultTrackBuilder(network, track, track.node_b)
+        built += 1
+        for _ in range(min(chain_length, count - built)):
+            rnd.choice([builder.straight, builder.straight, builder.left, builder.right])()
+            built += 1
+    return built
+
+
+LAYOUTS = {
+    'straights': random_straights,
+    'curves': random_curves,
+    'yard': grid_yard,
+}
+
+
+def _curve_from_options(canvas: Canvas, start: pygame.Vector2, heading: float, options: CurvedTrackOptions) \
+        -> CurvedTrack:
+    direction = VectorUtil.from_angle(heading)
+    if options.direction is Direction.RIGHT:
+        center = start + VectorUtil.rotate_clockwise(direction) * options.radius
+    else:
+        center = start + VectorUtil.rotate_counter_clockwise(direction) * options.radius
+    rotation = options.angle if options.direction is Direction.LEFT else -options.angle
+    a_vector = (start - center).normalize()
+    b_vector = a_vector.rotate_rad(rotation)
+    a_angle = Geom.full_angle_to_horizon(a_vector)
+    b_angle = Geom.full_angle_to_horizon(b_vector)
+    return CurvedTrack.from_direction(canvas, Node(canvas, start), Node(canvas, center + b_vector * options.radius),
+                                      center, options.radius, a_angle, b_angle, options.direction)
@@ -1,3 +1,5 @@
+import logging
+
 import pygame
 
 import util
@@ -5,12 +7,15 @@ import math
 from network import Network, StraightTrack, CurvedTrack, Node, StraightTrackOptions, CurvedTrackOptions, Direction
 from trackset import DefaultTrackBuilder
 from grid import Grid
+from layer import StaticLayer
 from canvas import Canvas
 from input import Mouse
 from debug import Debug
 from gui import Gui
-
-pygame.init()
+from routing import Router
+from simulation import Simulation
+from signalling import BlockOccupancy
+from worker import NetworkWorker
 
 SCREEN_WIDTH    = 1000
 SCREEN_HEIGHT   = 800
@@ -19,57 +24,96 @@ SCREEN_HEIGHT   = 800
 GRID_DIMENSION  = 200
 CANVAS_OFFSET_X = 200
 CANVAS_OFFSET_Y = -200
+# Factor the scale changes by per step of the mouse wheel
+ZOOM_STEP = 1.25
 background_color = (25, 25, 25)
 white = (255, 255, 255)
-running = True
-
-mouse = Mouse()
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-canvas = Canvas(pygame.Vector2(0 + CANVAS_OFFSET_X, SCREEN_HEIGHT + CANVAS_OFFSET_Y))
-grid = Grid(canvas, GRID_DIMENSION, SCREEN_WIDTH, SCREEN_HEIGHT)
-network = Network(canvas)
-Debug.canvas = canvas
-
-node1 = Node(canvas, pygame.Vector2(150, 50))
-node2 = Node(canvas, pygame.Vector2(200, 100))
-track1 = StraightTrack(canvas, node1, node2)
-network.add_track(track1)
-
-node3 = Node(canvas, pygame.Vector2(500, 50))
-node4 = Node(canvas, pygame.Vector2(400, 150))
-track2 = StraightTrack(canvas, node3, node4)
-network.add_track(track2)
-
-_, track4 = network.build_track(node2, track1, CurvedTrackOptions(Direction.LEFT, 400, math.pi / 3))
-# _, track4 = network.build_track(node2, track1, StraightTrackOptions(500))
-node5, track3 = network.build_track(node4, track2, CurvedTrackOptions(Direction.RIGHT, 400, math.pi / 4))
-
-print(len(network.tracks))
-
-builder = DefaultTrackBuilder(network, track1, node2, in_compass_direction=True)
-
-font = pygame.font.SysFont(None, 52)
-gui = Gui(mouse, font, canvas, SCREEN_WIDTH, SCREEN_HEIGHT, network)
-
-while running:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-
-    mouse.update()
-    mouse_movement = pygame.mouse.get_rel()
-    if mouse.is_dragging():
-        canvas.offset += mouse_movement
-
-    if mouse.is_right_clicked():
-        network.nodes.append(Node(canvas, mouse.current_position - canvas.offset))
-        mouse.is_right_clicked()
-
-    screen.fill(background_color)
 
-    grid.draw(screen)
-    network.draw(screen)
-    Debug.draw(screen)
-    gui.draw(screen)
 
-    pygame.display.update()
+def main():
+    logging.basicConfig(level=logging.DEBUG)
+    pygame.init()
+    running = True
+
+    mouse = Mouse()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    canvas = Canvas(pygame.Vector2(0 + CANVAS_OFFSET_X, SCREEN_HEIGHT + CANVAS_OFFSET_Y))
+    grid = Grid(canvas, GRID_DIMENSION)
+    network = Network(canvas)
+    Debug.canvas = canvas
+
+    node1 = Node(canvas, pygame.Vector2(150, 50))
+    node2 = Node(canvas, pygame.Vector2(200, 100))
+    track1 = StraightTrack(canvas, node1, node2)
+    network.add_track(track1)
+
+    node3 = Node(canvas, pygame.Vector2(500, 50))
+    node4 = Node(canvas, pygame.Vector2(400, 150))
+    track2 = StraightTrack(canvas, node3, node4)
+    network.add_track(track2)
+
+    _, track4 = network.build_track(node2, track1, CurvedTrackOptions(Direction.LEFT, 400, math.pi / 3))
+    # _, track4 = network.build_track(node2, track1, StraightTrackOptions(500))
+    node5, track3 = network.build_track(node4, track2, CurvedTrackOptions(Direction.RIGHT, 400, math.pi / 4))
+
+    print(len(network.tracks))
+
+    builder = DefaultTrackBuilder(network, track1, node2, in_compass_direction=True)
+
+    # Edits from here on are applied in the background, drawing reads the snapshots the worker publishes
+    worker = NetworkWorker(network)
+    font = pygame.font.SysFont(None, 52)
+    gui = Gui(mouse, font, canvas, SCREEN_WIDTH, SCREEN_HEIGHT, worker)
+    static_layer = StaticLayer(canvas, grid, worker, SCREEN_WIDTH, SCREEN_HEIGHT, background_color)
+
+    simulation = Simulation(network, occupancy=BlockOccupancy(network))
+    router = Router(network)
+    for source, target in ((node1, track4.node_b), (node3, node5)):
+        route = router.find_route(source, target)
+        if route is not None:
+            simulation.add_train(route, 50)
+    clock = pygame.time.Clock()
+
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            mouse.handle_event(event)
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                gui.toggle_stats()
+            if event.type == pygame.KEYDOWN and event.mod & pygame.KMOD_CTRL:
+                if event.key == pygame.K_z:
+                    worker.undo()
+                elif event.key == pygame.K_y:
+                    worker.redo()
+
+        mouse.update()
+        mouse_movement = pygame.mouse.get_rel()
+        if mouse.is_dragging():
+            canvas.offset += mouse_movement
+        if mouse.wheel:
+            canvas.zoom(ZOOM_STEP ** mouse.wheel, mouse.current_position)
+
+        if mouse.is_right_clicked():
+            worker.add_node(Node(canvas, canvas.to_world(mouse.current_position)))
+            mouse.is_right_clicked()
+
+        elapsed = clock.tick(60) / 1000
+        static_layer.draw(screen)
+        # The simulation and its block occupancy follow the network itself rather than a snapshot, so they are only
+        # read and updated while the worker is not changing the network. The trains pause and are not drawn in the
+        # frames during a large edit, rather than the event loop waiting for the edit to be done.
+        with worker.try_lock() as locked:
+            if locked:
+                simulation.update(elapsed)
+                simulation.draw(screen, canvas)
+        Debug.draw(screen)
+        gui.draw(screen)
+
+        pygame.display.update()
+
+    worker.close()
+
+
+if __name__ == '__main__':
+    main()
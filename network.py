@@ -1,10 +1,16 @@
+import collections
+import contextlib
 import logging
+from typing import Optional
 
 import pygame
 from canvas import Canvas
 from debug import Debug
 import util
-from geom import VectorUtil, Geom
+import parallel
+from geom import VectorUtil, Geom, Tolerance
+from spatial import SpatialGrid, BoundingBox, PointHash, SweepLine
+from stats import Stats
 import math
 
 ids = {
@@ -14,12 +20,20 @@ ids = {
 
 TRACK_WIDTH = 3
 NODE_SIZE   = 8
+SPATIAL_GRID_CELL_SIZE = 200
+BOUNDING_BOX_MARGIN = 1
+# Largest angle between two tracks at a node that a train can still take
+MAX_KINK_ANGLE = math.radians(5)
+# Below this scale the network is drawn simplified: without nodes, and with runs of tracks simplified to polylines
+SIMPLIFY_SCALE = 0.5
+# Largest distance in pixels between a simplified polyline and the tracks it is drawn for
+SIMPLIFY_TOLERANCE = 0.5
+# Size in world units of the tiles that the simplified runs are computed and cached for
+SIMPLIFY_TILE_SIZE = 1024
 # TRACK_WIDTH = 6
 # NODE_SIZE   = 16
 
-logger = logging.getLogger()
-logger.setLevel(logging.DEBUG)
-logger.addHandler(logging.StreamHandler())
+logger = logging.getLogger(__name__)
 
 
 class Direction:
@@ -47,23 +61,132 @@ class CurvedTrackOptions:
 
 
 class Track:
+    """
+    Base class of all tracks. The geometry that is derived from the nodes (length, bounding box, direction at the
+    nodes and the polyline) is computed on first use and cached until one of the nodes is replaced or moved. The cached
+    values are shared, so they must not be modified.
+    """
+    __slots__ = ('id', 'canvas', '_node_a', '_node_b', 'color', 'width', 'root', '_length', '_bounding_box',
+                 '_directions', '_polyline', '_polyline_scale', '_polyline_level')
+
     def __init__(self, canvas: Canvas, node_a, node_b):
         self.id = get_id('track')
         self.canvas = canvas
-        self.node_a = node_a
-        self.node_b = node_b
+        self._node_a = node_a
+        self._node_b = node_b
         self.color = (255, 255, 255)
         self.width = TRACK_WIDTH
+        # Track that this one was split off from, on whose line or circle it lies, see Network._split_track
+        self.root = self
+        self.invalidate()
+
+    @property
+    def node_a(self):
+        return self._node_a
+
+    @node_a.setter
+    def node_a(self, node):
+        self._node_a = node
+        self.invalidate()
+
+    @property
+    def node_b(self):
+        return self._node_b
+
+    @node_b.setter
+    def node_b(self, node):
+        self._node_b = node
+        self.invalidate()
+
+    def invalidate(self):
+        self._length = None
+        self._bounding_box = None
+        self._directions = None
+        self._polyline = None
+        self._polyline_scale = None
+        self._polyline_level = None
 
     def get_direction_vector(self, node) -> pygame.Vector2:
+        """
+        :return: Unit vector pointing out of the track at the given node
+        """
+        if node is self.node_a or node is self.node_b:
+            if self._directions is None:
+                self._directions = self._compute_direction_vector(self.node_a), \
+                    self._compute_direction_vector(self.node_b)
+            return self._directions[0] if node is self.node_a else self._directions[1]
+        return self._compute_direction_vector(node)
+
+    def get_bounding_box(self) -> (float, float, float, float):
+        if self._bounding_box is None:
+            self._bounding_box = self._compute_bounding_box()
+        return self._bounding_box
+
+    def get_length(self) -> float:
+        if self._length is None:
+            self._length = self._compute_length()
+        return self._length
+
+    def get_polyline(self, scale: float = 1) -> list:
+        """
+        :param scale: Pixels per unit of the world the track is drawn at. The polyline is computed for the next power of
+            two, so that it only has to be recomputed when the zoom level changes by a factor of two.
+        :return: Points along the track from node a to node b, close enough together to draw the track with
+        """
+        if scale != self._polyline_scale:
+            self._polyline_scale = scale
+            level = 2.0 ** math.ceil(math.log2(scale))
+            if level != self._polyline_level:
+                self._polyline = None
+                self._polyline_level = level
+        if self._polyline is None:
+            self._polyline = self._compute_polyline(self._polyline_level)
+        return self._polyline
+
+    def get_other_node(self, node):
+        return self.node_b if node is self.node_a else self.node_a
+
+    def get_distance(self, position: pygame.Vector2) -> float:
+        """
+        :return: Distance from the position to the nearest point of the track
+        """
+        pass
+
+    def get_midpoint(self) -> pygame.Vector2:
+        """
+        :return: Point halfway along the track
+        """
+        pass
+
+    def _compute_direction_vector(self, node) -> pygame.Vector2:
+        pass
+
+    def _compute_bounding_box(self) -> (float, float, float, float):
+        pass
+
+    def _compute_length(self) -> float:
+        pass
+
+    def _compute_polyline(self, scale: float) -> list:
         pass
 
 
 class StraightTrack(Track):
+    __slots__ = ()
+
     def __init__(self, canvas, node_a, node_b):
         super().__init__(canvas, node_a, node_b)
 
-    def get_direction_vector(self, node):
+    def draw(self, surface):
+        self.canvas.line(surface, self.node_a.position, self.node_b.position, self.color, self.width)
+
+    def get_distance(self, position: pygame.Vector2) -> float:
+        return Geom.distance_point_line_segment(position, self.node_a.position, self.node_b.position)
+
+    def get_midpoint(self) -> pygame.Vector2:
+        return (self.node_a.position + self.node_b.position) / 2
+
+    def _compute_direction_vector(self, node) -> pygame.Vector2:
         if node is self.node_a:
             v1 = self.node_a
             v2 = self.node_b
@@ -72,11 +195,21 @@ class StraightTrack(Track):
             v2 = self.node_a
         return pygame.Vector2(v1.position.x - v2.position.x, v1.position.y - v2.position.y).normalize()
 
-    def draw(self, surface):
-        self.canvas.line(surface, self.node_a.position, self.node_b.position, self.color, self.width)
+    def _compute_bounding_box(self) -> (float, float, float, float):
+        a = self.node_a.position
+        b = self.node_b.position
+        return min(a.x, b.x), min(a.y, b.y), max(a.x, b.x), max(a.y, b.y)
+
+    def _compute_length(self) -> float:
+        return self.node_a.position.distance_to(self.node_b.position)
+
+    def _compute_polyline(self, scale: float) -> list:
+        return [self.node_a.position, self.node_b.position]
 
 
 class CurvedTrack(Track):
+    __slots__ = ('center', 'radius', 'a_angle', 'b_angle', 'start_angle', 'stop_angle')
+
     def __init__(self, canvas: Canvas, node_a, node_b, center: pygame.Vector2, radius: float, a_angle: float,
                  b_angle: float, start_angle: float, stop_angle: float):
         super().__init__(canvas, node_a, node_b)
@@ -98,55 +231,615 @@ class CurvedTrack(Track):
             stop_angle = b_angle
         return CurvedTrack(canvas, node_a, node_b, center, radius, a_angle, b_angle, start_angle, stop_angle)
 
-    def get_direction_vector(self, node) -> pygame.Vector2:
+    def get_sweep(self) -> float:
+        """
+        :return: Angle between the start and stop angle, counter clockwise
+        """
+        return Geom.get_sweep(self.start_angle, self.stop_angle)
+
+    def draw(self, surface):
+        self.canvas.lines(surface, self.get_polyline(self.canvas.scale), self.color, self.width)
+
+    def get_distance(self, position: pygame.Vector2) -> float:
+        return Geom.distance_point_circle_segment(position, self.center, self.radius, self.start_angle, self.stop_angle)
+
+    def get_midpoint(self) -> pygame.Vector2:
+        return self.center + VectorUtil.from_angle(self.start_angle + self.get_sweep() / 2) * self.radius
+
+    def _compute_direction_vector(self, node) -> pygame.Vector2:
+        # Merged nodes can lie slightly off the arc, so nodes of this track are recognized by identity first
+        if node is self.node_a or node is self.node_b:
+            angle = self.a_angle if node is self.node_a else self.b_angle
+            if angle == self.start_angle:
+                return VectorUtil.rotate_clockwise(VectorUtil.from_angle(angle))
+            return VectorUtil.rotate_counter_clockwise(VectorUtil.from_angle(angle))
         start_vector = VectorUtil.from_angle(self.start_angle) * self.radius
         stop_vector = VectorUtil.from_angle(self.stop_angle) * self.radius
-        if util.are_close(self.center + start_vector, node.position):
+        if util.are_close(self.center + start_vector, node.position, Tolerance.merge):
             return VectorUtil.rotate_clockwise(start_vector).normalize()
-        if util.are_close(self.center + stop_vector, node.position):
+        if util.are_close(self.center + stop_vector, node.position, Tolerance.merge):
             return VectorUtil.rotate_counter_clockwise(stop_vector).normalize()
         raise AssertionError()
 
-    def draw(self, surface):
-        self.canvas.arc(surface, self.center, self.radius, self.start_angle, self.stop_angle, self.color, self.width)
+    def _compute_bounding_box(self) -> (float, float, float, float):
+        start = self.center + VectorUtil.from_angle(self.start_angle) * self.radius
+        stop = self.center + VectorUtil.from_angle(self.stop_angle) * self.radius
+        min_x, max_x = min(start.x, stop.x), max(start.x, stop.x)
+        min_y, max_y = min(start.y, stop.y), max(start.y, stop.y)
+        # The arc reaches the circle's extremes at every axis crossing that lies between its start and stop angle
+        if Geom.is_angle_on_arc(self.start_angle, self.stop_angle, 0):
+            max_x = self.center.x + self.radius
+        if Geom.is_angle_on_arc(self.start_angle, self.stop_angle, math.pi / 2):
+            max_y = self.center.y + self.radius
+        if Geom.is_angle_on_arc(self.start_angle, self.stop_angle, math.pi):
+            min_x = self.center.x - self.radius
+        if Geom.is_angle_on_arc(self.start_angle, self.stop_angle, 3 * math.pi / 2):
+            min_y = self.center.y - self.radius
+        return min_x, min_y, max_x, max_y
+
+    def _compute_length(self) -> float:
+        return self.radius * self.get_sweep()
+
+    def _compute_polyline(self, scale: float) -> list:
+        sweep = self.get_sweep()
+        segments = Geom.get_arc_segments(self.radius, sweep, Canvas.ARC_TOLERANCE / scale)
+        # The arc runs counter clockwise from start to stop angle, so it runs clockwise from a to b if a is the stop
+        step = sweep / segments if self.a_angle == self.start_angle else -sweep / segments
+        points = [self.center + VectorUtil.from_angle(self.a_angle + i * step) * self.radius
+                  for i in range(1, segments)]
+        return [self.node_a.position] + points + [self.node_b.position]
 
 
 class Connections:
-    def __init__(self):
+    """
+    The tracks that meet at a node. Every track maps to the list of tracks that a train coming from it can continue
+    on, which are the tracks that leave the node in (nearly) the opposite direction.
+    """
+    __slots__ = ('node', 'tracks')
+
+    def __init__(self, node):
+        self.node = node
         self.tracks = {}
 
-    def add(self, track: Track):
+    def add(self, track: Track, connect: bool = True):
         self.tracks[track] = []
+        if not connect:
+            return
+        for other in self.tracks:
+            if other is not track and Connections.are_connectable(self.node, track, other):
+                self.connect(track, other)
 
-    def connect(self):
-        pass
+    def connect(self, track_a: Track, track_b: Track):
+        self.tracks[track_a].append(track_b)
+        self.tracks[track_b].append(track_a)
 
     def remove(self, track: Track):
-        del self.tracks[track]
+        for other in self.tracks.pop(track):
+            self.tracks[other].remove(track)
+
+    @staticmethod
+    def are_connectable(node, track_a: Track, track_b: Track) -> bool:
+        try:
+            direction_a = track_a.get_direction_vector(node)
+            direction_b = track_b.get_direction_vector(node)
+        except ValueError:
+            # Tracks without length have no direction
+            return False
+        return direction_a.dot(direction_b) <= -math.cos(MAX_KINK_ANGLE)
 
 
 class Node:
+    __slots__ = ('id', 'canvas', '_position', 'color', 'size', 'connections')
+
     def __init__(self, canvas, position: pygame.Vector2):
         self.id = get_id('node')
         self.canvas = canvas
-        self.position = position
+        self._position = position
         self.color = (75, 75, 75)
         self.size = NODE_SIZE
-        self.connections = Connections()
+        self.connections = Connections(self)
+
+    @property
+    def position(self) -> pygame.Vector2:
+        return self._position
+
+    @position.setter
+    def position(self, position: pygame.Vector2):
+        # Only the cached geometry of the connected tracks is updated, not the indexes of a network containing the node
+        self._position = position
+        for track in self.connections.tracks:
+            track.invalidate()
 
     def draw(self, surface):
         self.canvas.circle(surface, self.position, self.size, self.color)
 
 
-class Network:
-    def __init__(self, canvas):
+class NetworkListener:
+    """
+    Base class for objects that follow the changes of a network. Listeners are registered in Network.listeners, and
+    only need to override the events they are interested in. Added and removed events are also sent when the changes
+    are undone or redone.
+    """
+    def on_node_added(self, node: Node):
+        pass
+
+    def on_node_removed(self, node: Node):
+        pass
+
+    def on_track_added(self, track: Track):
+        pass
+
+    def on_track_removed(self, track: Track):
+        pass
+
+    def on_track_split(self, track: Track, pieces: list):
+        """
+        Sent when a track of the network is replaced by the given pieces, in order from node a to node b.
+        """
+        pass
+
+
+class Journal:
+    """
+    Undo and redo history of a network. Every change made within a transaction is recorded as a delta that can be
+    reverted and reapplied without recomputing any geometry:
+
+        (INSERT_TRACK, track, bounding box, (tracks connected at node a, tracks connected at node b))
+        (REMOVE_TRACK, track, bounding box, (tracks connected at node a, tracks connected at node b))
+        (ADD_NODE, node)
+
+    Replacing the nodes of a new track by the nodes of the network it is merged with is not recorded. It happens
+    before the track is inserted, so the track is not part of the network once its transaction is undone, and it
+    keeps the nodes of the network for a redo. Undo and redo never change tracks, as published snapshots may still
+    hold them. Changes made outside of a transaction are not recorded.
+    """
+    INSERT_TRACK = 0
+    REMOVE_TRACK = 1
+    ADD_NODE = 2
+
+    def __init__(self):
+        self.undo_stack = []
+        self.redo_stack = []
+        self.current = None
+        self.depth = 0
+        # Set while deltas are replayed, so that the replay itself is not recorded
+        self.suspended = False
+
+    def record(self, *delta):
+        if self.current is not None and not self.suspended:
+            self.current.append(delta)
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+
+
+class NetworkView:
+    """
+    Read access to the tracks and nodes of a network through its spatial indices, shared by the network itself and its
+    snapshots. Subclasses provide canvas, version, track_index, node_grid, stats, tile_versions and simplified.
+    """
+    def query_point(self, position: pygame.Vector2, radius: float):
+        """
+        Returns the node or track nearest to the position, within the given radius. Nodes take precedence over tracks,
+        as they are drawn on top of them.
+        :return: Node, Track or None
+        """
+        node = self.query_node(position, radius)
+        if node is not None:
+            return node
+        return self.query_track(position, radius)
+
+    def query_node(self, position: pygame.Vector2, radius: float) -> Optional[Node]:
+        box = BoundingBox.expand((position.x, position.y, position.x, position.y), radius + NODE_SIZE)
+        nearest_node = None
+        nearest_distance = radius
+        for node in self.node_grid.query(box):
+            distance = position.distance_to(node.position) - node.size
+            if distance <= nearest_distance:
+                nearest_node = node
+                nearest_distance = distance
+        return nearest_node
+
+    def query_track(self, position: pygame.Vector2, radius: float) -> Optional[Track]:
+        box = BoundingBox.expand((position.x, position.y, position.x, position.y), radius)
+        nearest_track = None
+        nearest_distance = radius
+        for track in self.track_index.query(box):
+            distance = track.get_distance(position)
+            if distance is not None and distance <= nearest_distance:
+                nearest_track = track
+                nearest_distance = distance
+        return nearest_track
+
+    def get_tracks_at(self, node: Node) -> list:
+        """
+        :return: Tracks that start or end at the node, found in the index rather than in the connections of the node
+        """
+        position = node.position
+        box = (position.x, position.y, position.x, position.y)
+        tracks = [track for track in self.track_index.query(box) if track.node_a is node or track.node_b is node]
+        return sorted(tracks, key=lambda track: track.id)
+
+    def draw(self, surface):
+        with self.stats.time('draw'):
+            scale = self.canvas.scale
+            viewport = BoundingBox.expand(self.canvas.get_viewport(surface), NODE_SIZE)
+            if scale < SIMPLIFY_SCALE:
+                self._draw_simplified(surface, viewport, scale)
+                return
+            tracks = self.track_index.query(viewport)
+            for color, width, points in self._get_runs(set(tracks), scale):
+                self.canvas.lines(surface, points, color, width)
+
+            nodes = self.node_grid.query(viewport)
+            for node in nodes:
+                node.draw(surface)
+            self.stats.count('tracks drawn', len(tracks))
+            self.stats.count('nodes drawn', len(nodes))
+
+    def _draw_simplified(self, surface, viewport: (float, float, float, float), scale: float):
+        """
+        Draws the simplified runs of the zoom level tile by tile, so that the number of lines drawn depends on the
+        number of pixels the network covers rather than on its tracks. The runs of a tile are computed when it is first
+        drawn at a level and again only after its tracks changed. The cache is shared with the snapshots of the network,
+        so an edit only simplifies the tiles it touched again.
+        """
+        level = 2.0 ** math.ceil(math.log2(scale))
+        runs_drawn = 0
+        for tile in self._get_visible_tiles(viewport):
+            version = self.tile_versions[tile]
+            key = (level, tile)
+            cached = self.simplified.get(key)
+            if cached is None or cached[0] != version:
+                with self.stats.time('simplify'):
+                    cached = self.simplified[key] = (version, self._simplify(level, tile))
+                self.stats.count('tiles simplified')
+            for color, width, points in cached[1]:
+                self.canvas.lines(surface, points, color, width)
+            runs_drawn += len(cached[1])
+        self.stats.count('runs drawn', runs_drawn)
+
+    def _get_visible_tiles(self, viewport: (float, float, float, float)) -> list:
+        """
+        :return: Tiles that overlap the viewport and have or had tracks, in order
+        """
+        min_x, min_y, max_x, max_y = self._get_tile_range(viewport)
+        if (max_x - min_x + 1) * (max_y - min_y + 1) > len(self.tile_versions):
+            return sorted(tile for tile in self.tile_versions
+                          if min_x <= tile[0] <= max_x and min_y <= tile[1] <= max_y)
+        return [(x, y) for x in range(min_x, max_x + 1) for y in range(min_y, max_y + 1)
+                if (x, y) in self.tile_versions]
+
+    @staticmethod
+    def _get_tile_range(box: (float, float, float, float)) -> (int, int, int, int):
+        """
+        :return: (min x, min y, max x, max y) of the tiles that overlap the box
+        """
+        return tuple(math.floor(value / SIMPLIFY_TILE_SIZE) for value in box)
+
+    def _simplify(self, level: float, tile: (int, int)) -> list:
+        """
+        Chains the tracks that overlap the tile into runs and simplifies them with Douglas-Peucker for the given zoom
+        level. Runs that are smaller than their width would look like dots anyway, so they are replaced by one dot per
+        cell of that width, which bounds their number by the area the tile covers on the screen. Tracks that overlap
+        several tiles are part of the runs of each of them.
+        :return: List of (color, width, points)
+        """
+        x, y = tile
+        size = SIMPLIFY_TILE_SIZE
+        box = (x * size, y * size, (x + 1) * size, (y + 1) * size)
+        pixel = 1 / level
+        runs = []
+        dots = {}
+        for color, width, points in self._get_runs(self.track_index.query(box), level):
+            points = Geom.simplify_polyline(points, SIMPLIFY_TOLERANCE * pixel)
+            xs = [point.x for point in points]
+            ys = [point.y for point in points]
+            size = max(width, 1) * pixel
+            if max(xs) - min(xs) < size and max(ys) - min(ys) < size:
+                dots.setdefault((color, width, math.floor(xs[0] / size), math.floor(ys[0] / size)), points[0])
+            else:
+                runs.append((color, width, points))
+        runs += [(color, width, [point, point]) for (color, width, _, _), point in dots.items()]
+        return runs
+
+    @staticmethod
+    def _get_runs(tracks: set, scale: float = 1):
+        """
+        Chains tracks that share a node and have the same color and width into runs of their polylines, so that every
+        run can be drawn with a single call. Only the given tracks are followed, not the connections of their nodes,
+        which may already have changed in a snapshot.
+        :param scale: Scale the polylines of the tracks are drawn at
+        :return: Generator of (color, width, points)
+        """
+        at_node = collections.defaultdict(list)
+        for track in tracks:
+            at_node[track.node_a].append(track)
+            at_node[track.node_b].append(track)
+        while tracks:
+            track = tracks.pop()
+            points = collections.deque(track.get_polyline(scale))
+            for forward in (True, False):
+                node = track.node_b if forward else track.node_a
+                while True:
+                    next_track = None
+                    for connected in at_node[node]:
+                        if connected in tracks and connected.color == track.color and connected.width == track.width:
+                            next_track = connected
+                            break
+                    if next_track is None:
+                        break
+                    tracks.remove(next_track)
+                    # The polyline of the next track, starting at the node the run has reached
+                    polyline = next_track.get_polyline(scale)
+                    if next_track.node_a is not node:
+                        polyline = polyline[::-1]
+                    if forward:
+                        points.extend(polyline[1:])
+                    else:
+                        points.extendleft(polyline[1:])
+                    node = next_track.get_other_node(node)
+            yield track.color, track.width, list(points)
+
+
+class NetworkSnapshot(NetworkView):
+    """
+    Immutable view of a network at one version, see Network.snapshot. The indices are copy-on-write copies, and the
+    tracks and nodes in them are not changed once they are part of the network, as undo and redo only remove and
+    insert them. So a snapshot can be drawn and queried in one thread while the network is edited in another.
+    """
+    def __init__(self, canvas, version: int, track_index: SpatialGrid, node_grid: SpatialGrid, stats: Stats,
+                 tile_versions: dict, simplified: dict):
+        self.canvas = canvas
+        self.version = version
+        self.track_index = track_index
+        self.node_grid = node_grid
+        self.stats = stats
+        self.tile_versions = tile_versions
+        self.simplified = simplified
+
+
+class Network(NetworkView):
+    def __init__(self, canvas, cell_size: float = SPATIAL_GRID_CELL_SIZE):
         self.canvas = canvas
-        self.nodes = []
-        self.tracks = []
+        # Nodes and tracks by id, in insertion order
+        self.nodes = {}
+        self.tracks = {}
+        self.track_index = SpatialGrid(cell_size)
+        self.node_index = PointHash(Tolerance.merge)
+        self.node_grid = SpatialGrid(cell_size)
+        # Incremented on every change, so that caches of the network can tell whether they are outdated
+        self.version = 0
+        self.journal = Journal()
+        self.listeners = []
+        # Counters and timers of the phases of adding tracks and drawing, disabled until enabled by the user
+        self.stats = Stats()
+        # Version of the last change of the tracks of every tile, by (x, y) index of the tile, see NetworkView.draw
+        self.tile_versions = {}
+        # Simplified runs of the tracks of a tile by (zoom level, tile): (version of the tile, runs). Shared with the
+        # snapshots, which only differ in the versions of the tiles that were changed since.
+        self.simplified = {}
+
+    def add_node(self, node: Node):
+        with self.transaction():
+            self._add_node(node)
 
     def add_track(self, track: Track):
-        self._add_track(track)
-        pass
+        with self.transaction():
+            self._add_track(track)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Groups all changes made within the context into a single step of the undo history. Nested transactions are part
+        of the outermost one.
+        :return: The list of deltas of the transaction, complete once the outermost context exits
+        """
+        journal = self.journal
+        if journal.current is None:
+            journal.current = []
+        transaction = journal.current
+        journal.depth += 1
+        self.stats.maximum('transaction depth', journal.depth)
+        try:
+            yield transaction
+        finally:
+            journal.depth -= 1
+            if journal.depth == 0:
+                journal.current = None
+                if transaction:
+                    journal.undo_stack.append(transaction)
+                    journal.redo_stack.clear()
+
+    def undo(self, transaction: list = None) -> Optional[list]:
+        """
+        Reverts the latest transaction.
+        :param transaction: If given, the transaction that is expected to be the latest
+        :return: The reverted transaction, or None if there is nothing to undo
+        """
+        journal = self.journal
+        if transaction is not None and (not journal.undo_stack or journal.undo_stack[-1] is not transaction):
+            raise ValueError('only the latest transaction can be undone')
+        if not journal.undo_stack:
+            return None
+        transaction = journal.undo_stack.pop()
+        journal.suspended = True
+        try:
+            for delta in reversed(transaction):
+                self._revert_delta(delta)
+        finally:
+            journal.suspended = False
+        journal.redo_stack.append(transaction)
+        return transaction
+
+    def redo(self) -> Optional[list]:
+        """
+        Reapplies the latest undone transaction.
+        :return: The reapplied transaction, or None if there is nothing to redo
+        """
+        journal = self.journal
+        if not journal.redo_stack:
+            return None
+        transaction = journal.redo_stack.pop()
+        journal.suspended = True
+        try:
+            for delta in transaction:
+                self._apply_delta(delta)
+        finally:
+            journal.suspended = False
+        journal.undo_stack.append(transaction)
+        return transaction
+
+    def add_tracks(self, tracks, workers: int = None):
+        """
+        Adds many tracks at once, in a single transaction. The intersections of every track with the tracks of the
+        network and the earlier tracks are tested in one pass up front. The tracks are then inserted in order, which
+        merges their nodes and snaps their intersections like add_track, and every track is split once at the end, at
+        all of its intersections, rather than once per track that crosses it. The resulting network is the same as when
+        adding the tracks one by one with add_track.
+        :param tracks: Iterable of tracks
+        :param workers: Number of processes to test the intersections in, or None to test them in this process. The
+            results are only used for the pairs of tracks that still have the geometry that was tested when a track is
+            inserted, so the resulting network does not depend on the number of workers.
+        """
+        with self.transaction():
+            self._add_tracks(list(tracks), workers)
+
+    def _add_tracks(self, new_tracks: list, workers: int = None):
+        stats = self.stats
+        stats.count('tracks submitted', len(new_tracks))
+        with stats.time('intersections up front'):
+            candidate_lists = self._get_initial_candidates(new_tracks)
+            if workers is not None and workers > 1:
+                found_lists = parallel.intersects_tracks(new_tracks, candidate_lists, workers)
+            else:
+                found_lists = util.intersects_track_lists(new_tracks, candidate_lists)
+            stats.count('intersections tested up front', sum(len(candidates) for candidates in candidate_lists))
+        split_nodes = {}
+        moved = set()
+        for i, new_track in enumerate(new_tracks):
+            results = dict(zip(candidate_lists[i], found_lists[i]))
+            # Releases the results once used, so that they do not pile up while the tracks are inserted
+            candidate_lists[i] = found_lists[i] = None
+            self._add_new_track(new_track, split_nodes, results, moved)
+        self._split_tracks(split_nodes)
+
+    def _get_initial_candidates(self, new_tracks: list) -> list:
+        """
+        :return: List with the candidates of every new track before any of them is inserted: the roots of the tracks of
+            the network and the earlier new tracks whose bounding boxes overlap its own, sorted by id
+        """
+        boxes = [BoundingBox.expand(track.get_bounding_box(), BOUNDING_BOX_MARGIN) for track in new_tracks]
+        candidate_lists = [list({track.root: None for track in self.track_index.query(box)}) for box in boxes]
+        for i, j in SweepLine.overlapping_pairs(boxes):
+            candidate_lists[j].append(new_tracks[i])
+        for candidates in candidate_lists:
+            candidates.sort(key=lambda t: t.id)
+        return candidate_lists
+
+    def _add_new_track(self, new_track: Track, split_nodes: dict, results: dict = None, moved: set = None):
+        """
+        Inserts a track that is not part of the network yet: drops the parts that run along existing tracks, merges
+        its nodes with the nodes of the network, and adds nodes at its intersections with the tracks of the network.
+        The tracks are not split yet, see _split_tracks.
+
+        Intersections are tested with the roots of the tracks, the tracks they were split off from, so that the nodes
+        do not depend on how often and in which order the tracks were split. Only the intersections that lie on the
+        pieces of the roots that are part of the network count.
+        :param split_nodes: Nodes to split every track at, by track, to which the nodes of this track are added
+        :param results: Result of util.intersects_track by root, as computed before any of the tracks were inserted
+        :param moved: Tracks that were merged to nodes at other positions since the results were computed, so that
+            their results no longer hold, to which this track is added if it is moved
+        """
+        stats = self.stats
+        # The nodes of tracks only change when they are merged as they are inserted, tracks of the network never move
+        geometry = parallel.get_geometry(new_track) if results is not None else None
+        with stats.time('candidates'):
+            box = BoundingBox.expand(new_track.get_bounding_box(), BOUNDING_BOX_MARGIN)
+            candidates = {}
+            for track in sorted(self.track_index.query(box), key=lambda t: t.id):
+                candidates.setdefault(track.root, []).append(track)
+            roots = sorted(candidates, key=lambda t: t.id)
+
+        with stats.time('overlaps'):
+            # Parts of the track that run along existing tracks are dropped. The remaining pieces lie within the
+            # bounding box of the track, so its candidates are candidates for its pieces.
+            pieces = self._trim_overlaps(new_track, candidates)
+            for piece in pieces:
+                self._merge_nodes(piece)
+
+        with stats.time('intersections'):
+            found = [None] * len(roots)
+            if results is not None and geometry != parallel.get_geometry(new_track):
+                moved.add(new_track)
+            if results is not None and new_track not in moved:
+                for i, root in enumerate(roots):
+                    if root in results and root not in moved:
+                        found[i] = results[root]
+            tested = [i for i, result in enumerate(found) if result is None]
+            if tested:
+                tested_roots = [roots[i] for i in tested]
+                for i, result in zip(tested, util.intersects_tracks(new_track, tested_roots)):
+                    found[i] = result
+                if stats.enabled:
+                    self._count_intersection_tests(new_track, tested_roots)
+            if results is not None:
+                stats.count('intersection results reused', len(roots) - len(tested))
+            for root, (intersects, intersections) in zip(roots, found):
+                for intersection in intersections:
+                    piece = self._get_piece_at(pieces, intersection)
+                    track = self._get_piece_at(candidates[root], intersection)
+                    if piece is None or track is None:
+                        continue
+                    stats.count('intersections')
+                    node_split = self.node_index.find(intersection, Tolerance.merge)
+                    if node_split is None:
+                        node_split = Node(self.canvas, intersection)
+                        self._add_node(node_split)
+                    split_nodes.setdefault(piece, []).append(node_split)
+                    split_nodes.setdefault(track, []).append(node_split)
+
+        for piece in pieces:
+            self._insert_track(piece)
+        stats.count('tracks inserted', len(pieces))
+
+    @staticmethod
+    def _get_piece_at(pieces: list, position: pygame.Vector2) -> Optional[Track]:
+        """
+        :return: The first of the pieces that the position lies on, within the merge distance, or None
+        """
+        for piece in pieces:
+            if piece.get_distance(position) <= Tolerance.merge:
+                return piece
+        return None
+
+    def _split_tracks(self, split_nodes: dict):
+        """
+        Splits every track of the network at all of its nodes at once.
+        :param split_nodes: Nodes to split every track at, by track
+        """
+        stats = self.stats
+        with stats.time('splits'):
+            for track, nodes in split_nodes.items():
+                track_pieces = self._split_track(track, nodes)
+                if len(track_pieces) == 1:
+                    continue
+                logger.debug('splitting track %s into %s pieces', track.id, len(track_pieces))
+                self._remove_track(track)
+                for track_piece in track_pieces:
+                    self._insert_track(track_piece)
+                stats.count('tracks split')
+                stats.count('tracks inserted', len(track_pieces) - 1)
+                stats.maximum('pieces per split', len(track_pieces))
+                for listener in self.listeners:
+                    listener.on_track_split(track, track_pieces)
+
+    def _count_intersection_tests(self, track: Track, candidates: list):
+        curved = sum(isinstance(candidate, CurvedTrack) for candidate in candidates)
+        kind = 'curved' if isinstance(track, CurvedTrack) else 'straight'
+        self.stats.count(f'intersection tests {kind}-straight', len(candidates) - curved)
+        self.stats.count(f'intersection tests {kind}-curved', curved)
 
     def build_track(self, source_node: Node, source_track: Track, track_options) -> (Node, Track):
         if isinstance(track_options, StraightTrackOptions):
@@ -156,123 +849,181 @@ class Network:
         else:
             raise Exception()
 
-        self._add_track(new_track, skip_check_node_a=True)
+        with self.transaction():
+            self._add_track(new_track)
         return new_node, new_track
 
-    def _add_track(self, new_track: Track, skip_check_node_a=False, skip_check_node_b=False, skip_check_intersections=False):
-        logger.debug(f'add_track: ID = {new_track.id} {type(new_track)}')
-        # Check whether nodes are duplicates of other nodes
-        for node in self.nodes:
-            if not skip_check_node_a:
-                if util.are_nodes_close(node, new_track.node_a, epsilon=1):
-                    logger.debug(f'replacing node a {new_track.node_a.id} with {node.id}')
-                    new_track.node_a = node
-                    skip_check_node_a = True
-            if not skip_check_node_b:
-                if util.are_nodes_close(node, new_track.node_b, epsilon=1):
-                    logger.debug(f'replacing node b {new_track.node_a.id} with {node.id}')
-                    new_track.node_b = node
-                    skip_check_node_b = True
-
-        if not skip_check_node_a:
-            logger.debug(f'adding node a {new_track.node_a.id} to nodes')
-            self.nodes.append(new_track.node_a)
-        if not skip_check_node_b:
-            logger.debug(f'adding node b {new_track.node_b.id} to nodes')
-            self.nodes.append(new_track.node_b)
-
-        # Check whether track overlaps any other track
-        if skip_check_intersections:
-            logger.debug('skipping intersections check')
-            self.tracks.append(new_track)
-            new_track.node_a.connections.add(new_track)
-            new_track.node_b.connections.add(new_track)
-            return
+    def _add_track(self, new_track: Track):
+        logger.debug('add_track: ID = %s %s', new_track.id, type(new_track))
+        split_nodes = {}
+        self._add_new_track(new_track, split_nodes)
+        self._split_tracks(split_nodes)
 
-        track_invalid = False
-        track_to_remove = []
-        for track in self.tracks:
-            intersects, intersections = util.intersects_track(new_track, track)
-            if not intersects:
+    def _merge_nodes(self, new_track: Track):
+        # Nodes of the network are kept, other nodes are replaced by a node within the merge distance or added
+        for attribute in ('node_a', 'node_b'):
+            node = getattr(new_track, attribute)
+            if self.nodes.get(node.id) is node:
                 continue
+            existing = self.node_index.find(node.position, Tolerance.merge)
+            self.stats.count('node merge lookups')
+            if existing is None:
+                logger.debug('adding %s %s to nodes', attribute, node.id)
+                self._add_node(node)
+            else:
+                logger.debug('replacing %s %s with %s', attribute, node.id, existing.id)
+                self.stats.count('nodes merged')
+                setattr(new_track, attribute, existing)
 
-            for intersection in intersections:
-                if not self._is_valid_intersection(intersection):
-                    continue
-                logger.debug(f'found valid intersection with track {track.id} at {intersection}')
-                track_invalid = True
-                # Split track
-                node_split = Node(self.canvas, intersection)
-                track_to_remove.append(track)
-
-                if isinstance(new_track, StraightTrack):
-                    track_a = StraightTrack(self.canvas, new_track.node_a, node_split)
-                    track_b = StraightTrack(self.canvas, new_track.node_b, node_split)
-                    self._add_track(track_a, skip_check_node_a=True)
-                    self._add_track(track_b, skip_check_node_a=True, skip_check_node_b=True)
-                elif isinstance(new_track, CurvedTrack):
-                    split_angle = Geom.full_angle_to_horizon(intersection - new_track.center)
-                    if new_track.a_angle == new_track.start_angle:
-                        a_start_angle = new_track.start_angle
-                        a_stop_angle = split_angle
-                        b_start_angle = split_angle
-                        b_stop_angle = new_track.stop_angle
-                    else:
-                        a_start_angle = split_angle
-                        a_stop_angle = new_track.stop_angle
-                        b_start_angle = new_track.start_angle
-                        b_stop_angle = split_angle
-                    track_a = CurvedTrack(self.canvas, new_track.node_a, node_split, new_track.center,
-                                          new_track.radius, new_track.a_angle, split_angle, a_start_angle, a_stop_angle)
-                    track_b = CurvedTrack(self.canvas, node_split, new_track.node_b, new_track.center,
-                                          new_track.radius, split_angle, new_track.b_angle, b_start_angle, b_stop_angle)
-                    logger.debug(f'splitting track {new_track.id} into {track_a.id} and {track_b.id}')
-                    self._add_track(track_a, skip_check_node_a=True)
-                    self._add_track(track_b, skip_check_node_a=True, skip_check_node_b=True)
-
-                if isinstance(track, StraightTrack):
-                    track_a = StraightTrack(self.canvas, track.node_a, node_split)
-                    track_b = StraightTrack(self.canvas, track.node_b, node_split)
-                    self._add_track(track_a, skip_check_node_a=True, skip_check_node_b=True, skip_check_intersections=True)
-                    self._add_track(track_b, skip_check_node_a=True, skip_check_node_b=True, skip_check_intersections=True)
-                    pass
-                elif isinstance(track, CurvedTrack):
-                    split_angle = Geom.full_angle_to_horizon(intersection - track.center)
-                    if track.a_angle == track.start_angle:
-                        a_start_angle = track.start_angle
-                        a_stop_angle = split_angle
-                        b_start_angle = split_angle
-                        b_stop_angle = track.stop_angle
-                    else:
-                        a_start_angle = split_angle
-                        a_stop_angle = track.stop_angle
-                        b_start_angle = track.start_angle
-                        b_stop_angle = split_angle
-                    track_a = CurvedTrack(self.canvas, track.node_a, node_split, track.center,
-                                          track.radius, track.a_angle, split_angle, a_start_angle, a_stop_angle)
-                    track_b = CurvedTrack(self.canvas, node_split, track.node_b, track.center,
-                                          track.radius, split_angle, track.b_angle, b_start_angle, b_stop_angle)
-                    self._add_track(track_a, skip_check_node_a=True, skip_check_node_b=True, skip_check_intersections=True)
-                    self._add_track(track_b, skip_check_node_a=True, skip_check_node_b=True,
-                                    skip_check_intersections=True)
-                break
-
-        for track in track_to_remove:
-            logger.debug(f'removing track {track.id} from tracks')
-            self.tracks.remove(track)
-            track.node_a.connections.remove(track)
-            track.node_b.connections.remove(track)
-
-        if not track_invalid:
-            self.tracks.append(new_track)
-            new_track.node_a.connections.add(new_track)
-            new_track.node_b.connections.add(new_track)
-
-    def _is_valid_intersection(self, coord: pygame.Vector2):
-        for node in self.nodes:
-            if util.are_close(node.position, coord):
-                return False
-        return True
+    def _trim_overlaps(self, track: Track, candidates: dict) -> list:
+        """
+        Removes the parts of a track that run along any of the candidates, so that laying track over existing track
+        does not duplicate it. The track is cut at the ends of those candidates.
+        :param candidates: Tracks of the network by root, a track runs along the others of its root if it runs along
+            the root
+        :return: Pieces of the track that remain, in order from node a to node b
+        """
+        overlaps = [other for root, others in candidates.items() if self._is_along(track, root) for other in others]
+        if not overlaps:
+            return [track]
+        ends = track.node_a.position, track.node_b.position
+        cuts = [node for other in overlaps for node in (other.node_a, other.node_b)
+                if track.get_distance(node.position) <= Tolerance.merge and
+                all(node.position.distance_to(end) > Tolerance.merge for end in ends)]
+        pieces = [piece for piece in self._split_track(track, cuts)
+                  if all(other.get_distance(piece.get_midpoint()) > Tolerance.merge for other in overlaps)]
+        self.stats.count('overlapping tracks trimmed')
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('track %s runs along tracks %s, %s pieces remain', track.id,
+                         [other.id for other in overlaps], len(pieces))
+        return pieces
+
+    @staticmethod
+    def _is_along(track: Track, other: Track) -> bool:
+        """
+        :return: Whether both tracks are straight and on the same line, or both are curved and on the same circle,
+            within the merge distance
+        """
+        if isinstance(track, StraightTrack) and isinstance(other, StraightTrack):
+            a, b = other.node_a.position, other.node_b.position
+            return a.distance_to(b) > Tolerance.merge and \
+                Geom.distance_point_line(track.node_a.position, a, b) <= Tolerance.merge and \
+                Geom.distance_point_line(track.node_b.position, a, b) <= Tolerance.merge
+        if isinstance(track, CurvedTrack) and isinstance(other, CurvedTrack):
+            return track.center.distance_to(other.center) + math.fabs(track.radius - other.radius) <= Tolerance.merge
+        return False
+
+    def _split_track(self, track: Track, nodes: list) -> list:
+        """
+        Splits a track at the given nodes, which are assumed to lie on the track. The pieces are returned in order from
+        node a to node b of the original track, and share its root.
+        """
+        nodes = [node for node in dict.fromkeys(nodes) if node is not track.node_a and node is not track.node_b]
+        if len(nodes) == 0:
+            return [track]
+
+        if isinstance(track, StraightTrack):
+            nodes.sort(key=lambda n: track.node_a.position.distance_to(n.position))
+            chain = [track.node_a] + nodes + [track.node_b]
+            pieces = [StraightTrack(self.canvas, node_a, node_b) for node_a, node_b in zip(chain, chain[1:])]
+        elif isinstance(track, CurvedTrack):
+            # The arc runs counter clockwise from start to stop angle, so it runs clockwise from a to b if a is the stop
+            clockwise = track.a_angle != track.start_angle
+            angles = {node: Geom.full_angle_to_horizon(node.position - track.center) for node in nodes}
+            nodes.sort(key=lambda n: (track.a_angle - angles[n] if clockwise else angles[n] - track.a_angle) % (2 * math.pi))
+            chain = [track.node_a] + nodes + [track.node_b]
+            chain_angles = [track.a_angle] + [angles[node] for node in nodes] + [track.b_angle]
+            pieces = []
+            for i in range(len(chain) - 1):
+                a_angle, b_angle = chain_angles[i], chain_angles[i + 1]
+                start_angle, stop_angle = (b_angle, a_angle) if clockwise else (a_angle, b_angle)
+                pieces.append(CurvedTrack(self.canvas, chain[i], chain[i + 1], track.center, track.radius, a_angle,
+                                          b_angle, start_angle, stop_angle))
+        else:
+            raise Exception()
+        for piece in pieces:
+            piece.root = track.root
+        return pieces
+
+    def _insert_track(self, track: Track, connect: bool = True, box: (float, float, float, float) = None,
+                      connected: (list, list) = None):
+        """
+        :param connect: Whether to derive the connections of the track at its nodes
+        :param box: Bounding box to index the track with, computed if not given
+        :param connected: Tracks to connect to at node a and node b, instead of deriving them
+        """
+        self.version += 1
+        if box is None:
+            box = BoundingBox.expand(track.get_bounding_box(), BOUNDING_BOX_MARGIN)
+        self.tracks[track.id] = track
+        self.track_index.insert(track, box)
+        self._update_tiles(box)
+        track.node_a.connections.add(track, connect and connected is None)
+        track.node_b.connections.add(track, connect and connected is None)
+        if connected is not None:
+            for other in connected[0]:
+                track.node_a.connections.connect(track, other)
+            for other in connected[1]:
+                track.node_b.connections.connect(track, other)
+        self.journal.record(Journal.INSERT_TRACK, track, box, self._get_connected(track))
+        for listener in self.listeners:
+            listener.on_track_added(track)
+
+    def _remove_track(self, track: Track):
+        self.journal.record(Journal.REMOVE_TRACK, track, self.track_index.boxes[track], self._get_connected(track))
+        self.version += 1
+        del self.tracks[track.id]
+        self._update_tiles(self.track_index.boxes[track])
+        self.track_index.remove(track)
+        track.node_a.connections.remove(track)
+        track.node_b.connections.remove(track)
+        for listener in self.listeners:
+            listener.on_track_removed(track)
+
+    def _update_tiles(self, box: (float, float, float, float)):
+        min_x, min_y, max_x, max_y = self._get_tile_range(box)
+        for x in range(min_x, max_x + 1):
+            for y in range(min_y, max_y + 1):
+                self.tile_versions[x, y] = self.version
+
+    @staticmethod
+    def _get_connected(track: Track) -> (list, list):
+        return list(track.node_a.connections.tracks[track]), list(track.node_b.connections.tracks[track])
+
+    def _apply_delta(self, delta: tuple):
+        kind = delta[0]
+        if kind == Journal.INSERT_TRACK:
+            self._insert_track(delta[1], box=delta[2], connected=delta[3])
+        elif kind == Journal.REMOVE_TRACK:
+            self._remove_track(delta[1])
+        elif kind == Journal.ADD_NODE:
+            self._add_node(delta[1])
+
+    def _revert_delta(self, delta: tuple):
+        kind = delta[0]
+        if kind == Journal.INSERT_TRACK:
+            self._remove_track(delta[1])
+        elif kind == Journal.REMOVE_TRACK:
+            self._insert_track(delta[1], box=delta[2], connected=delta[3])
+        elif kind == Journal.ADD_NODE:
+            self._remove_node(delta[1])
+
+    def _add_node(self, node: Node):
+        self.version += 1
+        self.nodes[node.id] = node
+        self.node_index.insert(node, node.position)
+        self.node_grid.insert(node, (node.position.x, node.position.y, node.position.x, node.position.y))
+        self.journal.record(Journal.ADD_NODE, node)
+        for listener in self.listeners:
+            listener.on_node_added(node)
+
+    def _remove_node(self, node: Node):
+        self.version += 1
+        del self.nodes[node.id]
+        self.node_index.remove(node)
+        self.node_grid.remove(node)
+        for listener in self.listeners:
+            listener.on_node_removed(node)
 
     def _add_straight_track(self, source_node: Node, source_track: Track, options: StraightTrackOptions) \
             -> (Node, StraightTrack):
@@ -305,9 +1056,9 @@ class Network:
 
         return new_node, new_track
 
-    def draw(self, surface):
-        for track in self.tracks:
-            track.draw(surface)
-
-        for node in self.nodes:
-            node.draw(surface)
+    def snapshot(self) -> 'NetworkSnapshot':
+        """
+        :return: Immutable view of the current tracks and nodes that later changes of the network do not affect
+        """
+        return NetworkSnapshot(self.canvas, self.version, self.track_index.snapshot(), self.node_grid.snapshot(),
+                               self.stats, dict(self.tile_versions), self.simplified)
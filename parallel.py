@@ -0,0 +1,83 @@
+"""
+Intersection testing in worker processes for Network.add_tracks. Tracks are sent to the workers as plain geometry
+tuples, without their nodes, connections or any other part of the network, and rebuilt there as standalone tracks.
+The results are collected in the order of the input, so they are the same for any number of workers.
+"""
+import concurrent.futures
+import math
+
+from pygame import Vector2
+import network
+import util
+
+STRAIGHT = 0
+CURVED = 1
+# Chunks per worker, more chunks balance the load better but cost more transfers
+CHUNKS_PER_WORKER = 4
+
+
+def intersects_tracks(tracks: list, candidate_lists: list, workers: int) -> list:
+    """
+    Tests every track against its candidates, like util.intersects_track_lists.
+    :param tracks: List of tracks
+    :param candidate_lists: List with the list of candidates of every track
+    :param workers: Number of worker processes, 1 to test the tracks in this process
+    :return: List with the result of util.intersects_tracks for every track
+    """
+    if workers <= 1 or len(tracks) < 2:
+        return util.intersects_track_lists(tracks, candidate_lists)
+
+    chunk_size = math.ceil(len(tracks) / (workers * CHUNKS_PER_WORKER))
+    chunks = [_pack_chunk(tracks[i:i + chunk_size], candidate_lists[i:i + chunk_size])
+              for i in range(0, len(tracks), chunk_size)]
+    results = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk_results in executor.map(_intersects_chunk, *zip(*chunks)):
+            for track_results in chunk_results:
+                results.append([(intersects, [Vector2(x, y) for x, y in intersections])
+                                for intersects, intersections in track_results])
+    return results
+
+
+def _pack_chunk(tracks: list, candidate_lists: list) -> (list, list):
+    """
+    :return: 1. Geometry of every track in the chunk, each listed once; 2. (track, candidates) tasks as indices into
+        the geometries
+    """
+    indices = {}
+    geometries = []
+
+    def index(track) -> int:
+        if track not in indices:
+            indices[track] = len(geometries)
+            geometries.append(get_geometry(track))
+        return indices[track]
+
+    tasks = [(index(track), [index(candidate) for candidate in candidates])
+             for track, candidates in zip(tracks, candidate_lists)]
+    return geometries, tasks
+
+
+def _intersects_chunk(geometries: list, tasks: list) -> list:
+    tracks = [_from_geometry(geometry) for geometry in geometries]
+    candidate_lists = [[tracks[candidate] for candidate in candidates] for _, candidates in tasks]
+    found_lists = util.intersects_track_lists([tracks[track] for track, _ in tasks], candidate_lists)
+    return [[(intersects, [(point.x, point.y) for point in intersections]) for intersects, intersections in found]
+            for found in found_lists]
+
+
+def get_geometry(track: 'network.Track') -> tuple:
+    a = track.node_a.position
+    b = track.node_b.position
+    if isinstance(track, network.CurvedTrack):
+        return CURVED, a.x, a.y, b.x, b.y, track.center.x, track.center.y, track.radius, track.a_angle, \
+            track.b_angle, track.start_angle, track.stop_angle
+    return STRAIGHT, a.x, a.y, b.x, b.y
+
+
+def _from_geometry(geometry: tuple) -> 'network.Track':
+    node_a = network.Node(None, Vector2(geometry[1], geometry[2]))
+    node_b = network.Node(None, Vector2(geometry[3], geometry[4]))
+    if geometry[0] == CURVED:
+        return network.CurvedTrack(None, node_a, node_b, Vector2(geometry[5], geometry[6]), *geometry[7:])
+    return network.StraightTrack(None, node_a, node_b)
@@ -0,0 +1,212 @@
+"""
+Saving and loading of networks. The binary format consists of a header followed by fixed-width node, track and
+connection records, all little endian:
+
+    header:     magic, format version, node count, track count, connection count
+    node:       id, x, y, color, size
+    track:      id, kind, node a index, node b index, color, width, center x, center y, radius, a angle, b angle,
+                start angle, stop angle (the arc parameters are zero for straight tracks)
+    connection: node index, track index, track index
+
+Nodes and tracks refer to each other by their position in the file. Loading maps the file into memory and rebuilds the
+network directly from the records, without resolving intersections or deriving connections again. Large networks that
+are only viewed can be loaded into a NetworkStore instead, which keeps the records in arrays.
+"""
+import json
+import mmap
+import struct
+
+import pygame
+from canvas import Canvas
+from network import Network, Node, StraightTrack, CurvedTrack, SPATIAL_GRID_CELL_SIZE, ids
+from store import NetworkStore
+
+MAGIC = b'TRNW'
+FORMAT_VERSION = 1
+
+STRAIGHT = 0
+CURVED = 1
+
+HEADER = struct.Struct('<4sHIII')
+NODE = struct.Struct('<qdd3BH')
+TRACK = struct.Struct('<qBII3BB7d')
+CONNECTION = struct.Struct('<III')
+
+
+def save(network: Network, path: str):
+    node_indices = {node: i for i, node in enumerate(network.nodes.values())}
+    track_indices = {track: i for i, track in enumerate(network.tracks.values())}
+    connections = _get_connections(network, node_indices, track_indices)
+
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(network.nodes), len(network.tracks), len(connections)))
+        for node in network.nodes.values():
+            file.write(NODE.pack(node.id, node.position.x, node.position.y, *node.color, node.size))
+        for track in network.tracks.values():
+            node_a = node_indices[track.node_a]
+            node_b = node_indices[track.node_b]
+            if isinstance(track, CurvedTrack):
+                file.write(TRACK.pack(track.id, CURVED, node_a, node_b, *track.color, track.width, track.center.x,
+                                      track.center.y, track.radius, track.a_angle, track.b_angle, track.start_angle,
+                                      track.stop_angle))
+            else:
+                file.write(TRACK.pack(track.id, STRAIGHT, node_a, node_b, *track.color, track.width, 0, 0, 0, 0, 0, 0,
+                                      0))
+        for connection in connections:
+            file.write(CONNECTION.pack(*connection))
+
+
+def load(path: str, canvas: Canvas, cell_size: float = SPATIAL_GRID_CELL_SIZE) -> Network:
+    """
+    Loads a network saved with save. Ids are preserved, and the id counters are advanced past them so that elements
+    created afterwards do not collide with the loaded ones.
+    """
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        view = memoryview(data)
+        try:
+            return _load(view, canvas, cell_size)
+        finally:
+            view.release()
+
+
+def load_store(path: str, canvas: Canvas, cell_size: float = SPATIAL_GRID_CELL_SIZE) -> NetworkStore:
+    """
+    Loads a network saved with save into a NetworkStore, without creating a node or track object. The store has one
+    color and size for all nodes and tracks, and derives the connections from the geometry, so the colors, sizes and
+    connection records of the file are not used.
+    """
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        view = memoryview(data)
+        try:
+            return _load_store(view, canvas, cell_size)
+        finally:
+            view.release()
+
+
+def export_json(network: Network, path: str):
+    node_indices = {node: i for i, node in enumerate(network.nodes.values())}
+    track_indices = {track: i for i, track in enumerate(network.tracks.values())}
+    nodes = list(network.nodes.values())
+    tracks = []
+    for track in network.tracks.values():
+        entry = {
+            'id': track.id,
+            'type': 'curved' if isinstance(track, CurvedTrack) else 'straight',
+            'node_a': track.node_a.id,
+            'node_b': track.node_b.id,
+            'color': list(track.color),
+            'width': track.width,
+        }
+        if isinstance(track, CurvedTrack):
+            entry.update({
+                'center': [track.center.x, track.center.y],
+                'radius': track.radius,
+                'a_angle': track.a_angle,
+                'b_angle': track.b_angle,
+                'start_angle': track.start_angle,
+                'stop_angle': track.stop_angle,
+            })
+        tracks.append(entry)
+
+    document = {
+        'version': FORMAT_VERSION,
+        'nodes': [{
+            'id': node.id,
+            'position': [node.position.x, node.position.y],
+            'color': list(node.color),
+            'size': node.size,
+        } for node in nodes],
+        'tracks': tracks,
+        'connections': [{
+            'node': nodes[node].id,
+            'tracks': [tracks[track_a]['id'], tracks[track_b]['id']],
+        } for node, track_a, track_b in _get_connections(network, node_indices, track_indices)],
+    }
+    with open(path, 'w') as file:
+        json.dump(document, file, indent=2)
+
+
+def _get_connections(network: Network, node_indices: dict, track_indices: dict) -> list:
+    # Every connection is listed once, with the track that comes first in the file first
+    connections = []
+    for node in network.nodes.values():
+        for track, connected in node.connections.tracks.items():
+            for other in connected:
+                if track_indices[track] < track_indices[other]:
+                    connections.append((node_indices[node], track_indices[track], track_indices[other]))
+    return connections
+
+
+def _read_header(view: memoryview) -> (int, int, int):
+    """
+    :return: Number of nodes, tracks and connections in the file
+    """
+    magic, version, node_count, track_count, connection_count = HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise ValueError('not a network file')
+    if version != FORMAT_VERSION:
+        raise ValueError(f'unsupported network file version {version}')
+    return node_count, track_count, connection_count
+
+
+def _load(view: memoryview, canvas: Canvas, cell_size: float) -> Network:
+    node_count, track_count, connection_count = _read_header(view)
+    result = Network(canvas, cell_size)
+    offset = HEADER.size
+
+    nodes = []
+    end = offset + node_count * NODE.size
+    for node_id, x, y, r, g, b, size in NODE.iter_unpack(view[offset:end]):
+        node = Node(canvas, pygame.Vector2(x, y))
+        node.id = node_id
+        node.color = (r, g, b)
+        node.size = size
+        result._add_node(node)
+        nodes.append(node)
+    offset = end
+
+    tracks = []
+    end = offset + track_count * TRACK.size
+    for track_id, kind, node_a, node_b, r, g, b, width, center_x, center_y, radius, a_angle, b_angle, start_angle, \
+            stop_angle in TRACK.iter_unpack(view[offset:end]):
+        if kind == CURVED:
+            track = CurvedTrack(canvas, nodes[node_a], nodes[node_b], pygame.Vector2(center_x, center_y), radius,
+                                a_angle, b_angle, start_angle, stop_angle)
+        else:
+            track = StraightTrack(canvas, nodes[node_a], nodes[node_b])
+        track.id = track_id
+        track.color = (r, g, b)
+        track.width = width
+        result._insert_track(track, connect=False)
+        tracks.append(track)
+    offset = end
+
+    end = offset + connection_count * CONNECTION.size
+    for node, track_a, track_b in CONNECTION.iter_unpack(view[offset:end]):
+        nodes[node].connections.connect(tracks[track_a], tracks[track_b])
+
+    ids['node'] = max([ids['node']] + [node.id + 1 for node in nodes])
+    ids['track'] = max([ids['track']] + [track.id + 1 for track in tracks])
+    return result
+
+
+def _load_store(view: memoryview, canvas: Canvas, cell_size: float) -> NetworkStore:
+    node_count, track_count, _ = _read_header(view)
+    result = NetworkStore(canvas, cell_size)
+    offset = HEADER.size
+
+    end = offset + node_count * NODE.size
+    for node_id, x, y, *_ in NODE.iter_unpack(view[offset:end]):
+        result.add_node(node_id, x, y)
+    offset = end
+
+    end = offset + track_count * TRACK.size
+    # Nodes are added in the order of the file, so the node indices of the records are the indices in the store
+    for track_id, kind, node_a, node_b, r, g, b, width, center_x, center_y, radius, a_angle, b_angle, start_angle, \
+            stop_angle in TRACK.iter_unpack(view[offset:end]):
+        if kind == CURVED:
+            result.add_curved_track(track_id, node_a, node_b, center_x, center_y, radius, a_angle, b_angle,
+                                    start_angle, stop_angle)
+        else:
+            result.add_straight_track(track_id, node_a, node_b)
+    return result
@@ -0,0 +1,265 @@
+import collections
+import heapq
+import itertools
+from typing import Callable, Optional
+
+from network import Network, NetworkListener, Node, Track
+from topology import Topology
+
+# Number of landmarks picked per component, and the number of them that estimate a single route
+LANDMARK_COUNT = 8
+ACTIVE_LANDMARK_COUNT = 2
+# Factor by which landmarks have to improve on the straight line distance at the source to be used
+LANDMARK_MIN_GAIN = 1.5
+# Number of routes a RouteCache keeps
+ROUTE_CACHE_CAPACITY = 4096
+
+
+class Route:
+    def __init__(self, nodes: list, tracks: list, length: float):
+        self.nodes = nodes
+        self.tracks = tracks
+        self.length = length
+
+
+class Router:
+    """
+    Finds shortest routes through a network. A train that arrives at a node over some track can only continue on the
+    tracks connected to it in the node's Connections, so the search runs over (track, node) states: the track that was
+    taken and the node it was left at. The connections are kept up to date by the network when tracks are added or
+    split, so no adjacency has to be built per query.
+    """
+    def __init__(self, network: Network):
+        self.network = network
+
+    def find_route(self, source: Node, target: Node, estimate: Callable = None) -> Optional[Route]:
+        """
+        A* search from source to target, using the track lengths as weights and the straight line distance to the
+        target as heuristic. The heuristic never overestimates, as no track is shorter than the chord between its nodes.
+        :param estimate: Heuristic to use instead, a function of a node that returns a consistent lower bound of the
+            length of the route from the node to the target
+        :return: The shortest route, or None if the target can not be reached
+        """
+        if source is target:
+            return Route([source], [], 0)
+        if estimate is None:
+            def estimate(node):
+                return self._estimate(node, target)
+
+        counter = itertools.count()
+        open_states = []
+        costs = {}
+        parents = {}
+        for track in source.connections.tracks:
+            node = track.get_other_node(source)
+            state = (track, node)
+            cost = track.get_length()
+            if cost < costs.get(state, float('inf')):
+                costs[state] = cost
+                parents[state] = None
+                heapq.heappush(open_states, (cost + estimate(node), next(counter), cost, state))
+
+        while open_states:
+            _, _, cost, state = heapq.heappop(open_states)
+            if cost > costs[state]:
+                continue
+            track, node = state
+            if node is target:
+                return self._build_route(source, state, parents, cost)
+            for next_track in node.connections.tracks[track]:
+                next_node = next_track.get_other_node(node)
+                next_state = (next_track, next_node)
+                next_cost = cost + next_track.get_length()
+                if next_cost < costs.get(next_state, float('inf')):
+                    costs[next_state] = next_cost
+                    parents[next_state] = state
+                    heapq.heappush(open_states, (next_cost + estimate(next_node), next(counter), next_cost, next_state))
+        return None
+
+    @staticmethod
+    def _estimate(node: Node, target: Node) -> float:
+        return node.position.distance_to(target.position)
+
+    @staticmethod
+    def _build_route(source: Node, state, parents: dict, length: float) -> Route:
+        nodes = []
+        tracks = []
+        while state is not None:
+            track, node = state
+            nodes.append(node)
+            tracks.append(track)
+            state = parents[state]
+        nodes.append(source)
+        nodes.reverse()
+        tracks.reverse()
+        return Route(nodes, tracks, length)
+
+
+class RouteCache(NetworkListener):
+    """
+    Router for networks that are queried for routes between the same nodes over and over. Recent routes are kept in an
+    LRU cache, and the searches are guided by landmarks (ALT): the distances from a few landmarks to every node of a
+    component give a lower bound of the distance between any two of its nodes, by the triangle inequality, which is
+    much tighter than the straight line distance in networks with detours.
+
+    Both are kept per connected component, see Topology. Every component has a stamp that changes whenever a track or
+    node of it is added or split, which only invalidates the routes and landmarks of that component. Removing tracks
+    or nodes, e.g. on undo, invalidates everything. Returned routes are shared and must not be modified.
+    """
+    def __init__(self, network: Network, landmark_count: int = LANDMARK_COUNT, capacity: int = ROUTE_CACHE_CAPACITY):
+        self.network = network
+        self.landmark_count = landmark_count
+        self.capacity = capacity
+        # Registered before the cache itself, so that it has seen every change by the time the cache is notified
+        self.topology = Topology(network)
+        self.router = Router(network)
+        # (source, target) -> (stamp, route), least recently used first
+        self.routes = collections.OrderedDict()
+        # Root of a component -> (stamp, list of distances from every landmark by node)
+        self.landmarks = {}
+        # Root of a component -> stamp of the latest change of it, 0 if it didn't change since the last reset
+        self.stamps = {}
+        self.clock = 0
+        # Nodes whose components changed since the last query
+        self.touched = []
+        # Tracks that were removed and not split
+        self.removed = set()
+        self.outdated = False
+        network.listeners.append(self)
+
+    def close(self):
+        """
+        Stops following the network.
+        """
+        self.network.listeners.remove(self)
+        self.topology.close()
+
+    def find_route(self, source: Node, target: Node) -> Optional[Route]:
+        """
+        :return: The shortest route, or None if the target can not be reached or a node is not part of the network
+        """
+        if self.network.nodes.get(source.id) is not source or self.network.nodes.get(target.id) is not target:
+            return None
+        self._refresh()
+        root = self.topology.get_component(source)
+        stamp = self.stamps.get(root, 0)
+        key = (source, target)
+        cached = self.routes.get(key)
+        if cached is not None and cached[0] == stamp:
+            self.routes.move_to_end(key)
+            self.network.stats.count('route cache hits')
+            return cached[1]
+
+        self.network.stats.count('route cache misses')
+        if self.topology.get_component(target) is not root:
+            route = None
+        else:
+            route = self.router.find_route(source, target, self._get_estimate(root, stamp, source, target))
+        self.routes[key] = (stamp, route)
+        self.routes.move_to_end(key)
+        if len(self.routes) > self.capacity:
+            self.routes.popitem(last=False)
+        return route
+
+    def on_node_added(self, node: Node):
+        self.touched.append(node)
+
+    def on_node_removed(self, node: Node):
+        self.outdated = True
+
+    def on_track_added(self, track: Track):
+        self.touched.append(track.node_a)
+        self.touched.append(track.node_b)
+
+    def on_track_removed(self, track: Track):
+        self.removed.add(track)
+
+    def on_track_split(self, track: Track, pieces: list):
+        # The pieces connect the same nodes, and adding them already touched the component
+        self.removed.discard(track)
+
+    def _refresh(self):
+        """
+        Stamps the components that changed since the last query, or resets the cache if tracks or nodes were removed.
+        """
+        if self.outdated or self.removed:
+            self.routes.clear()
+            self.landmarks.clear()
+            self.stamps.clear()
+            self.touched.clear()
+            self.removed.clear()
+            self.outdated = False
+            return
+        if not self.touched:
+            return
+        self.clock += 1
+        for node in self.touched:
+            self.stamps[self.topology.get_component(node)] = self.clock
+        self.touched.clear()
+
+    def _get_estimate(self, root: Node, stamp: int, source: Node, target: Node) -> Callable:
+        """
+        :return: Heuristic for routes to the target within the component: the largest lower bound of the straight line
+            distance and the differences of the distances from the active landmarks, the ones that give the largest
+            bounds at the source, as far as they are clearly larger than the straight line distance
+        """
+        landmarks = self.landmarks.get(root)
+        if landmarks is None or landmarks[0] != stamp:
+            landmarks = self.landmarks[root] = (stamp, self._compute_landmarks(root))
+        target_position = target.position
+        # Landmarks that barely improve on the straight line distance at the source are not worth their lookups
+        straight = source.position.distance_to(target_position)
+        tables = [(distances, distances[target]) for distances in landmarks[1]
+                  if abs(distances[target] - distances[source]) > straight * LANDMARK_MIN_GAIN]
+        tables.sort(key=lambda table: abs(table[1] - table[0][source]), reverse=True)
+        del tables[ACTIVE_LANDMARK_COUNT:]
+        if not tables:
+            return lambda node: node.position.distance_to(target_position)
+
+        def estimate(node: Node) -> float:
+            bound = node.position.distance_to(target_position)
+            for distances, target_distance in tables:
+                difference = abs(target_distance - distances[node])
+                if difference > bound:
+                    bound = difference
+            return bound
+        return estimate
+
+    def _compute_landmarks(self, root: Node) -> list:
+        """
+        Picks the landmarks of a component by farthest point selection: every landmark is the node furthest from the
+        ones picked before, starting from the node furthest from the root.
+        :return: List of the distances from every landmark by node
+        """
+        nearest = self._get_distances(root)
+        landmarks = []
+        for _ in range(min(self.landmark_count, len(nearest) - 1)):
+            landmark = max(nearest, key=nearest.get)
+            if nearest[landmark] == 0:
+                break
+            distances = self._get_distances(landmark)
+            landmarks.append(distances)
+            nearest = {node: min(distance, distances[node]) for node, distance in nearest.items()}
+        return landmarks
+
+    @staticmethod
+    def _get_distances(source: Node) -> dict:
+        """
+        Dijkstra over the tracks regardless of their connections, which can only make the distances shorter than the
+        ones a train can take, so their differences remain lower bounds.
+        :return: Distance from the source to every node of its component
+        """
+        distances = {source: 0}
+        counter = itertools.count()
+        open_nodes = [(0, next(counter), source)]
+        while open_nodes:
+            distance, _, node = heapq.heappop(open_nodes)
+            if distance > distances[node]:
+                continue
+            for track in node.connections.tracks:
+                other = track.get_other_node(node)
+                other_distance = distance + track.get_length()
+                if other_distance < distances.get(other, float('inf')):
+                    distances[other] = other_distance
+                    heapq.heappush(open_nodes, (other_distance, next(counter), other))
+        return distances
@@ -0,0 +1,130 @@
+from geom_batch import np
+from network import Network, NetworkListener, Track
+
+# Distance behind the head of a train that it still occupies
+TRAIN_LENGTH = 40
+# Distance in front of the end of a leg at which a train has to reserve the next leg, and stops if it can not
+SIGNAL_CLEARANCE = 15
+
+
+class BlockOccupancy(NetworkListener):
+    """
+    Block signalling for a Simulation: every track is a block that can be held by at most one train. A train holds a
+    contiguous interval of the legs of its route, from the leg its tail is on to the leg its head is on, together with
+    the nodes between those legs. Before its head comes within the clearance of the next leg, the train has to reserve
+    the track of that leg and the node in front of it; if either is held by another train, the train stops at the
+    clearance until they are released.
+
+    Reservations and releases only touch the legs at the ends of the intervals, so a tick costs O(trains) plus the
+    number of legs that were entered or left. Blocks are keyed on the id of the track, and the ids of tracks that were
+    split are resolved to the ids of their pieces, so a train keeps holding a track while it is split underneath it.
+    """
+    def __init__(self, network: Network, train_length: float = TRAIN_LENGTH, clearance: float = SIGNAL_CLEARANCE):
+        self.network = network
+        self.train_length = train_length
+        self.clearance = clearance
+        # Track id or node id -> index of the train holding it
+        self.track_holders = {}
+        self.node_holders = {}
+        # Ids of the pieces that replaced a split track
+        self.splits = {}
+        # Interval of legs held by every train
+        self.first_held = np.zeros(0, dtype=np.int64)
+        self.last_held = np.zeros(0, dtype=np.int64)
+        self.blocked = np.zeros(0, dtype=bool)
+        self.version = network.version
+        network.listeners.append(self)
+
+    def on_track_split(self, track: Track, pieces: list):
+        self.splits.setdefault(track.id, []).extend(piece.id for piece in pieces)
+
+    def get_holder(self, track: Track):
+        """
+        :return: Index of the train holding the track, or None
+        """
+        return self.track_holders.get(track.id)
+
+    def update(self, simulation, distance):
+        """
+        Reserves and releases the legs the trains enter and leave when moving to the given distances.
+        :param distance: Array with the distance every train would move to
+        :return: Array with the distance every train can move to
+        """
+        if len(self.first_held) < len(distance):
+            self._add_trains(simulation)
+        if self.version != self.network.version:
+            # The tracks may have been split, removed or restored, so the held ids have to be resolved again
+            self._rebuild(simulation)
+
+        distance = distance.copy()
+        # A head exactly at the clearance of a leg has not reached the next leg yet
+        heads = simulation.get_legs(np.minimum(distance + self.clearance, simulation.length), side='left')
+        self.blocked[:] = False
+        for train in np.nonzero(heads > self.last_held)[0].tolist():
+            for leg in range(int(self.last_held[train]) + 1, int(heads[train]) + 1):
+                if not self._reserve(simulation, train, leg):
+                    stop = simulation.leg_end[leg - 1] - simulation.base[train] - self.clearance
+                    # A train that is already past the stop does not move back to it
+                    distance[train] = min(distance[train], max(stop, simulation.distance[train]))
+                    self.blocked[train] = True
+                    break
+                self.last_held[train] = leg
+
+        tails = np.minimum(simulation.get_legs(np.maximum(distance - self.train_length, 0)), self.last_held)
+        for train in np.nonzero(tails > self.first_held)[0].tolist():
+            for leg in range(int(self.first_held[train]), int(tails[train])):
+                self._release(simulation, train, leg)
+            self.first_held[train] = tails[train]
+        return distance
+
+    def _add_trains(self, simulation):
+        count = len(self.first_held)
+        start = simulation.get_legs(simulation.distance)[count:]
+        self.first_held = np.append(self.first_held, start)
+        self.last_held = np.append(self.last_held, start)
+        self.blocked = np.append(self.blocked, np.zeros(len(start), dtype=bool))
+        for train, leg in enumerate(start, count):
+            # A train that is placed on a held track has no choice but to share it
+            for track_id in self._resolve(simulation.leg_track_id[leg]):
+                self.track_holders.setdefault(track_id, train)
+
+    def _reserve(self, simulation, train: int, leg: int) -> bool:
+        track_ids = self._resolve(simulation.leg_track_id[leg])
+        node_id = int(simulation.leg_node_id[leg - 1])
+        if self.node_holders.get(node_id, train) != train:
+            return False
+        for track_id in track_ids:
+            if self.track_holders.get(track_id, train) != train:
+                return False
+        self.node_holders[node_id] = train
+        for track_id in track_ids:
+            self.track_holders[track_id] = train
+        return True
+
+    def _release(self, simulation, train: int, leg: int):
+        for track_id in self._resolve(simulation.leg_track_id[leg]):
+            if self.track_holders.get(track_id) == train:
+                del self.track_holders[track_id]
+        node_id = int(simulation.leg_node_id[leg])
+        if self.node_holders.get(node_id) == train:
+            del self.node_holders[node_id]
+
+    def _rebuild(self, simulation):
+        self.track_holders.clear()
+        self.node_holders.clear()
+        for train, (first, last) in enumerate(zip(self.first_held.tolist(), self.last_held.tolist())):
+            for leg in range(first, last + 1):
+                for track_id in self._resolve(simulation.leg_track_id[leg]):
+                    self.track_holders.setdefault(track_id, train)
+                if leg < last:
+                    self.node_holders.setdefault(int(simulation.leg_node_id[leg]), train)
+        self.version = self.network.version
+
+    def _resolve(self, track_id) -> list:
+        """
+        :return: Ids of the tracks in the network that make up the track with the given id
+        """
+        track_id = int(track_id)
+        if track_id in self.network.tracks or track_id not in self.splits:
+            return [track_id]
+        return [resolved for piece in self.splits[track_id] for resolved in self._resolve(piece)]
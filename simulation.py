@@ -0,0 +1,207 @@
+import pygame
+from canvas import Canvas
+from geom_batch import np
+from network import Network, CurvedTrack
+from routing import Route
+
+TRAIN_SIZE = 5
+TIMESTEP = 1 / 60
+# Upper bound on the steps per update, so that a slow frame does not make the next one even slower
+MAX_STEPS_PER_UPDATE = 10
+
+
+class Simulation:
+    """
+    Moves trains along routes through a network. The simulation advances in fixed timesteps, independent of the frame
+    rate at which it is updated and drawn.
+
+    The routes of all trains are flattened into one table of legs, one leg per track. Every leg occupies an interval of
+    a global distance axis, and every train an interval that is the concatenation of its legs, so locating all trains
+    is a single sorted search over the leg ends. Trains are parametrized by the distance along straight legs and by the
+    angle along curved legs.
+    """
+    def __init__(self, network: Network, timestep: float = TIMESTEP, occupancy=None):
+        """
+        :param occupancy: Optional BlockOccupancy that trains have to reserve their tracks with before entering them
+        """
+        if np is None:
+            raise ImportError('the simulation requires numpy')
+        self.network = network
+        self.timestep = timestep
+        self.occupancy = occupancy
+        self.time = 0
+        self.accumulator = 0
+        self.color = (220, 80, 60)
+        self.size = TRAIN_SIZE
+
+        # Per train
+        self.distance = np.zeros(0)
+        self.previous_distance = np.zeros(0)
+        self.speed = np.zeros(0)
+        self.length = np.zeros(0)
+        self.base = np.zeros(0)
+        self.first_leg = np.zeros(0, dtype=np.int64)
+        self.last_leg = np.zeros(0, dtype=np.int64)
+
+        # Per leg
+        self.leg_curved = np.zeros(0, dtype=bool)
+        self.leg_from = np.zeros((0, 2))
+        self.leg_to = np.zeros((0, 2))
+        self.leg_center = np.zeros((0, 2))
+        self.leg_radius = np.zeros(0)
+        self.leg_angle = np.zeros(0)
+        self.leg_sign = np.zeros(0)
+        self.leg_start = np.zeros(0)
+        self.leg_end = np.zeros(0)
+        self.leg_track_id = np.zeros(0, dtype=np.int64)
+        # Node at the end of the leg
+        self.leg_node_id = np.zeros(0, dtype=np.int64)
+
+        self.pending_trains = []
+        self.pending_legs = []
+
+    def __len__(self) -> int:
+        return len(self.distance) + len(self.pending_trains)
+
+    def add_train(self, route: Route, speed: float, distance: float = 0) -> int:
+        """
+        Adds a train. New trains are buffered and added to the arrays in one go before the next step or query.
+        :param route: Route to follow, the train stops at its end
+        :param speed: Speed in world units per second
+        :param distance: Distance along the route to start at
+        :return: Index of the train
+        """
+        if not route.tracks:
+            raise ValueError('route has no tracks')
+        legs = [self._get_leg(track, node) for track, node in zip(route.tracks, route.nodes)]
+        length = sum(leg[6] for leg in legs)
+        self.pending_trains.append((min(max(distance, 0), length), speed, length, len(legs)))
+        self.pending_legs.extend(legs)
+        return len(self.distance) + len(self.pending_trains) - 1
+
+    def update(self, elapsed: float):
+        """
+        Advances the simulation by the elapsed real time, in as many fixed timesteps as fit into it. The remainder is
+        carried over to the next update.
+        """
+        self.accumulator += elapsed
+        steps = 0
+        while self.accumulator >= self.timestep and steps < MAX_STEPS_PER_UPDATE:
+            self.step()
+            self.accumulator -= self.timestep
+            steps += 1
+        if steps == MAX_STEPS_PER_UPDATE:
+            self.accumulator = 0
+
+    def step(self):
+        self._add_pending()
+        self.previous_distance = self.distance
+        distance = np.minimum(self.distance + self.speed * self.timestep, self.length)
+        if self.occupancy is not None:
+            distance = self.occupancy.update(self, distance)
+        self.distance = distance
+        self.time += self.timestep
+
+    def is_finished(self):
+        self._add_pending()
+        return self.distance >= self.length
+
+    def get_positions(self, alpha: float = 1):
+        """
+        :param alpha: Fraction of the timestep to interpolate between the previous and the current step
+        :return: Array of shape (n, 2) with the world positions of all trains
+        """
+        self._add_pending()
+        distance = self.previous_distance + (self.distance - self.previous_distance) * alpha
+        legs = self.get_legs(distance)
+        along = self.base + distance - self.leg_start[legs]
+
+        curved = self.leg_curved[legs]
+        positions = np.empty((len(distance), 2))
+        straight = ~curved
+        if straight.any():
+            straight_legs = legs[straight]
+            leg_from = self.leg_from[straight_legs]
+            leg_vector = self.leg_to[straight_legs] - leg_from
+            leg_length = self.leg_end[straight_legs] - self.leg_start[straight_legs]
+            t = np.divide(along[straight], leg_length, out=np.zeros_like(leg_length), where=leg_length > 0)
+            positions[straight] = leg_from + leg_vector * t[:, None]
+        if curved.any():
+            curved_legs = legs[curved]
+            radius = self.leg_radius[curved_legs]
+            angle = self.leg_angle[curved_legs] + self.leg_sign[curved_legs] * along[curved] / radius
+            positions[curved] = self.leg_center[curved_legs] + radius[:, None] * np.stack([np.cos(angle),
+                                                                                           np.sin(angle)], axis=-1)
+        return positions
+
+    def get_legs(self, distance, side: str = 'right'):
+        """
+        :param distance: Array with a distance along the route of every train
+        :param side: Which leg to return for a distance at the boundary of two legs, 'left' for the first one and
+            'right' for the second one
+        :return: Array with the global index of the leg every train is on
+        """
+        legs = np.searchsorted(self.leg_end, self.base + distance, side=side)
+        return np.clip(legs, self.first_leg, self.last_leg)
+
+    def draw(self, surface, canvas: Canvas):
+        if len(self) == 0:
+            return
+        positions = self.get_positions(self.accumulator / self.timestep)
+        x = positions[:, 0] * canvas.scale + canvas.offset.x
+        y = -positions[:, 1] * canvas.scale + canvas.offset.y
+        width, height = surface.get_size()
+        visible = (x >= -self.size) & (x <= width + self.size) & (y >= -self.size) & (y <= height + self.size)
+        for screen_x, screen_y in zip(x[visible].tolist(), y[visible].tolist()):
+            pygame.draw.circle(surface, self.color, (screen_x, screen_y), self.size)
+
+    def _add_pending(self):
+        if not self.pending_trains:
+            return
+        legs = self.pending_legs
+        distance, speed, length, leg_count = (np.array(column) for column in zip(*self.pending_trains))
+        base = self.leg_end[-1] if len(self.leg_end) else 0
+        lengths = np.array([leg[6] for leg in legs])
+        ends = base + np.cumsum(lengths)
+        last_leg = len(self.leg_end) + np.cumsum(leg_count) - 1
+        first_leg = np.concatenate([[len(self.leg_end)], last_leg[:-1] + 1])
+        train_base = np.concatenate([[base], ends[last_leg[:-1] - len(self.leg_end)]])
+
+        self.leg_curved = np.append(self.leg_curved, [leg[0] for leg in legs])
+        self.leg_from = np.concatenate([self.leg_from, [leg[1] for leg in legs]])
+        self.leg_to = np.concatenate([self.leg_to, [leg[2] for leg in legs]])
+        self.leg_center = np.concatenate([self.leg_center, [leg[3] for leg in legs]])
+        self.leg_radius = np.append(self.leg_radius, [leg[4] for leg in legs])
+        self.leg_angle = np.append(self.leg_angle, [leg[5][0] for leg in legs])
+        self.leg_sign = np.append(self.leg_sign, [leg[5][1] for leg in legs])
+        self.leg_start = np.append(self.leg_start, ends - lengths)
+        self.leg_end = np.append(self.leg_end, ends)
+        self.leg_track_id = np.append(self.leg_track_id, [leg[7] for leg in legs])
+        self.leg_node_id = np.append(self.leg_node_id, [leg[8] for leg in legs])
+
+        self.distance = np.append(self.distance, distance)
+        self.previous_distance = np.append(self.previous_distance, distance)
+        self.speed = np.append(self.speed, speed)
+        self.length = np.append(self.length, length)
+        self.base = np.append(self.base, train_base)
+        self.first_leg = np.append(self.first_leg, first_leg)
+        self.last_leg = np.append(self.last_leg, last_leg)
+        self.pending_trains = []
+        self.pending_legs = []
+
+    @staticmethod
+    def _get_leg(track, node) -> tuple:
+        """
+        :return: (curved, from position, to position, center, radius, (from angle, angle direction), length, track id,
+            to node id) of the leg that runs over the track starting at the node
+        """
+        other = track.get_other_node(node)
+        from_position = (node.position.x, node.position.y)
+        to_position = (other.position.x, other.position.y)
+        if isinstance(track, CurvedTrack):
+            from_angle = track.a_angle if node is track.node_a else track.b_angle
+            # The arc runs counter clockwise from start to stop angle
+            sign = 1 if from_angle == track.start_angle else -1
+            return True, from_position, to_position, (track.center.x, track.center.y), track.radius, \
+                (from_angle, sign), track.get_length(), track.id, other.id
+        return False, from_position, to_position, (0, 0), 0, (0, 0), track.get_length(), track.id, other.id
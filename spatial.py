@@ -0,0 +1,244 @@
+import heapq
+import math
+
+
+class BoundingBox:
+    @staticmethod
+    def overlaps(a: (float, float, float, float), b: (float, float, float, float)) -> bool:
+        return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+    @staticmethod
+    def expand(box: (float, float, float, float), margin: float) -> (float, float, float, float):
+        return box[0] - margin, box[1] - margin, box[2] + margin, box[3] + margin
+
+
+class SweepLine:
+    @staticmethod
+    def overlapping_pairs(boxes: list) -> list:
+        """
+        Finds all pairs of boxes that overlap by sweeping a vertical line from left to right over the boxes. The y
+        ranges of the boxes that the sweep line currently crosses are kept in two segment trees over the y coordinates,
+        one to find the ranges that contain the min y of a box, and one to find the ranges that start between its min y
+        and max y. Each overlapping box is found once, in O(log n), so this takes O((n + k) log n) for k pairs.
+        :param boxes: List of (min_x, min_y, max_x, max_y) tuples
+        :return: List of index pairs (i, j) with i < j, sorted
+        """
+        ys = sorted({y for box in boxes for y in (box[1], box[3])})
+        y_index = {y: index for index, y in enumerate(ys)}
+        size = 1
+        while size < len(ys):
+            size *= 2
+        # Boxes by the nodes of the canonical decomposition of their y range
+        covering = [set() for _ in range(2 * size)]
+        # Boxes by the leaf of their min y, and the number of boxes below every node
+        starting = [set() for _ in range(size)]
+        counts = [0] * (2 * size)
+
+        order = sorted(range(len(boxes)), key=lambda i: boxes[i][0])
+        ending = []
+        pairs = []
+        for i in order:
+            box = boxes[i]
+            while ending and ending[0][0] < box[0]:
+                j = heapq.heappop(ending)[1]
+                SweepLine._update(covering, starting, counts, size, y_index, boxes[j], j, False)
+            low = y_index[box[1]]
+            high = y_index[box[3]]
+            # Boxes whose y range contains the min y of the box
+            node = low + size
+            while node:
+                for j in covering[node]:
+                    pairs.append((i, j) if i < j else (j, i))
+                node //= 2
+            # Boxes whose y range starts above the min y of the box and not above its max y
+            if low < high:
+                stack = SweepLine._get_nodes(low + 1 + size, high + 1 + size)
+                while stack:
+                    node = stack.pop()
+                    if not counts[node]:
+                        continue
+                    if node >= size:
+                        for j in starting[node - size]:
+                            pairs.append((i, j) if i < j else (j, i))
+                    else:
+                        stack.append(2 * node)
+                        stack.append(2 * node + 1)
+            SweepLine._update(covering, starting, counts, size, y_index, box, i, True)
+            heapq.heappush(ending, (box[2], i))
+        pairs.sort()
+        return pairs
+
+    @staticmethod
+    def _get_nodes(low: int, high: int) -> list:
+        """
+        :return: Nodes of the canonical decomposition of the leaves from low up to, but excluding, high
+        """
+        nodes = []
+        while low < high:
+            if low & 1:
+                nodes.append(low)
+                low += 1
+            if high & 1:
+                high -= 1
+                nodes.append(high)
+            low //= 2
+            high //= 2
+        return nodes
+
+    @staticmethod
+    def _update(covering: list, starting: list, counts: list, size: int, y_index: dict, box: tuple, i: int,
+                add: bool):
+        low = y_index[box[1]]
+        for node in SweepLine._get_nodes(low + size, y_index[box[3]] + 1 + size):
+            if add:
+                covering[node].add(i)
+            else:
+                covering[node].discard(i)
+        if add:
+            starting[low].add(i)
+        else:
+            starting[low].discard(i)
+        node = low + size
+        while node:
+            counts[node] += 1 if add else -1
+            node //= 2
+
+
+class SpatialGrid:
+    """
+    Uniform grid over axis aligned bounding boxes. Every item is registered in each cell that its bounding box
+    overlaps, so a query only has to look at the items in the cells overlapping the query box. Bounding boxes are
+    given as (min_x, min_y, max_x, max_y) tuples.
+
+    Snapshots share the sets of items of the cells with the grid. After a snapshot, the grid copies a cell's set the
+    first time it changes it, so snapshots are never affected by later changes.
+    """
+    def __init__(self, cell_size: float = 200):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.boxes = {}
+        # Cells whose set is not shared with a snapshot, or None if no snapshot was taken
+        self.owned = None
+
+    def insert(self, item, box: (float, float, float, float)):
+        if item in self.boxes:
+            self.remove(item)
+        self.boxes[item] = box
+        for cell in self._get_cells(box):
+            self._get_owned_items(cell).add(item)
+
+    def remove(self, item):
+        box = self.boxes.pop(item)
+        for cell in self._get_cells(box):
+            items = self._get_owned_items(cell)
+            items.discard(item)
+            if not items:
+                del self.cells[cell]
+
+    def snapshot(self) -> 'SpatialGrid':
+        """
+        :return: Copy of the grid that later changes of this grid do not affect. Copies the dictionaries of cells and
+            boxes, but none of the sets of items.
+        """
+        copy = SpatialGrid(self.cell_size)
+        copy.cells = dict(self.cells)
+        copy.boxes = dict(self.boxes)
+        copy.owned = set()
+        self.owned = set()
+        return copy
+
+    def query(self, box: (float, float, float, float)) -> set:
+        """
+        Returns all items whose bounding box overlaps the given box.
+        """
+        result = set()
+        for cell in self._get_cells(box):
+            items = self.cells.get(cell)
+            if items is None:
+                continue
+            for item in items:
+                if item not in result and BoundingBox.overlaps(self.boxes[item], box):
+                    result.add(item)
+        return result
+
+    def __contains__(self, item) -> bool:
+        return item in self.boxes
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def _get_owned_items(self, cell) -> set:
+        """
+        :return: Set of items of the cell that may be changed, copied first if it is shared with a snapshot
+        """
+        items = self.cells.get(cell)
+        if items is None:
+            items = self.cells[cell] = set()
+        elif self.owned is None or cell in self.owned:
+            return items
+        else:
+            items = self.cells[cell] = set(items)
+        if self.owned is not None:
+            self.owned.add(cell)
+        return items
+
+    def _get_cells(self, box: (float, float, float, float)):
+        min_x = math.floor(box[0] / self.cell_size)
+        min_y = math.floor(box[1] / self.cell_size)
+        max_x = math.floor(box[2] / self.cell_size)
+        max_y = math.floor(box[3] / self.cell_size)
+        for x in range(min_x, max_x + 1):
+            for y in range(min_y, max_y + 1):
+                yield x, y
+
+
+class PointHash:
+    """
+    Hashes points on a grid of quantized coordinates. A point closer than epsilon to the query position is always in
+    one of the 3x3 cells around the query cell, as long as epsilon does not exceed the cell size.
+    """
+    def __init__(self, cell_size: float = 1):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.entries = {}
+        self.counter = 0
+
+    def insert(self, item, position):
+        if item in self.entries:
+            self.remove(item)
+        cell = self._get_cell(position)
+        entry = (self.counter, item, position)
+        self.counter += 1
+        self.entries[item] = (cell, entry)
+        self.cells.setdefault(cell, []).append(entry)
+
+    def remove(self, item):
+        cell, entry = self.entries.pop(item)
+        entries = self.cells[cell]
+        entries.remove(entry)
+        if not entries:
+            del self.cells[cell]
+
+    def find(self, position, epsilon: float):
+        """
+        Returns the earliest inserted item that lies closer than epsilon to the given position, or None.
+        """
+        if epsilon > self.cell_size:
+            raise ValueError(f'epsilon {epsilon} exceeds the cell size {self.cell_size}')
+        cell_x, cell_y = self._get_cell(position)
+        found = None
+        for x in range(cell_x - 1, cell_x + 2):
+            for y in range(cell_y - 1, cell_y + 2):
+                for entry in self.cells.get((x, y), ()):
+                    if (found is None or entry[0] < found[0]) and entry[2].distance_to(position) < epsilon:
+                        found = entry
+        return None if found is None else found[1]
+
+    def __contains__(self, item) -> bool:
+        return item in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _get_cell(self, position) -> (int, int):
+        return math.floor(position.x / self.cell_size), math.floor(position.y / self.cell_size)
@@ -0,0 +1,100 @@
+import collections
+import threading
+import time
+
+
+class Stats:
+    """
+    Counters and timers of a component, such as the network or the canvas. Counters count events by name, timers add
+    up the seconds spent in a named phase and how often it was entered, and maxima keep the largest value seen. While
+    disabled, nothing is recorded and every call returns right away, so instrumented code costs next to nothing.
+    """
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.counters = collections.Counter()
+        # Name -> [seconds, calls]
+        self.timers = {}
+        self.maxima = {}
+        self._timer = _Timer(self)
+
+    def count(self, name: str, amount: int = 1):
+        if self.enabled:
+            self.counters[name] += amount
+
+    def maximum(self, name: str, value: float):
+        if self.enabled and (name not in self.maxima or value > self.maxima[name]):
+            self.maxima[name] = value
+
+    def time(self, name: str):
+        """
+        :return: Context manager that adds the time spent in it to the timer with the given name
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return self._timer.start(name)
+
+    def reset(self):
+        self.counters.clear()
+        self.timers.clear()
+        self.maxima.clear()
+
+    def snapshot(self) -> dict:
+        """
+        :return: Copy of all values, e.g. to export them as JSON
+        """
+        return {
+            'counters': dict(self.counters),
+            'timers': {name: {'seconds': seconds, 'calls': calls} for name, (seconds, calls) in self.timers.items()},
+            'maxima': dict(self.maxima),
+        }
+
+    def format(self) -> list:
+        """
+        :return: One line of text per value, sorted by name
+        """
+        lines = [f'{name}: {seconds * 1000:.1f} ms / {calls}' for name, (seconds, calls) in sorted(self.timers.items())]
+        lines += [f'{name}: {value}' for name, value in sorted(self.counters.items())]
+        lines += [f'max {name}: {value}' for name, value in sorted(self.maxima.items())]
+        return lines
+
+
+class _Timer:
+    """
+    Reusable context manager for Stats.time. Timers can be nested, the stack keeps the start of every open one. Every
+    thread has its own stack, so a network can be edited in one thread while it is drawn in another.
+    """
+    def __init__(self, stats: Stats):
+        self.stats = stats
+        self.local = threading.local()
+
+    @property
+    def stack(self) -> list:
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def start(self, name: str):
+        self.stack.append((name, time.perf_counter()))
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        name, start = self.stack.pop()
+        timer = self.stats.timers.setdefault(name, [0.0, 0])
+        timer[0] += time.perf_counter() - start
+        timer[1] += 1
+        return False
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
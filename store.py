@@ -0,0 +1,304 @@
+import weakref
+from array import array
+
+import pygame
+from canvas import Canvas
+from network import Network, Node, Track, StraightTrack, CurvedTrack, Connections, TRACK_WIDTH, NODE_SIZE, \
+    SPATIAL_GRID_CELL_SIZE
+from spatial import BoundingBox, SpatialGrid
+
+STRAIGHT = 0
+CURVED = 1
+
+
+class NetworkStore:
+    """
+    Columnar storage for large networks. Node positions, track endpoints, arc parameters and adjacency are kept in
+    contiguous arrays instead of one object per element. Elements are accessed through handles, which provide the same
+    attribute API as Node, StraightTrack and CurvedTrack but only hold a reference to the store and an index. Handles
+    are created on access and shared for as long as they are referenced, so identity checks keep working.
+
+    Stores are filled with from_network or, without creating a network first, with persistence.load_store. The spatial
+    indices of the nodes and tracks, which query and draw use, are built on the first query, like the adjacency.
+    """
+    def __init__(self, canvas: Canvas, cell_size: float = SPATIAL_GRID_CELL_SIZE):
+        self.canvas = canvas
+        self.cell_size = cell_size
+        self.node_color = (75, 75, 75)
+        self.node_size = NODE_SIZE
+        self.track_color = (255, 255, 255)
+        self.track_width = TRACK_WIDTH
+
+        self.node_ids = array('q')
+        self.node_x = array('d')
+        self.node_y = array('d')
+
+        self.track_ids = array('q')
+        self.track_kinds = array('b')
+        self.track_node_a = array('q')
+        self.track_node_b = array('q')
+        # Arc parameters, zero for straight tracks
+        self.track_center_x = array('d')
+        self.track_center_y = array('d')
+        self.track_radius = array('d')
+        self.track_a_angle = array('d')
+        self.track_b_angle = array('d')
+        self.track_start_angle = array('d')
+        self.track_stop_angle = array('d')
+
+        # Adjacency in compressed sparse row form: the tracks of node i are adjacency[offsets[i]:offsets[i + 1]]
+        self.adjacency_offsets = None
+        self.adjacency = None
+        # Spatial indices of the node and track indices, or None until they are built
+        self.node_grid = None
+        self.track_index = None
+        self.handles = weakref.WeakValueDictionary()
+
+    @staticmethod
+    def from_network(network: Network) -> 'NetworkStore':
+        store = NetworkStore(network.canvas)
+        node_indices = {}
+        for node in network.nodes.values():
+            node_indices[node] = store.add_node(node.id, node.position.x, node.position.y)
+        for track in network.tracks.values():
+            node_a = node_indices[track.node_a]
+            node_b = node_indices[track.node_b]
+            if isinstance(track, StraightTrack):
+                store.add_straight_track(track.id, node_a, node_b)
+            elif isinstance(track, CurvedTrack):
+                store.add_curved_track(track.id, node_a, node_b, track.center.x, track.center.y, track.radius,
+                                       track.a_angle, track.b_angle, track.start_angle, track.stop_angle)
+        return store
+
+    def add_node(self, node_id: int, x: float, y: float) -> int:
+        self.node_ids.append(node_id)
+        self.node_x.append(x)
+        self.node_y.append(y)
+        self.adjacency_offsets = None
+        self.node_grid = None
+        return len(self.node_ids) - 1
+
+    def add_straight_track(self, track_id: int, node_a: int, node_b: int) -> int:
+        return self._add_track(track_id, STRAIGHT, node_a, node_b, 0, 0, 0, 0, 0, 0, 0)
+
+    def add_curved_track(self, track_id: int, node_a: int, node_b: int, center_x: float, center_y: float,
+                         radius: float, a_angle: float, b_angle: float, start_angle: float, stop_angle: float) -> int:
+        return self._add_track(track_id, CURVED, node_a, node_b, center_x, center_y, radius, a_angle, b_angle,
+                               start_angle, stop_angle)
+
+    def node_count(self) -> int:
+        return len(self.node_ids)
+
+    def track_count(self) -> int:
+        return len(self.track_ids)
+
+    def node(self, index: int) -> 'NodeHandle':
+        handle = self.handles.get((Node, index))
+        if handle is None:
+            handle = NodeHandle(self, index)
+            self.handles[(Node, index)] = handle
+        return handle
+
+    def track(self, index: int) -> Track:
+        handle = self.handles.get((Track, index))
+        if handle is None:
+            if self.track_kinds[index] == STRAIGHT:
+                handle = StraightTrackHandle(self, index)
+            else:
+                handle = CurvedTrackHandle(self, index)
+            self.handles[(Track, index)] = handle
+        return handle
+
+    def nodes(self):
+        for index in range(len(self.node_ids)):
+            yield self.node(index)
+
+    def tracks(self):
+        for index in range(len(self.track_ids)):
+            yield self.track(index)
+
+    def node_tracks(self, index: int):
+        if self.adjacency_offsets is None:
+            self._build_adjacency()
+        return self.adjacency[self.adjacency_offsets[index]:self.adjacency_offsets[index + 1]]
+
+    def query(self, box: (float, float, float, float)) -> (list, list):
+        """
+        :return: 1. Handles of the nodes and 2. handles of the tracks whose bounding boxes overlap the box, in the
+            order they were added
+        """
+        if self.track_index is None or self.node_grid is None:
+            self._build_indices()
+        nodes = [self.node(index) for index in sorted(self.node_grid.query(box))]
+        tracks = [self.track(index) for index in sorted(self.track_index.query(box))]
+        return nodes, tracks
+
+    def draw(self, surface):
+        nodes, tracks = self.query(BoundingBox.expand(self.canvas.get_viewport(surface), NODE_SIZE))
+        for track in tracks:
+            track.draw(surface)
+
+        for node in nodes:
+            node.draw(surface)
+
+    def _add_track(self, track_id, kind, node_a, node_b, center_x, center_y, radius, a_angle, b_angle, start_angle,
+                   stop_angle) -> int:
+        self.track_ids.append(track_id)
+        self.track_kinds.append(kind)
+        self.track_node_a.append(node_a)
+        self.track_node_b.append(node_b)
+        self.track_center_x.append(center_x)
+        self.track_center_y.append(center_y)
+        self.track_radius.append(radius)
+        self.track_a_angle.append(a_angle)
+        self.track_b_angle.append(b_angle)
+        self.track_start_angle.append(start_angle)
+        self.track_stop_angle.append(stop_angle)
+        self.adjacency_offsets = None
+        self.track_index = None
+        return len(self.track_ids) - 1
+
+    def _build_indices(self):
+        self.node_grid = SpatialGrid(self.cell_size)
+        for index, (x, y) in enumerate(zip(self.node_x, self.node_y)):
+            self.node_grid.insert(index, (x, y, x, y))
+        self.track_index = SpatialGrid(self.cell_size)
+        for index in range(len(self.track_ids)):
+            self.track_index.insert(index, self.track(index).get_bounding_box())
+
+    def _build_adjacency(self):
+        counts = array('q', bytes(8 * (len(self.node_ids) + 1)))
+        for node in self.track_node_a:
+            counts[node + 1] += 1
+        for node in self.track_node_b:
+            counts[node + 1] += 1
+        for i in range(len(self.node_ids)):
+            counts[i + 1] += counts[i]
+
+        adjacency = array('q', bytes(8 * counts[-1]))
+        filled = array('q', counts[:-1])
+        for track, (node_a, node_b) in enumerate(zip(self.track_node_a, self.track_node_b)):
+            adjacency[filled[node_a]] = track
+            filled[node_a] += 1
+            adjacency[filled[node_b]] = track
+            filled[node_b] += 1
+        self.adjacency_offsets = counts
+        self.adjacency = adjacency
+
+
+class ConnectionsHandle:
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store: NetworkStore, index: int):
+        self.store = store
+        self.index = index
+
+    @property
+    def tracks(self) -> dict:
+        node = self.store.node(self.index)
+        tracks = [self.store.track(track) for track in self.store.node_tracks(self.index)]
+        return {track: [other for other in tracks
+                        if other is not track and Connections.are_connectable(node, track, other)]
+                for track in tracks}
+
+
+class NodeHandle(Node):
+    __slots__ = ('store', 'index', '__weakref__')
+
+    def __init__(self, store: NetworkStore, index: int):
+        self.store = store
+        self.index = index
+
+    @property
+    def id(self) -> int:
+        return self.store.node_ids[self.index]
+
+    @property
+    def canvas(self) -> Canvas:
+        return self.store.canvas
+
+    @property
+    def position(self) -> pygame.Vector2:
+        return pygame.Vector2(self.store.node_x[self.index], self.store.node_y[self.index])
+
+    @property
+    def color(self) -> (float, float, float):
+        return self.store.node_color
+
+    @property
+    def size(self) -> float:
+        return self.store.node_size
+
+    @property
+    def connections(self) -> ConnectionsHandle:
+        return ConnectionsHandle(self.store, self.index)
+
+
+class TrackHandle:
+    __slots__ = ()
+
+    @property
+    def id(self) -> int:
+        return self.store.track_ids[self.index]
+
+    @property
+    def canvas(self) -> Canvas:
+        return self.store.canvas
+
+    @property
+    def node_a(self) -> NodeHandle:
+        return self.store.node(self.store.track_node_a[self.index])
+
+    @property
+    def node_b(self) -> NodeHandle:
+        return self.store.node(self.store.track_node_b[self.index])
+
+    @property
+    def color(self) -> (float, float, float):
+        return self.store.track_color
+
+    @property
+    def width(self) -> int:
+        return self.store.track_width
+
+
+class StraightTrackHandle(TrackHandle, StraightTrack):
+    __slots__ = ('store', 'index', '__weakref__')
+
+    def __init__(self, store: NetworkStore, index: int):
+        self.store = store
+        self.index = index
+        self.invalidate()
+
+
+class CurvedTrackHandle(TrackHandle, CurvedTrack):
+    __slots__ = ('store', 'index', '__weakref__')
+
+    def __init__(self, store: NetworkStore, index: int):
+        self.store = store
+        self.index = index
+        self.invalidate()
+
+    @property
+    def center(self) -> pygame.Vector2:
+        return pygame.Vector2(self.store.track_center_x[self.index], self.store.track_center_y[self.index])
+
+    @property
+    def radius(self) -> float:
+        return self.store.track_radius[self.index]
+
+    @property
+    def a_angle(self) -> float:
+        return self.store.track_a_angle[self.index]
+
+    @property
+    def b_angle(self) -> float:
+        return self.store.track_b_angle[self.index]
+
+    @property
+    def start_angle(self) -> float:
+        return self.store.track_start_angle[self.index]
+
+    @property
+    def stop_angle(self) -> float:
+        return self.store.track_stop_angle[self.index]
@@ -0,0 +1,15 @@
+import os
+import sys
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+import pytest
+
+from canvas import Canvas
+
+
+@pytest.fixture
+def canvas() -> Canvas:
+    return Canvas(pygame.Vector2())
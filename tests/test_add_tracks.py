@@ -0,0 +1,110 @@
+import random
+
+import pytest
+from pygame import Vector2
+
+import layouts
+from benchmarks.parallel import get_summary
+from network import Network, NetworkListener, Node, StraightTrack
+from spatial import SweepLine
+
+LAYOUTS = [
+    ('straights', 600, 0),
+    ('straights', 400, 1),
+    ('curves', 400, 0),
+    ('curves', 300, 3),
+    ('yard', 500, 2),
+]
+
+
+def _add_one_by_one(network: Network, tracks: list):
+    for track in tracks:
+        network.add_track(track)
+
+
+@pytest.mark.parametrize('name, count, seed', LAYOUTS)
+def test_add_tracks_same_as_add_track(canvas, name, count, seed):
+    bulk = Network(canvas)
+    bulk.add_tracks(layouts.LAYOUTS[name](canvas, count, seed))
+    sequential = Network(canvas)
+    _add_one_by_one(sequential, layouts.LAYOUTS[name](canvas, count, seed))
+    assert len(bulk.tracks) == len(sequential.tracks)
+    assert len(bulk.nodes) == len(sequential.nodes)
+    assert get_summary(bulk) == get_summary(sequential)
+
+
+@pytest.mark.parametrize('name, count, seed', [('straights', 300, 0), ('curves', 200, 3), ('yard', 300, 1)])
+def test_add_tracks_in_workers_same_as_add_track(canvas, name, count, seed):
+    bulk = Network(canvas)
+    bulk.stats.enabled = True
+    bulk.add_tracks(layouts.LAYOUTS[name](canvas, count, seed), workers=2)
+    sequential = Network(canvas)
+    _add_one_by_one(sequential, layouts.LAYOUTS[name](canvas, count, seed))
+    assert get_summary(bulk) == get_summary(sequential)
+    assert bulk.stats.counters['intersection results reused'] > 0
+
+
+def test_add_tracks_in_workers_reuses_results_of_merged_nodes(canvas):
+    # The tracks of the yard share their nodes, which are merged when the tracks are inserted, at the same positions
+    network = Network(canvas)
+    network.stats.enabled = True
+    network.add_tracks(layouts.grid_yard(canvas, 300, 0), workers=2)
+    reused = network.stats.counters['intersection results reused']
+    tested = sum(count for name, count in network.stats.counters.items() if name.startswith('intersection tests'))
+    assert reused > tested
+
+
+def test_add_tracks_onto_existing_network(canvas):
+    tracks = layouts.random_straights(canvas, 300, 4)
+    bulk = Network(canvas)
+    _add_one_by_one(bulk, tracks[:100])
+    bulk.add_tracks(tracks[100:])
+    sequential = Network(canvas)
+    _add_one_by_one(sequential, layouts.random_straights(canvas, 300, 4))
+    assert get_summary(bulk) == get_summary(sequential)
+
+
+class _SplitRecorder(NetworkListener):
+    def __init__(self):
+        self.splits = []
+
+    def on_track_split(self, track, pieces: list):
+        self.splits.append((track, len(pieces)))
+
+
+def test_add_tracks_splits_every_track_once(canvas):
+    network = Network(canvas)
+    recorder = _SplitRecorder()
+    network.listeners.append(recorder)
+    long = StraightTrack(canvas, Node(canvas, Vector2(0, 0)), Node(canvas, Vector2(1000, 0)))
+    crossing = [StraightTrack(canvas, Node(canvas, Vector2(x, -100)), Node(canvas, Vector2(x, 100)))
+                for x in range(100, 1000, 200)]
+    network.add_tracks([long] + crossing)
+    # The long track is split at all five crossings at once, rather than once per crossing track
+    assert sorted(recorder.splits, key=lambda split: split[0].id) == [(long, 6)] + [(track, 2) for track in crossing]
+    assert len(network.tracks) == 6 + 2 * 5
+
+
+def test_add_tracks_undo(canvas):
+    network = Network(canvas)
+    network.add_tracks(layouts.random_straights(canvas, 200, 5))
+    network.undo()
+    assert not network.tracks
+    assert not network.nodes
+
+
+def _overlapping_pairs(boxes: list) -> list:
+    return [(i, j) for i in range(len(boxes)) for j in range(i + 1, len(boxes))
+            if boxes[i][0] <= boxes[j][2] and boxes[j][0] <= boxes[i][2]
+            and boxes[i][1] <= boxes[j][3] and boxes[j][1] <= boxes[i][3]]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_sweep_line(seed):
+    rnd = random.Random(seed)
+    boxes = []
+    for _ in range(rnd.randint(0, 60)):
+        x = rnd.randint(0, 30)
+        y = rnd.randint(0, 30)
+        boxes.append((x, y, x + rnd.randint(0, 8), y + rnd.randint(0, 8)))
+    assert SweepLine.overlapping_pairs(boxes) == _overlapping_pairs(boxes)
@@ -0,0 +1,36 @@
+import pygame
+import pytest
+from pygame import Vector2
+
+import cli
+import persistence
+from network import Network, Node, StraightTrack
+
+
+def _save_network(canvas, path, tracks: bool = True) -> str:
+    network = Network(canvas)
+    if tracks:
+        network.add_track(StraightTrack(canvas, Node(canvas, Vector2(0, 0)), Node(canvas, Vector2(400, 300))))
+    persistence.save(network, str(path))
+    return str(path)
+
+
+@pytest.mark.parametrize('tracks, options, size', [
+    (False, [], (100, 100)),
+    (False, ['--width', '40', '--height', '30'], (40, 30)),
+    (True, ['--width', '100', '--height', '100'], (100, 100)),
+    (True, ['--width', '1', '--height', '1'], (1, 1)),
+    (True, ['--grid', '50', '--width', '300', '--height', '200'], (300, 200)),
+])
+def test_render(canvas, tmp_path, tracks, options, size):
+    network_path = _save_network(canvas, tmp_path / 'network.bin', tracks)
+    image_path = str(tmp_path / 'network.png')
+    assert cli.main(['render', network_path, image_path] + options) == 0
+    assert pygame.image.load(image_path).get_size() == size
+
+
+@pytest.mark.parametrize('option', ['--width', '--height', '--scale'])
+def test_render_rejects_sizes_below_one(canvas, tmp_path, option):
+    network_path = _save_network(canvas, tmp_path / 'network.bin')
+    with pytest.raises(SystemExit):
+        cli.main(['render', network_path, str(tmp_path / 'network.png'), option, '0'])
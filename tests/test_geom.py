@@ -0,0 +1,177 @@
+import math
+from fractions import Fraction
+
+import pytest
+from pygame import Vector2
+
+from geom import Geom, Tolerance
+from network import Network, Node, StraightTrack
+
+
+def _get_coordinates(points: list) -> list:
+    # Vector2 compares within its epsilon, which is as large as Tolerance.epsilon
+    return [(point.x, point.y) for point in points]
+
+
+@pytest.fixture
+def epsilon():
+    return Tolerance.epsilon
+
+
+def test_tolerance_angle(epsilon):
+    assert Tolerance.angle(10) == pytest.approx(epsilon / 10)
+    assert Tolerance.angle(0) == math.pi
+    assert Tolerance.merge >= epsilon
+
+
+def test_orientation():
+    assert Geom.orientation(Vector2(0, 0), Vector2(10, 0), Vector2(5, 1)) == 1
+    assert Geom.orientation(Vector2(0, 0), Vector2(10, 0), Vector2(5, -1)) == -1
+    assert Geom.orientation(Vector2(0, 0), Vector2(10, 0), Vector2(20, 0)) == 0
+
+
+def test_orientation_near_degenerate():
+    # Points on y = x that are not exactly representable relative to each other, where the floating point determinant
+    # is dominated by rounding
+    a = Vector2(0.5, 0.5)
+    b = Vector2(12, 12)
+    assert Geom.orientation(a, b, Vector2(24, 24)) == 0
+    assert Geom.orientation(a, b, Vector2(24, math.nextafter(24, math.inf))) == 1
+    assert Geom.orientation(a, b, Vector2(24, math.nextafter(24, 0))) == -1
+    assert Geom.orientation(b, a, Vector2(24, math.nextafter(24, 0))) == 1
+
+
+def test_in_circle():
+    center = Vector2(0, 0)
+    assert Geom.in_circle(Vector2(3, 4), center, 5) == 0
+    assert Geom.in_circle(Vector2(3, 4), center, math.nextafter(5, math.inf)) == 1
+    assert Geom.in_circle(Vector2(3, 4), center, math.nextafter(5, 0)) == -1
+    assert Geom.in_circle(Vector2(1e8 + 3, 1e8 + 4), Vector2(1e8, 1e8), 5) == 0
+
+
+def test_line_in_circle():
+    center = Vector2(0, 0)
+    assert Geom.line_in_circle(Vector2(-10, 5), Vector2(10, 5), center, 5) == 0
+    assert Geom.line_in_circle(Vector2(-10, math.nextafter(5, 0)), Vector2(10, math.nextafter(5, 0)), center, 5) == 1
+    assert Geom.line_in_circle(Vector2(-10, math.nextafter(5, 10)), Vector2(10, math.nextafter(5, 10)), center, 5) == -1
+    # Tangent along a diagonal, where the distance can only be compared exactly
+    squared_radius = Fraction(math.sqrt(50)) ** 2
+    assert squared_radius != 50
+    assert Geom.line_in_circle(Vector2(0, 10), Vector2(10, 0), Vector2(0, 0), math.sqrt(50)) == \
+        (1 if squared_radius > 50 else -1)
+
+
+def test_line_segments_crossing():
+    found, points = Geom.intersects_line_segment_line_segment(Vector2(0, 0), Vector2(10, 10), Vector2(0, 10),
+                                                             Vector2(10, 0))
+    assert found
+    assert _get_coordinates(points) == _get_coordinates([Vector2(5, 5)])
+
+
+def test_line_segments_endpoint_touch():
+    found, points = Geom.intersects_line_segment_line_segment(Vector2(0, 0), Vector2(10, 0), Vector2(5, 0),
+                                                             Vector2(5, 5))
+    assert found
+    assert _get_coordinates(points) == _get_coordinates([Vector2(5, 0)])
+    found, points = Geom.intersects_line_segment_line_segment(Vector2(0, 0), Vector2(10, 0), Vector2(10, 0),
+                                                             Vector2(10, 10))
+    assert found
+    assert _get_coordinates(points) == _get_coordinates([Vector2(10, 0)])
+
+
+def test_line_segments_endpoint_within_epsilon(epsilon):
+    # An end within epsilon of the other segment touches it, at the end itself
+    end = Vector2(5, epsilon / 2)
+    found, points = Geom.intersects_line_segment_line_segment(Vector2(0, 0), Vector2(10, 0), end, Vector2(5, 5))
+    assert found
+    assert _get_coordinates(points) == _get_coordinates([end])
+    found, points = Geom.intersects_line_segment_line_segment(Vector2(0, 0), Vector2(10, 0), Vector2(5, 2 * epsilon),
+                                                             Vector2(5, 5))
+    assert not found
+
+
+def test_line_segments_collinear_overlap(epsilon):
+    assert Geom.intersects_line_segment_line_segment(Vector2(0, 0), Vector2(10, 0), Vector2(5, 0),
+                                                     Vector2(15, 0)) == (False, [])
+    # Overlapping within epsilon touches at two points, which is not an intersection either
+    assert Geom.intersects_line_segment_line_segment(Vector2(0, 0), Vector2(10, 0), Vector2(5, epsilon / 2),
+                                                     Vector2(15, epsilon / 2)) == (False, [])
+    # Collinear segments that only share an end
+    assert Geom.intersects_line_segment_line_segment(Vector2(0, 0), Vector2(10, 0), Vector2(10, 0),
+                                                     Vector2(20, 0)) == (False, [])
+
+
+def test_circles_tangent(epsilon):
+    found, points = Geom.intersects_circle_circle(Vector2(0, 0), 5, Vector2(10, 0), 5)
+    assert found
+    assert _get_coordinates(points) == _get_coordinates([Vector2(5, 0)])
+    # Within epsilon of touching is tangent as well
+    found, points = Geom.intersects_circle_circle(Vector2(0, 0), 5, Vector2(10, 0), 5 - epsilon / 2)
+    assert found
+    assert len(points) == 1
+    assert Geom.intersects_circle_circle(Vector2(0, 0), 5, Vector2(10, 0), 5 - 2 * epsilon) == (False, [])
+    # Touching from the inside
+    found, points = Geom.intersects_circle_circle(Vector2(0, 0), 10, Vector2(5, 0), 5)
+    assert found
+    assert _get_coordinates(points) == _get_coordinates([Vector2(10, 0)])
+
+
+def test_circles_crossing_and_concentric():
+    found, points = Geom.intersects_circle_circle(Vector2(0, 0), 5, Vector2(8, 0), 5)
+    assert found
+    assert sorted((point.x, point.y) for point in points) == [pytest.approx((4, -3)), pytest.approx((4, 3))]
+    assert Geom.intersects_circle_circle(Vector2(0, 0), 5, Vector2(0, 0), 5) == (False, [])
+    assert Geom.intersects_circle_circle(Vector2(0, 0), 10, Vector2(1, 0), 5) == (False, [])
+
+
+def test_line_tangent_to_circle(epsilon):
+    found, points = Geom.intersects_line_circle(Vector2(-10, 5), Vector2(10, 5), Vector2(0, 0), 5)
+    assert found
+    assert _get_coordinates(points) == _get_coordinates([Vector2(0, 5)])
+    found, points = Geom.intersects_line_circle(Vector2(-10, 5 + epsilon / 2), Vector2(10, 5 + epsilon / 2),
+                                                Vector2(0, 0), 5)
+    assert found
+    assert len(points) == 1
+    assert Geom.intersects_line_circle(Vector2(-10, 5 + 2 * epsilon), Vector2(10, 5 + 2 * epsilon), Vector2(0, 0),
+                                       5) == (False, [])
+    assert Geom.intersects_line_circle(Vector2(1, 1), Vector2(1, 1), Vector2(0, 0), 5) == (False, [])
+
+
+def test_tangent_arcs():
+    # Two arcs that touch at (5, 0), one bulging right and the other left
+    found, points = Geom.intersects_circle_segment_circle_segment(Vector2(0, 0), 5, -math.pi / 2, math.pi / 2,
+                                                                  Vector2(10, 0), 5, math.pi / 2, 3 * math.pi / 2)
+    assert found
+    assert _get_coordinates(points) == _get_coordinates([Vector2(5, 0)])
+    # The same circles with arcs facing away from each other
+    assert Geom.intersects_circle_segment_circle_segment(Vector2(0, 0), 5, math.pi / 2, 3 * math.pi / 2,
+                                                         Vector2(10, 0), 5, -math.pi / 2, math.pi / 2) == (False, [])
+
+
+def test_snap_to_arc_end():
+    center = Vector2(0, 0)
+    found, points = Geom.intersects_line_segment_circle_segment(Vector2(-5, 10), Vector2(5, 10), center, 10, 0,
+                                                                math.pi / 2)
+    assert found
+    # The tangent point is snapped to the end of the arc exactly, as computed from its stop angle
+    assert _get_coordinates(points) == _get_coordinates([Geom._get_arc_ends(center, 10, 0, math.pi / 2)[1]])
+
+
+def test_snap_to_segment_end(epsilon):
+    # The circle crosses the segment within epsilon of its end, so the intersection is the end itself
+    found, points = Geom.intersects_line_segment_circle(Vector2(0, 0), Vector2(10, 0), Vector2(15, 0),
+                                                        5 + epsilon / 2)
+    assert found
+    assert _get_coordinates(points) == _get_coordinates([Vector2(10, 0)])
+    found, points = Geom.intersects_line_segment_circle(Vector2(0, 0), Vector2(10, 0), Vector2(15, 0), 5 + 0.1)
+    assert _get_coordinates(points) == _get_coordinates([Vector2(9.9, 0)])
+
+
+def test_snap_to_node_within_merge_distance(canvas):
+    network = Network(canvas)
+    network.add_track(StraightTrack(canvas, Node(canvas, Vector2(0, 0)), Node(canvas, Vector2(100, 0))))
+    # Crosses the first track at (0.5, 0), within the merge distance of its node at (0, 0)
+    network.add_track(StraightTrack(canvas, Node(canvas, Vector2(0.5, -10)), Node(canvas, Vector2(0.5, 10))))
+    assert Tolerance.merge > 0.5
+    assert sorted((node.position.x, node.position.y) for node in network.nodes.values()) == \
+        [(0, 0), (0.5, -10), (0.5, 10), (100, 0)]
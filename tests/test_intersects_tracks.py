@@ -0,0 +1,130 @@
+import math
+import random
+
+import pytest
+from pygame import Vector2
+
+import layouts
+import util
+from geom import Tolerance
+from geom_batch import GeomBatch, np
+from network import CurvedTrack, Node, StraightTrack
+
+pytestmark = pytest.mark.skipif(not GeomBatch.is_available(), reason='numpy is not installed')
+
+
+def _straight(canvas, a: Vector2, b: Vector2) -> StraightTrack:
+    return StraightTrack(canvas, Node(canvas, Vector2(a)), Node(canvas, Vector2(b)))
+
+
+def _curve(canvas, center: Vector2, radius: float, start_angle: float, stop_angle: float) -> CurvedTrack:
+    node_a = Node(canvas, center + Vector2(math.cos(start_angle), math.sin(start_angle)) * radius)
+    node_b = Node(canvas, center + Vector2(math.cos(stop_angle), math.sin(stop_angle)) * radius)
+    return CurvedTrack(canvas, node_a, node_b, Vector2(center), radius, start_angle, stop_angle, start_angle,
+                       stop_angle)
+
+
+def _random_tracks(canvas, seed: int, count: int, size: float = 600) -> list:
+    rnd = random.Random(seed)
+    tracks = []
+    for _ in range(count):
+        if rnd.random() < 0.4:
+            start_angle = rnd.uniform(0, 2 * math.pi)
+            stop_angle = (start_angle + rnd.uniform(0.2, 2)) % (2 * math.pi)
+            tracks.append(_curve(canvas, Vector2(rnd.uniform(0, size), rnd.uniform(0, size)), rnd.uniform(20, 200),
+                                 start_angle, stop_angle))
+        else:
+            start = Vector2(rnd.uniform(0, size), rnd.uniform(0, size))
+            tracks.append(_straight(canvas, start, start + Vector2(rnd.uniform(-200, 200), rnd.uniform(-200, 200))))
+    return tracks
+
+
+def _degenerate_tracks(canvas) -> list:
+    """
+    :return: Tracks that touch, overlap, or are tangent to the straight track from (0, 0) to (100, 0), the circle around
+        (50, 50) with radius 50, or each other, within and just beyond epsilon
+    """
+    epsilon = Tolerance.epsilon
+    tracks = [_straight(canvas, Vector2(0, 0), Vector2(100, 0)), _curve(canvas, Vector2(50, 50), 50, math.pi, 0)]
+    for offset in (0, epsilon / 2, epsilon, 2 * epsilon, 5 * epsilon):
+        # Ends on and near the straight track and its ends
+        tracks.append(_straight(canvas, Vector2(30, offset), Vector2(30, 40)))
+        tracks.append(_straight(canvas, Vector2(100 + offset, 0), Vector2(120, 30)))
+        tracks.append(_straight(canvas, Vector2(-offset, -offset), Vector2(-20, -40)))
+        # Tracks sharing an end with the straight track, running on or near it, or ending on or near it
+        tracks.append(_straight(canvas, Vector2(100, 0), Vector2(200, offset)))
+        tracks.append(_straight(canvas, Vector2(100, 0), Vector2(50, offset)))
+        tracks.append(_straight(canvas, Vector2(0, 0), Vector2(-100, offset)))
+        tracks.append(_straight(canvas, Vector2(130, 40), Vector2(0, 0)))
+        tracks.append(_straight(canvas, Vector2(60, offset), Vector2(100, 0)))
+        # Collinear and nearly collinear overlaps
+        tracks.append(_straight(canvas, Vector2(50, offset), Vector2(150, offset)))
+        tracks.append(_straight(canvas, Vector2(-50, -offset), Vector2(10, offset)))
+        # Lines and arcs tangent to the circle, which touches the straight track at (50, 0)
+        tracks.append(_straight(canvas, Vector2(0, -offset), Vector2(100, -offset)))
+        tracks.append(_straight(canvas, Vector2(100 + offset, 0), Vector2(100 + offset, 100)))
+        tracks.append(_curve(canvas, Vector2(150 + offset, 50), 50, math.pi / 2, 3 * math.pi / 2))
+        tracks.append(_curve(canvas, Vector2(50, 50), 50 + offset, 0, math.pi))
+        tracks.append(_curve(canvas, Vector2(50, 25 + offset), 25, math.pi, 0))
+        # Arcs ending on the straight track and on each other
+        tracks.append(_curve(canvas, Vector2(60, 20 + offset), 20, math.pi / 2, 3 * math.pi / 2))
+        tracks.append(_curve(canvas, Vector2(100, 50 + offset), 50, math.pi, 3 * math.pi / 2))
+    # Parallel and concentric tracks, and tracks crossing at a shallow angle
+    tracks.append(_straight(canvas, Vector2(0, 10), Vector2(100, 10)))
+    tracks.append(_curve(canvas, Vector2(50, 50), 50, 0, math.pi))
+    tracks.append(_straight(canvas, Vector2(0, -1e-7), Vector2(100, 1e-7)))
+    return tracks
+
+
+def _get_exact(results: list) -> list:
+    # Vector2 compares within its epsilon, the coordinates have to be the same exactly
+    return [(intersects, [(point.x, point.y) for point in intersections]) for intersects, intersections in results]
+
+
+def _assert_same_as_per_pair(tracks: list, candidates: list):
+    assert len(candidates) >= util.BATCH_THRESHOLD
+    for track in tracks:
+        assert _get_exact(util.intersects_tracks(track, candidates)) == \
+            _get_exact([util.intersects_track(track, other) for other in candidates])
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_random_tracks(canvas, seed):
+    tracks = _random_tracks(canvas, seed, 150)
+    _assert_same_as_per_pair(tracks[:40], tracks)
+
+
+def test_degenerate_tracks(canvas):
+    tracks = _degenerate_tracks(canvas)
+    _assert_same_as_per_pair(tracks, tracks)
+
+
+@pytest.mark.parametrize('name', sorted(layouts.LAYOUTS))
+def test_layouts(canvas, name):
+    tracks = layouts.LAYOUTS[name](canvas, 400, 0)
+    _assert_same_as_per_pair(tracks[:40], tracks)
+
+
+def test_kernels_decide_most_pairs(canvas):
+    # Guards against kernels that leave every pair to Geom, which would pass the tests above as well
+    tracks = [track for track in _random_tracks(canvas, 0, 150) if isinstance(track, StraightTrack)]
+    a_p1, a_p2 = _positions(tracks[:1], 'node_a')[0], _positions(tracks[:1], 'node_b')[0]
+    mask, points, undecided = GeomBatch.intersects_line_segment_line_segment(
+        a_p1, a_p2, _positions(tracks, 'node_a'), _positions(tracks, 'node_b'), 4 * Tolerance.epsilon)
+    # The track itself is parallel to itself
+    assert undecided[0]
+    assert undecided.sum() < len(tracks) / 10
+    assert mask[~undecided].any()
+
+
+def test_kernels_decide_shared_ends(canvas):
+    mask, points, undecided = GeomBatch.intersects_line_segment_line_segment(
+        np.array([0., 0.]), np.array([100., 0.]), np.array([[100., 0.], [0., 30.], [100., 0.]]),
+        np.array([[120., 30.], [0., 0.], [200., 0.]]), 4 * Tolerance.epsilon)
+    # The tracks touch at their shared ends, except for the collinear one, which is left to Geom
+    assert undecided.tolist() == [False, False, True]
+    assert points[:2].tolist() == [[[100., 0.]], [[0., 0.]]]
+
+
+def _positions(tracks: list, attribute: str):
+    return np.array([[getattr(track, attribute).position.x, getattr(track, attribute).position.y] for track in tracks])
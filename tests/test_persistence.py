@@ -0,0 +1,51 @@
+import pytest
+
+import layouts
+import network
+import persistence
+from network import Network, CurvedTrack
+
+
+def _get_geometry(track) -> tuple:
+    geometry = (track.id, type(track).__name__, track.node_a.id, track.node_b.id)
+    if isinstance(track, CurvedTrack):
+        geometry += (tuple(track.center), track.radius, track.a_angle, track.b_angle, track.start_angle,
+                     track.stop_angle)
+    return geometry
+
+
+def _get_connections(result: Network) -> dict:
+    return {node.id: {track.id: [other.id for other in connected]
+                      for track, connected in node.connections.tracks.items()}
+            for node in result.nodes.values()}
+
+
+def test_round_trip(canvas, tmp_path, monkeypatch):
+    saved = Network(canvas)
+    saved.add_tracks(layouts.random_curves(canvas, 150, 0) + layouts.random_straights(canvas, 150, 1))
+    path = str(tmp_path / 'network.bin')
+    persistence.save(saved, path)
+
+    # Loading into a fresh session, in which no ids were assigned yet
+    monkeypatch.setitem(network.ids, 'node', 0)
+    monkeypatch.setitem(network.ids, 'track', 0)
+    loaded = persistence.load(path, canvas)
+    assert list(loaded.nodes) == list(saved.nodes)
+    assert [tuple(node.position) for node in loaded.nodes.values()] == \
+        [tuple(node.position) for node in saved.nodes.values()]
+    assert [_get_geometry(track) for track in loaded.tracks.values()] == \
+        [_get_geometry(track) for track in saved.tracks.values()]
+    assert _get_connections(loaded) == _get_connections(saved)
+    assert network.ids['node'] > max(saved.nodes)
+    assert network.ids['track'] > max(saved.tracks)
+
+
+@pytest.mark.parametrize('magic, version', [(b'ABCD', persistence.FORMAT_VERSION),
+                                            (persistence.MAGIC, persistence.FORMAT_VERSION + 1)])
+def test_load_rejects_other_files(canvas, tmp_path, magic, version):
+    path = tmp_path / 'network.bin'
+    path.write_bytes(persistence.HEADER.pack(magic, version, 0, 0, 0))
+    with pytest.raises(ValueError):
+        persistence.load(str(path), canvas)
+    with pytest.raises(ValueError):
+        persistence.load_store(str(path), canvas)
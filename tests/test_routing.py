@@ -0,0 +1,95 @@
+import math
+import random
+
+import pytest
+from pygame import Vector2
+
+import layouts
+from network import CurvedTrack, Network, Node, StraightTrack
+from routing import RouteCache, Router
+
+
+# The yard has 14 lanes of 14 segments, its lanes end at x = 700
+YARD_TRACKS = 400
+YARD_LANES = 14
+YARD_LENGTH = 700
+SPACING = 50
+
+
+def _get_pairs(network: Network, seed: int, count: int = 60) -> list:
+    """
+    :return: Pairs of a node on an even lane and a node on the same or the next lane, which are only connected by the
+        loops at the end of the yard
+    """
+    rnd = random.Random(seed)
+    nodes = {(round(node.position.x), round(node.position.y)): node for node in network.nodes.values()}
+    pairs = []
+    for _ in range(count):
+        lane = rnd.randrange(0, YARD_LANES, 2)
+        source = nodes[rnd.randrange(0, YARD_LENGTH + 1, SPACING), lane * SPACING]
+        target = nodes[rnd.randrange(0, YARD_LENGTH + 1, SPACING), (lane + rnd.randrange(2)) * SPACING]
+        pairs.append((source, target))
+    return pairs
+
+
+def _get_loops(canvas) -> list:
+    """
+    :return: Half circles at the end of the yard that join every even lane to the next one
+    """
+    loops = []
+    for lane in range(0, YARD_LANES, 2):
+        center = Vector2(YARD_LENGTH, (lane + 0.5) * SPACING)
+        node_a = Node(canvas, Vector2(YARD_LENGTH, lane * SPACING))
+        node_b = Node(canvas, Vector2(YARD_LENGTH, (lane + 1) * SPACING))
+        loops.append(CurvedTrack(canvas, node_a, node_b, center, SPACING / 2, 3 * math.pi / 2, math.pi / 2,
+                                 3 * math.pi / 2, math.pi / 2))
+    return loops
+
+
+def _assert_same_routes(network: Network, cache: RouteCache, pairs: list) -> int:
+    """
+    :return: Number of pairs that have a route
+    """
+    router = Router(network)
+    found = 0
+    for source, target in pairs:
+        expected = router.find_route(source, target)
+        # The second query is answered from the cache
+        for route in (cache.find_route(source, target), cache.find_route(source, target)):
+            if expected is None:
+                assert route is None
+            else:
+                assert route is not None
+                assert route.length == pytest.approx(expected.length)
+        found += expected is not None
+    return found
+
+
+def test_route_cache_same_as_router(canvas):
+    network = Network(canvas)
+    network.stats.enabled = True
+    network.add_tracks(layouts.grid_yard(canvas, YARD_TRACKS, 0))
+    cache = RouteCache(network)
+    pairs = _get_pairs(network, 0)
+    found = _assert_same_routes(network, cache, pairs)
+    assert 0 < found < len(pairs)
+    assert network.stats.counters['route cache hits'] >= len(pairs)
+
+    network.add_tracks(_get_loops(canvas))
+    assert _assert_same_routes(network, cache, pairs) == len(pairs)
+    network.undo()
+    assert _assert_same_routes(network, cache, pairs) == found
+    network.redo()
+    assert _assert_same_routes(network, cache, pairs + _get_pairs(network, 1)) == 2 * len(pairs)
+
+
+def test_route_cache_between_components(canvas):
+    network = Network(canvas)
+    network.add_track(StraightTrack(canvas, Node(canvas, Vector2(0, 0)), Node(canvas, Vector2(100, 0))))
+    network.add_track(StraightTrack(canvas, Node(canvas, Vector2(0, 500)), Node(canvas, Vector2(100, 500))))
+    cache = RouteCache(network)
+    nodes = sorted(network.nodes.values(), key=lambda node: node.position.y)
+    assert cache.find_route(nodes[0], nodes[1]) is not None
+    assert cache.find_route(nodes[0], nodes[2]) is None
+    assert cache.find_route(nodes[0], nodes[2]) is None
+    assert Router(network).find_route(nodes[0], nodes[2]) is None
@@ -0,0 +1,76 @@
+import pygame
+from pygame import Vector2
+
+from network import Network, Node, StraightTrack
+
+BACKGROUND_COLOR = (0, 0, 0)
+
+
+def _add_straight(canvas, network: Network, a: (float, float), b: (float, float)):
+    track = StraightTrack(canvas, Node(canvas, Vector2(a)), Node(canvas, Vector2(b)))
+    track.width = 3
+    network.add_track(track)
+
+
+def _draw(network: Network) -> pygame.Surface:
+    surface = pygame.Surface((1000, 1000))
+    surface.fill(BACKGROUND_COLOR)
+    network.stats.reset()
+    network.draw(surface)
+    return surface
+
+
+def _get_color(canvas, surface: pygame.Surface, position: (float, float)) -> (int, int, int):
+    x, y = canvas.to_screen(Vector2(position))
+    return tuple(surface.get_at((round(x), round(y))))[:3]
+
+
+def _get_zoomed_out_network(canvas) -> Network:
+    # Shows the world from (0, 0) to (4000, 4000), below the scale the network is simplified at
+    canvas.scale = 0.25
+    canvas.offset = Vector2(0, 1000)
+    network = Network(canvas)
+    network.stats.enabled = True
+    # One track in each of the tiles (0, 0), (2, 0) and (0, 2)
+    _add_straight(canvas, network, (100, 100), (900, 100))
+    _add_straight(canvas, network, (2148, 100), (2948, 100))
+    _add_straight(canvas, network, (100, 2148), (900, 2148))
+    return network
+
+
+def test_edit_only_simplifies_touched_tiles(canvas):
+    network = _get_zoomed_out_network(canvas)
+    _draw(network)
+    assert network.stats.counters['tiles simplified'] == 3
+
+    _draw(network)
+    assert network.stats.counters['tiles simplified'] == 0
+
+    _add_straight(canvas, network, (1200, 1200), (1800, 1200))
+    surface = _draw(network)
+    assert network.stats.counters['tiles simplified'] == 1
+    assert _get_color(canvas, surface, (1500, 1200)) != BACKGROUND_COLOR
+
+    network.undo()
+    surface = _draw(network)
+    assert network.stats.counters['tiles simplified'] == 1
+    assert _get_color(canvas, surface, (1500, 1200)) == BACKGROUND_COLOR
+    assert _get_color(canvas, surface, (500, 100)) != BACKGROUND_COLOR
+
+
+def test_snapshots_share_simplified_tiles(canvas):
+    network = _get_zoomed_out_network(canvas)
+    _draw(network)
+    snapshot = network.snapshot()
+    _draw(snapshot)
+    assert network.stats.counters['tiles simplified'] == 0
+
+    # Later changes of the network neither affect the tiles of the snapshot nor make it simplify them again
+    _add_straight(canvas, network, (2200, 300), (2900, 300))
+    surface = _draw(snapshot)
+    assert network.stats.counters['tiles simplified'] == 0
+    assert _get_color(canvas, surface, (2500, 300)) == BACKGROUND_COLOR
+
+    surface = _draw(network.snapshot())
+    assert network.stats.counters['tiles simplified'] == 1
+    assert _get_color(canvas, surface, (2500, 300)) != BACKGROUND_COLOR
@@ -0,0 +1,40 @@
+from pygame import Vector2
+
+from network import Network, Node, StraightTrack
+
+
+def _add_merged_track(canvas, network: Network) -> StraightTrack:
+    network.add_track(StraightTrack(canvas, Node(canvas, Vector2(0, 0)), Node(canvas, Vector2(100, 0))))
+    # Starts within the merge distance of the node at (100, 0), so it is merged with that node
+    track = StraightTrack(canvas, Node(canvas, Vector2(100.5, 0)), Node(canvas, Vector2(100, 100)))
+    network.add_track(track)
+    return track
+
+
+def test_undo_does_not_change_tracks_of_snapshots(canvas):
+    network = Network(canvas)
+    track = _add_merged_track(canvas, network)
+    snapshot = network.snapshot()
+    node_a = track.node_a
+    polyline = track.get_polyline()
+    assert node_a.position == Vector2(100, 0)
+
+    network.undo()
+    assert track not in network.tracks.values()
+    assert track.node_a is node_a
+    assert track.get_polyline() is polyline
+    assert snapshot.query_track(Vector2(100, 50), 1) is track
+    assert track in snapshot.get_tracks_at(node_a)
+
+
+def test_redo_after_undo_of_merge(canvas):
+    network = Network(canvas)
+    track = _add_merged_track(canvas, network)
+    nodes = set(network.nodes)
+    tracks = set(network.tracks)
+    network.undo()
+    assert len(network.tracks) == 1
+    network.redo()
+    assert set(network.nodes) == nodes
+    assert set(network.tracks) == tracks
+    assert network.nodes[track.node_a.id] is track.node_a
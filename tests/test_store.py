@@ -0,0 +1,51 @@
+import pygame
+from pygame import Vector2
+
+import layouts
+import persistence
+from network import Network, CurvedTrack
+from spatial import BoundingBox
+
+
+def _save_network(canvas, path) -> Network:
+    network = Network(canvas)
+    network.add_tracks(layouts.random_curves(canvas, 200, 0))
+    persistence.save(network, str(path))
+    return network
+
+
+def test_load_store(canvas, tmp_path):
+    network = _save_network(canvas, tmp_path / 'network.bin')
+    store = persistence.load_store(str(tmp_path / 'network.bin'), canvas)
+    assert [node.id for node in store.nodes()] == [node.id for node in network.nodes.values()]
+    assert [tuple(node.position) for node in store.nodes()] == [tuple(node.position) for node in network.nodes.values()]
+    for handle, track in zip(store.tracks(), network.tracks.values()):
+        assert (handle.id, handle.node_a.id, handle.node_b.id) == (track.id, track.node_a.id, track.node_b.id)
+        assert isinstance(handle, CurvedTrack) == isinstance(track, CurvedTrack)
+        assert handle.get_bounding_box() == track.get_bounding_box()
+
+
+def test_query(canvas, tmp_path):
+    network = _save_network(canvas, tmp_path / 'network.bin')
+    store = persistence.load_store(str(tmp_path / 'network.bin'), canvas)
+    for box in ((0, 0, 300, 300), (-1000, -1000, 0, 0), (250, 100, 900, 120)):
+        nodes, tracks = store.query(box)
+        assert {node.id for node in nodes} == {node.id for node in network.node_grid.query(box)}
+        assert {track.id for track in tracks} == \
+            {track.id for track in network.tracks.values() if BoundingBox.overlaps(track.get_bounding_box(), box)}
+        assert tracks
+
+
+def test_draw_culls_to_viewport(canvas, tmp_path):
+    _save_network(canvas, tmp_path / 'network.bin')
+    store = persistence.load_store(str(tmp_path / 'network.bin'), canvas)
+    surface = pygame.Surface((200, 200))
+    canvas.stats.enabled = True
+    canvas.offset = Vector2(0, 200)
+    store.draw(surface)
+    visible = sum(canvas.stats.counters.values())
+    canvas.stats.reset()
+    # Everything is drawn when the whole network is in view
+    canvas.scale = 0.01
+    store.draw(surface)
+    assert 0 < visible < sum(canvas.stats.counters.values())
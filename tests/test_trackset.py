@@ -0,0 +1,49 @@
+import pytest
+from pygame import Vector2
+
+from network import Network, Node, StraightTrack
+from trackset import DefaultTrackBuilder
+
+
+@pytest.fixture
+def network(canvas) -> Network:
+    network = Network(canvas)
+    network.add_track(StraightTrack(canvas, Node(canvas, Vector2(0, 0)), Node(canvas, Vector2(100, 0))))
+    return network
+
+
+def _get_track(network: Network) -> StraightTrack:
+    return next(iter(network.tracks.values()))
+
+
+def test_back(network):
+    track = _get_track(network)
+    tracks = set(network.tracks)
+    builder = DefaultTrackBuilder(network, track, track.node_b).straight().left().straight()
+    assert len(network.tracks) == 4
+    builder.back(2)
+    assert len(network.tracks) == 2
+    assert len(builder.stack) == 2
+    builder.back()
+    assert set(network.tracks) == tracks
+
+
+def test_back_after_building_existing_track(network):
+    track = _get_track(network)
+    DefaultTrackBuilder(network, track, track.node_b).straight()
+    tracks = set(network.tracks)
+    # The same straight again changes nothing, so there is nothing to undo either
+    builder = DefaultTrackBuilder(network, track, track.node_b).straight()
+    assert set(network.tracks) == tracks
+    builder.back()
+    assert set(network.tracks) == tracks
+    assert len(builder.stack) == 1
+
+
+def test_back_after_other_changes(canvas, network):
+    track = _get_track(network)
+    builder = DefaultTrackBuilder(network, track, track.node_b).straight()
+    network.add_track(StraightTrack(canvas, Node(canvas, Vector2(0, 500)), Node(canvas, Vector2(100, 500))))
+    with pytest.raises(ValueError):
+        builder.back()
+    assert len(builder.stack) == 2
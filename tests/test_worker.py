@@ -0,0 +1,44 @@
+import threading
+import time
+
+import layouts
+from network import Network
+from worker import NetworkWorker
+
+# Generous bound for a frame of the event loop, far below the time the edit takes
+FRAME_TIME = 0.1
+
+
+def test_try_lock_does_not_wait_for_edits(canvas):
+    network = Network(canvas)
+    worker = NetworkWorker(network)
+    started = threading.Event()
+    release = threading.Event()
+    # Holds the lock until released, so that the large edit is applied after the lock was found busy
+    worker.submit(lambda _: (started.set(), release.wait()))
+    future = worker.add_tracks(layouts.random_straights(canvas, 3000, 0))
+    assert started.wait(5)
+
+    begin = time.perf_counter()
+    with worker.try_lock() as locked:
+        assert not locked
+    assert time.perf_counter() - begin < FRAME_TIME
+
+    release.set()
+    frames = 0
+    while not future.done():
+        begin = time.perf_counter()
+        with worker.try_lock() as locked:
+            if locked:
+                # Reads the network itself, like the simulation
+                len(network.tracks)
+        assert time.perf_counter() - begin < FRAME_TIME
+        frames += 1
+        time.sleep(0.001)
+    worker.close()
+    assert future.result() is None
+    assert frames > 1
+    with worker.try_lock() as locked:
+        assert locked
+    assert worker.version == network.version
+    assert network.tracks
@@ -0,0 +1,157 @@
+from network import Network, NetworkListener, Node, Track
+
+
+class Topology(NetworkListener):
+    """
+    Connected components, dead ends and junctions of a network, kept up to date as the network changes. Components are
+    tracked with a union-find over the nodes, which adding tracks and nodes only ever merges, so every query takes
+    near-constant time. A union-find can't be split again, so removing a track or a node marks the components as
+    outdated, and they are recomputed on the next query. The tracks removed when a track is split are replaced by
+    pieces that connect the same nodes, so splits keep the components up to date.
+
+    A dead end is a node with a single track and a junction a node with more than two. Both are updated on every
+    change, including removals. Like the network, a topology that follows a network edited by a NetworkWorker may only
+    be read while holding the worker's lock.
+    """
+    def __init__(self, network: Network):
+        self.network = network
+        # Union-find over the nodes: parent of every node, and the number of nodes below every root
+        self.parents = {}
+        self.sizes = {}
+        self.component_count = 0
+        # Ordered sets of nodes
+        self.dead_ends = {}
+        self.junctions = {}
+        # Tracks that were removed and not split, after which the components have to be recomputed
+        self.removed = set()
+        self.outdated = True
+        network.listeners.append(self)
+
+    def close(self):
+        """
+        Stops following the network.
+        """
+        self.network.listeners.remove(self)
+
+    def get_component(self, node: Node) -> Node:
+        """
+        :return: Node that represents the component of the given node, the same for all nodes of a component until the
+            network changes
+        """
+        self._update()
+        return self._find(node)
+
+    def get_component_size(self, node: Node) -> int:
+        """
+        :return: Number of nodes in the component of the given node
+        """
+        return self.sizes[self.get_component(node)]
+
+    def are_connected(self, node_a: Node, node_b: Node) -> bool:
+        self._update()
+        return self._find(node_a) is self._find(node_b)
+
+    def get_component_count(self) -> int:
+        self._update()
+        return self.component_count
+
+    def is_connected(self) -> bool:
+        """
+        :return: Whether every node can be reached from every other node, also true for an empty network
+        """
+        return self.get_component_count() <= 1
+
+    def get_dead_ends(self) -> list:
+        """
+        :return: Nodes with a single track, in the order they became dead ends
+        """
+        self._update()
+        return list(self.dead_ends)
+
+    def get_junctions(self) -> list:
+        """
+        :return: Nodes with more than two tracks, in the order they became junctions
+        """
+        self._update()
+        return list(self.junctions)
+
+    def on_node_added(self, node: Node):
+        if not self.outdated:
+            self._add(node)
+            self._update_degree(node)
+
+    def on_node_removed(self, node: Node):
+        self.outdated = True
+
+    def on_track_added(self, track: Track):
+        if self.outdated:
+            return
+        for node in (track.node_a, track.node_b):
+            if node not in self.parents:
+                self._add(node)
+            self._update_degree(node)
+        self._union(track.node_a, track.node_b)
+
+    def on_track_removed(self, track: Track):
+        if self.outdated:
+            return
+        self.removed.add(track)
+        self._update_degree(track.node_a)
+        self._update_degree(track.node_b)
+
+    def on_track_split(self, track: Track, pieces: list):
+        self.removed.discard(track)
+
+    def _update(self):
+        """
+        Recomputes everything from the network if it is outdated or a track was removed without being split.
+        """
+        if not self.outdated and not self.removed:
+            return
+        self.parents.clear()
+        self.sizes.clear()
+        self.component_count = 0
+        self.dead_ends.clear()
+        self.junctions.clear()
+        self.removed.clear()
+        for node in self.network.nodes.values():
+            self._add(node)
+            self._update_degree(node)
+        for track in self.network.tracks.values():
+            self._union(track.node_a, track.node_b)
+        self.outdated = False
+
+    def _add(self, node: Node):
+        self.parents[node] = node
+        self.sizes[node] = 1
+        self.component_count += 1
+
+    def _find(self, node: Node) -> Node:
+        parents = self.parents
+        while parents[node] is not node:
+            # Path halving: every node on the path skips to its grandparent
+            parents[node] = parents[parents[node]]
+            node = parents[node]
+        return node
+
+    def _union(self, node_a: Node, node_b: Node):
+        root_a = self._find(node_a)
+        root_b = self._find(node_b)
+        if root_a is root_b:
+            return
+        if self.sizes[root_a] < self.sizes[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parents[root_b] = root_a
+        self.sizes[root_a] += self.sizes.pop(root_b)
+        self.component_count -= 1
+
+    def _update_degree(self, node: Node):
+        degree = len(node.connections.tracks)
+        if degree == 1:
+            self.dead_ends[node] = None
+        else:
+            self.dead_ends.pop(node, None)
+        if degree > 2:
+            self.junctions[node] = None
+        else:
+            self.junctions.pop(node, None)
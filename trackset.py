@@ -24,28 +24,36 @@ class Default:
 class DefaultTrackBuilder:
     def __init__(self, network: Network, initial_track: Track, initial_node: Node, in_compass_direction=True):
         self.network = network
-        self.stack = [(initial_track, initial_node, in_compass_direction)]
+        # Every step holds the track and node to continue from, and the network transaction that built them
+        self.stack = [(initial_track, initial_node, in_compass_direction, None)]
         self.set = Default(track_separation_distance=100)
 
     def straight(self) -> 'DefaultTrackBuilder':
-        (track, node, in_compass_direction) = self.stack[-1]
-        new_node, new_track = self.network.build_track(node, track, self.set.straight(in_compass_direction))
-        self.stack.append((new_track, new_node, in_compass_direction))
-        return self
+        in_compass_direction = self.stack[-1][2]
+        return self._build(self.set.straight(in_compass_direction), in_compass_direction)
 
     def left(self) -> 'DefaultTrackBuilder':
-        (track, node, in_compass_direction) = self.stack[-1]
-        new_node, new_track = self.network.build_track(node, track, self.set.curve(Direction.LEFT))
-        self.stack.append((new_track, new_node, not in_compass_direction))
-        return self
+        return self._build(self.set.curve(Direction.LEFT), not self.stack[-1][2])
 
     def right(self) -> 'DefaultTrackBuilder':
-        (track, node, in_compass_direction) = self.stack[-1]
-        new_node, new_track = self.network.build_track(node, track, self.set.curve(Direction.RIGHT))
-        self.stack.append((new_track, new_node, not in_compass_direction))
-        return self
+        return self._build(self.set.curve(Direction.RIGHT), not self.stack[-1][2])
 
     def back(self, amount=1) -> 'DefaultTrackBuilder':
+        """
+        Removes the last built tracks from the network again, by undoing the transactions that built them. This is only
+        possible as long as the network has not been changed otherwise since.
+        """
         for i in range(amount):
+            (_, _, _, transaction) = self.stack[-1]
+            if transaction is not None:
+                self.network.undo(transaction)
             self.stack.pop()
         return self
+
+    def _build(self, options, in_compass_direction: bool) -> 'DefaultTrackBuilder':
+        (track, node, _, _) = self.stack[-1]
+        with self.network.transaction() as transaction:
+            new_node, new_track = self.network.build_track(node, track, options)
+        # Building track that is already there changes nothing, which leaves nothing to undo either
+        self.stack.append((new_track, new_node, in_compass_direction, transaction or None))
+        return self
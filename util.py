@@ -1,6 +1,10 @@
 from pygame import Vector2
-from network import Node, Track, StraightTrack, CurvedTrack
-from geom import Geom
+import network
+from geom import Geom, Tolerance
+from geom_batch import GeomBatch, np
+
+# Below this number of candidates the per-pair tests are faster than setting up the arrays for the batched tests
+BATCH_THRESHOLD = 32
 
 
 def is_on_left(start: Vector2, direction: Vector2, point: Vector2) -> bool:
@@ -10,26 +14,116 @@ def is_on_left(start: Vector2, direction: Vector2, point: Vector2) -> bool:
     return d > 0
 
 
-def are_nodes_close(a: Node, b: Node, epsilon: float = 0.001) -> bool:
+def are_nodes_close(a: 'network.Node', b: 'network.Node', epsilon: float = None) -> bool:
     return are_close(a.position, b.position, epsilon)
 
 
-def are_close(a: Vector2, b: Vector2, epsilon: float = 0.001) -> bool:
-    return a.distance_to(b) < epsilon
+def are_close(a: Vector2, b: Vector2, epsilon: float = None) -> bool:
+    """
+    :param epsilon: Distance below which the points are close, defaults to Tolerance.epsilon
+    """
+    return a.distance_to(b) < (Tolerance.epsilon if epsilon is None else epsilon)
 
 
-def intersects_track(a: Track, b: Track) -> (bool, list):
-    if isinstance(a, StraightTrack) and isinstance(b, StraightTrack):
+def intersects_track(a: 'network.Track', b: 'network.Track') -> (bool, list):
+    if isinstance(a, network.StraightTrack) and isinstance(b, network.StraightTrack):
         return Geom.intersects_line_segment_line_segment(a.node_a.position, a.node_b.position, b.node_a.position,
                                                          b.node_b.position)
-    elif isinstance(a, StraightTrack) and isinstance(b, CurvedTrack):
+    elif isinstance(a, network.StraightTrack) and isinstance(b, network.CurvedTrack):
         return Geom.intersects_line_segment_circle_segment(a.node_a.position, a.node_b.position, b.center, b.radius,
                                                            b.start_angle, b.stop_angle)
-    elif isinstance(a, CurvedTrack) and isinstance(b, StraightTrack):
+    elif isinstance(a, network.CurvedTrack) and isinstance(b, network.StraightTrack):
         return Geom.intersects_line_segment_circle_segment(b.node_a.position, b.node_b.position, a.center, a.radius,
                                                            a.start_angle, a.stop_angle)
-    elif isinstance(a, CurvedTrack) and isinstance(b, CurvedTrack):
+    elif isinstance(a, network.CurvedTrack) and isinstance(b, network.CurvedTrack):
         return Geom.intersects_circle_segment_circle_segment(a.center, a.radius, a.start_angle, a.stop_angle, b.center,
                                                              b.radius, b.start_angle, b.stop_angle)
     else:
         return False, []
+
+
+def intersects_tracks(a: 'network.Track', tracks: list) -> list:
+    """
+    Tests track a against every track in tracks, see intersects_pairs.
+    :return: List with the result of intersects_track for every track, in the same order
+    """
+    return intersects_pairs([(a, b) for b in tracks])
+
+
+def intersects_track_lists(tracks: list, candidate_lists: list) -> list:
+    """
+    Tests every track against its candidates, with the pairs of all tracks tested together, see intersects_pairs.
+    :return: List with the result of intersects_tracks for every track and its candidates
+    """
+    found = iter(intersects_pairs([(a, b) for a, candidates in zip(tracks, candidate_lists) for b in candidates]))
+    return [[next(found) for _ in candidates] for candidates in candidate_lists]
+
+
+def intersects_pairs(pairs: list) -> list:
+    """
+    Tests the tracks of every pair against each other. Many pairs are tested with the vectorized kernels of GeomBatch
+    when numpy is available, and only the pairs the kernels leave undecided are tested with Geom. The results are the
+    same either way.
+    :param pairs: List of (track a, track b)
+    :return: List with the result of intersects_track for every pair, in the same order
+    """
+    if not GeomBatch.is_available() or len(pairs) < BATCH_THRESHOLD:
+        return [intersects_track(a, b) for a, b in pairs]
+
+    results = [(False, [])] * len(pairs)
+    # Indices of the pairs by whether track a and track b are curved
+    kinds = {(False, False): [], (False, True): [], (True, False): [], (True, True): []}
+    for i, (a, b) in enumerate(pairs):
+        kinds[isinstance(a, network.CurvedTrack), isinstance(b, network.CurvedTrack)].append(i)
+
+    # Well above the tolerance of Geom, so that rounding can not make the kernels decide a pair that Geom snaps
+    margin = 4 * Tolerance.epsilon
+    indices = kinds[False, False]
+    if indices:
+        a_p1, a_p2 = _get_segments([pairs[i][0] for i in indices])
+        b_p1, b_p2 = _get_segments([pairs[i][1] for i in indices])
+        _collect_results(results, pairs, indices,
+                         GeomBatch.intersects_line_segment_line_segment(a_p1, a_p2, b_p1, b_p2, margin))
+    for line, arc in ((0, 1), (1, 0)):
+        indices = kinds[line == 1, arc == 1]
+        if indices:
+            p1, p2 = _get_segments([pairs[i][line] for i in indices])
+            _collect_results(results, pairs, indices,
+                             GeomBatch.intersects_line_segment_circle_segment(
+                                 p1, p2, *_get_arcs([pairs[i][arc] for i in indices]), margin))
+    indices = kinds[True, True]
+    if indices:
+        _collect_results(results, pairs, indices,
+                         GeomBatch.intersects_circle_segment_circle_segment(
+                             *_get_arcs([pairs[i][0] for i in indices]), *_get_arcs([pairs[i][1] for i in indices]),
+                             margin))
+    return results
+
+
+def _get_segments(tracks: list) -> tuple:
+    """
+    :return: Arrays of shape (n, 2) with the positions of node a and node b of the straight tracks
+    """
+    p1 = np.array([(track.node_a.position.x, track.node_a.position.y) for track in tracks])
+    p2 = np.array([(track.node_b.position.x, track.node_b.position.y) for track in tracks])
+    return p1, p2
+
+
+def _get_arcs(tracks: list) -> tuple:
+    """
+    :return: Arrays with the centers, radii, start angles and stop angles of the curved tracks
+    """
+    centers = np.array([(track.center.x, track.center.y) for track in tracks])
+    radii = np.array([track.radius for track in tracks])
+    start_angles = np.array([track.start_angle for track in tracks])
+    stop_angles = np.array([track.stop_angle for track in tracks])
+    return centers, radii, start_angles, stop_angles
+
+
+def _collect_results(results: list, pairs: list, indices: list, batch: tuple):
+    mask, points, undecided = batch
+    for row in np.flatnonzero(mask.any(axis=-1) & ~undecided).tolist():
+        intersections = [Vector2(x, y) for x, y in points[row][mask[row]].tolist()]
+        results[indices[row]] = (True, intersections)
+    for row in np.flatnonzero(undecided).tolist():
+        results[indices[row]] = intersects_track(*pairs[indices[row]])
@@ -0,0 +1,137 @@
+import concurrent.futures
+import contextlib
+import logging
+import queue
+import threading
+
+from network import Network
+
+logger = logging.getLogger(__name__)
+
+
+class NetworkWorker:
+    """
+    Applies edits to a network in a background thread, so that the thread running the event loop stays responsive
+    while large edits are applied. Edits are functions that take the network as their first argument, such as
+    Network.add_tracks or Network.undo, and are applied in the order they were submitted.
+
+    After the edits that were queued together have been applied, the worker publishes a snapshot of the network. The
+    event loop draws and queries the latest snapshot without locking, as snapshots are never changed. Like the network,
+    the worker can be passed to StaticLayer and Gui, which then read the latest snapshot.
+
+    Code that reads the network itself outside of the worker, rather than a snapshot, has to hold the lock, which is
+    held while an edit is applied. The event loop uses try_lock, so that it skips that code rather than waiting for an
+    edit to be done.
+    """
+    def __init__(self, network: Network):
+        self.network = network
+        self.lock = threading.Lock()
+        self.snapshot = network.snapshot()
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name='network-worker', daemon=True)
+        self.thread.start()
+
+    @property
+    def version(self) -> int:
+        return self.snapshot.version
+
+    @property
+    def stats(self):
+        return self.network.stats
+
+    def draw(self, surface):
+        self.snapshot.draw(surface)
+
+    def query_point(self, position, radius: float):
+        return self.snapshot.query_point(position, radius)
+
+    def get_tracks_at(self, node) -> list:
+        return self.snapshot.get_tracks_at(node)
+
+    def submit(self, edit, *args, **kwargs) -> concurrent.futures.Future:
+        """
+        Queues an edit of the network.
+        :param edit: Function that is called with the network and the given arguments
+        :return: Future of the result of the edit
+        """
+        future = concurrent.futures.Future()
+        self.queue.put((future, edit, args, kwargs))
+        return future
+
+    def add_node(self, node) -> concurrent.futures.Future:
+        return self.submit(Network.add_node, node)
+
+    def add_tracks(self, tracks, workers: int = None) -> concurrent.futures.Future:
+        return self.submit(Network.add_tracks, list(tracks), workers)
+
+    def build_track(self, source_node, source_track, options) -> concurrent.futures.Future:
+        return self.submit(Network.build_track, source_node, source_track, options)
+
+    def undo(self) -> concurrent.futures.Future:
+        return self.submit(Network.undo)
+
+    def redo(self) -> concurrent.futures.Future:
+        return self.submit(Network.redo)
+
+    @contextlib.contextmanager
+    def try_lock(self):
+        """
+        Holds the lock for the duration of the with statement if no edit is being applied, without waiting otherwise.
+        :return: Context manager that yields whether the lock is held
+        """
+        locked = self.lock.acquire(blocking=False)
+        try:
+            yield locked
+        finally:
+            if locked:
+                self.lock.release()
+
+    def is_idle(self) -> bool:
+        """
+        :return: Whether all submitted edits have been applied and published
+        """
+        return self.queue.unfinished_tasks == 0
+
+    def join(self):
+        """
+        Waits until all submitted edits have been applied and published.
+        """
+        self.queue.join()
+
+    def close(self):
+        """
+        Applies the remaining edits and stops the thread.
+        """
+        self.queue.put(None)
+        self.thread.join()
+
+    def _run(self):
+        while True:
+            items = [self.queue.get()]
+            while True:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in items
+            for item in items:
+                if item is not None:
+                    self._apply(*item)
+            with self.lock:
+                self.snapshot = self.network.snapshot()
+            for _ in items:
+                self.queue.task_done()
+            if stop:
+                return
+
+    def _apply(self, future: concurrent.futures.Future, edit, args, kwargs):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            with self.lock:
+                result = edit(self.network, *args, **kwargs)
+        except BaseException as e:
+            logger.exception('Edit %s failed', getattr(edit, '__name__', edit))
+            future.set_exception(e)
+        else:
+            future.set_result(result)